@@ -13,6 +13,8 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import bisect
+
 from chirp import chirp_common
 
 
@@ -83,3 +85,34 @@ class Band(object):
 
         return "%s-%s %s %s %s" % (
             self.limits[0], self.limits[1], self.name, self.duplex, desc)
+
+
+class BandIndex(object):
+    """The bands of a plan indexed by frequency. The boundaries of all the
+    bands split the spectrum into segments, each of which lies in the same
+    set of bands, so a lookup is a bisect into the sorted boundaries."""
+
+    def __init__(self, bands):
+        bounds = set()
+        for band in bands:
+            bounds.add(band.limits[0])
+            bounds.add(band.limits[1] + 1)
+        self._bounds = sorted(bounds)
+        self._segments = [[] for i in range(0, len(self._bounds) - 1)]
+
+        for band in bands:
+            first = bisect.bisect_left(self._bounds, band.limits[0])
+            last = bisect.bisect_left(self._bounds, band.limits[1] + 1)
+            for segment in self._segments[first:last]:
+                segment.append(band)
+
+        # Widest first, so more specific bands are applied last
+        for segment in self._segments:
+            segment.sort(key=lambda x: x.width(), reverse=True)
+
+    def get_bands(self, freq):
+        """Return the bands containing @freq, widest first"""
+        i = bisect.bisect_right(self._bounds, freq) - 1
+        if 0 <= i < len(self._segments):
+            return self._segments[i]
+        return []
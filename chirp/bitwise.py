@@ -56,7 +56,16 @@
 # objects for arrays.  The actual data elements can be interpreted
 # as integers directly (for int types).  Strings and BCD arrays
 # behave as expected.
-
+#
+# Drivers that re-parse the same definition for every image load can
+# use compile_layout() to obtain a Layout once and bind() it to new data.
+# Compiled layouts are cached in memory by the hash of the definition,
+# and optionally on disk (see set_layout_cache_dir()).
+
+import hashlib
+import itertools
+import marshal
+import operator
 import struct
 import os
 import logging
@@ -188,8 +197,10 @@ class arrayDataElement(DataElement):
         s += "]"
         return s
 
-    def __init__(self, offset):
-        self.__items = []
+    def __init__(self, offset, items=None):
+        if items is None:
+            items = []
+        self.__items = items
         self._offset = offset
 
     def append(self, item):
@@ -199,6 +210,8 @@ class arrayDataElement(DataElement):
         return list(self.__items)
 
     def get_raw(self):
+        if isinstance(self.__items, _lazyStructItems):
+            return self.__items.get_raw()
         return "".join([item.get_raw() for item in self.__items])
 
     def __setitem__(self, index, val):
@@ -214,7 +227,7 @@ class arrayDataElement(DataElement):
         if isinstance(self.__items[0], charDataElement):
             return "".join([x.get_value() for x in self.__items])
         else:
-            return str(self.__items)
+            return str(list(self.__items))
 
     def __int__(self):
         if isinstance(self.__items[0], bcdDataElement):
@@ -280,17 +293,103 @@ class arrayDataElement(DataElement):
             index += 1
 
     def size(self):
-        size = 0
-        for i in self.__items:
-            size += i.size()
-        return size
+        # Every item in an array has the same type, and thus size
+        if not self.__items:
+            return 0
+        return len(self.__items) * self.__items[0].size()
+
+
+class _lazyStructItems(object):
+    """A list-like sequence of struct elements, created on demand
+
+    Only the first element is parsed up front, to learn the stride.
+    Others are built from the shared block the first time they are
+    indexed, and kept for the lifetime of the array.
+    """
+
+    def __init__(self, data, block, user_types, name, offset, count,
+                 first, stride):
+        self._data = data
+        self._block = block
+        self._user_types = user_types
+        self._name = name
+        self._offset = offset
+        self._count = count
+        self._stride = stride
+        self._elements = [None] * count
+        self._elements[0] = first
+
+    def _make(self, index):
+        offset = self._offset + (index * self._stride)
+        element = structDataElement(self._data, offset, self._count,
+                                    name=self._name)
+        p = Processor(self._data, offset)
+        p._user_types = self._user_types
+        p._generators = element
+        p.parse_block(self._block)
+        return element
+
+    def _get(self, index):
+        element = self._elements[index]
+        if element is None:
+            element = self._elements[index] = self._make(index)
+        return element
+
+    def __len__(self):
+        return self._count
+
+    def get_raw(self):
+        """Return the raw data of every element, without creating them"""
+        return self._data[self._offset:
+                          self._offset + (self._count * self._stride)]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._get(i)
+                    for i in range(*index.indices(self._count))]
+        index = operator.index(index)
+        if index < 0:
+            index += self._count
+        if index < 0 or index >= self._count:
+            raise IndexError("list index out of range")
+        return self._get(index)
+
+    def __iter__(self):
+        for i in range(0, self._count):
+            yield self._get(i)
+
+    def __reversed__(self):
+        for i in reversed(range(0, self._count)):
+            yield self._get(i)
 
 
 class intDataElement(DataElement):
+    # The struct format of fixed-size types, used to access a MemoryMap
+    # in place instead of slicing it
+    _fmt = None
+
     def __repr__(self):
         fmt = "0x%%0%iX" % (self._size * 2)
         return fmt % int(self)
 
+    def get_value(self):
+        if self._fmt:
+            try:
+                unpack_from = self._data.unpack_from
+            except AttributeError:
+                pass
+            else:
+                return unpack_from(self._fmt, self._offset)[0]
+        return DataElement.get_value(self)
+
+    def _set_packed(self, value):
+        try:
+            pack_into = self._data.pack_into
+        except AttributeError:
+            self._data[self._offset] = struct.pack(self._fmt, value)
+        else:
+            pack_into(self._fmt, self._offset, value)
+
     def __int__(self):
         return self.get_value()
 
@@ -416,6 +515,7 @@ class intDataElement(DataElement):
 
 class u8DataElement(intDataElement):
     _size = 1
+    _fmt = "B"
 
     def _get_value(self, data):
         return ord(data)
@@ -427,17 +527,18 @@ class u8DataElement(intDataElement):
 class u16DataElement(intDataElement):
     _size = 2
     _endianess = ">"
+    _fmt = ">H"
 
     def _get_value(self, data):
         return struct.unpack(self._endianess + "H", data)[0]
 
     def set_value(self, value):
-        self._data[self._offset] = struct.pack(self._endianess + "H",
-                                               int(value) & 0xFFFF)
+        self._set_packed(int(value) & 0xFFFF)
 
 
 class ul16DataElement(u16DataElement):
     _endianess = "<"
+    _fmt = "<H"
 
 
 class u24DataElement(intDataElement):
@@ -467,43 +568,46 @@ class ul24DataElement(u24DataElement):
 class u32DataElement(intDataElement):
     _size = 4
     _endianess = ">"
+    _fmt = ">I"
 
     def _get_value(self, data):
         return struct.unpack(self._endianess + "I", data)[0]
 
     def set_value(self, value):
-        self._data[self._offset] = struct.pack(self._endianess + "I",
-                                               int(value) & 0xFFFFFFFF)
+        self._set_packed(int(value) & 0xFFFFFFFF)
 
 
 class ul32DataElement(u32DataElement):
     _endianess = "<"
+    _fmt = "<I"
 
 
 class i8DataElement(u8DataElement):
     _size = 1
+    _fmt = "b"
 
     def _get_value(self, data):
         return struct.unpack("b", data)[0]
 
     def set_value(self, value):
-        self._data[self._offset] = struct.pack("b", int(value))
+        self._set_packed(int(value))
 
 
 class i16DataElement(intDataElement):
     _size = 2
     _endianess = ">"
+    _fmt = ">h"
 
     def _get_value(self, data):
         return struct.unpack(self._endianess + "h", data)[0]
 
     def set_value(self, value):
-        self._data[self._offset] = struct.pack(self._endianess + "h",
-                                               int(value))
+        self._set_packed(int(value))
 
 
 class il16DataElement(i16DataElement):
     _endianess = "<"
+    _fmt = "<h"
 
 
 class i24DataElement(intDataElement):
@@ -533,17 +637,18 @@ class il24DataElement(i24DataElement):
 class i32DataElement(intDataElement):
     _size = 4
     _endianess = ">"
+    _fmt = ">i"
 
     def _get_value(self, data):
         return struct.unpack(self._endianess + "i", data)[0]
 
     def set_value(self, value):
-        self._data[self._offset] = struct.pack(self._endianess + "i",
-                                               int(value))
+        self._set_packed(int(value))
 
 
 class il32DataElement(i32DataElement):
     _endianess = "<"
+    _fmt = "<i"
 
 
 class charDataElement(DataElement):
@@ -723,6 +828,82 @@ class structDataElement(DataElement):
             yield key, self._generators[key]
 
 
+def _is_field(element):
+    """Strings and BCD numbers are fields, rather than arrays of them"""
+    if isinstance(element, arrayDataElement):
+        return not len(element) or isinstance(
+            element[0], (charDataElement, bcdDataElement))
+    return not isinstance(element, structDataElement)
+
+
+def _span(element):
+    start = element.get_offset()
+    if isinstance(element, bitDataElement):
+        return start, start + element._subgen._size
+    return start, start + max(1, element.size() / 8)
+
+
+def _children(element, start, end, path):
+    if isinstance(element, structDataElement):
+        for name, child in element.items():
+            yield path and "%s.%s" % (path, name) or name, child
+        return
+
+    # Every item of an array has the same size, so only the ones in
+    # range need to be looked at (or created, for lazy struct arrays)
+    count = len(element)
+    first = element[0].get_offset()
+    stride = count > 1 and element[1].get_offset() - first
+    if stride > 0:
+        indexes = range(max(0, (start - first) / stride),
+                        min(count, (end - 1 - first) / stride + 1))
+    else:
+        indexes = range(0, count)
+    for i in indexes:
+        yield "%s[%i]" % (path, i), element[i]
+
+
+def _find_fields(element, other, start, end, path):
+    if _is_field(element):
+        first, last = _span(element)
+        if first < end and last > start:
+            yield path, element, other
+        return
+
+    children = _children(element, start, end, path)
+    if other is None:
+        others = iter(lambda: None, 0)
+    else:
+        others = (child for _path, child in _children(other, start, end,
+                                                      path))
+    for (child_path, child), other_child in itertools.izip(children,
+                                                           others):
+        for field in _find_fields(child, other_child, start, end,
+                                  child_path):
+            yield field
+
+
+def find_fields(element, start, end):
+    """Yield the (path, field) of each field in @element that covers any
+    of the bytes from @start to @end"""
+    for path, field, _other in _find_fields(element, None, start, end, ""):
+        yield path, field
+
+
+def diff_fields(element_a, element_b, start, end):
+    """Yield the (path, field_a, field_b) of each field that covers any of
+    the bytes from @start to @end and differs between @element_a and
+    @element_b, the same definition bound to two images"""
+    for path, field_a, field_b in _find_fields(element_a, element_b,
+                                               start, end, ""):
+        if isinstance(field_a, bitDataElement):
+            differs = field_a.get_value() != field_b.get_value()
+        else:
+            differs = field_a.get_raw() != field_b.get_raw()
+        if differs:
+            yield path, field_a, field_b
+
+
 class Processor:
 
     _types = {
@@ -764,11 +945,7 @@ class Processor:
             if bitsleft < 0:
                 raise ParseError("Invalid bitfield spec")
 
-            class bitDE(bitDataElement):
-                _nbits = bits
-                _shift = bitsleft
-                _subgen = self._types[dtype]
-
+            bitDE = _bit_class(self._types[dtype], bits, bitsleft)
             self._generators[name] = bitDE(self._data, self._offset)
             bitsleft -= bits
 
@@ -782,10 +959,7 @@ class Processor:
         if count % 8 != 0:
             raise ValueError("bit array must be divisible by 8.")
 
-        class bitDE(bitDataElement):
-            _nbits = 1
-            _shift = 8 - i % 8
-
+        bitDE = _bit_class(u8DataElement, 1, 8 - i % 8)
         return bitDE(self._data, self._offset)
 
     def parse_defn(self, defn):
@@ -833,8 +1007,10 @@ class Processor:
             name = deftype[1]
             count = 1
 
+        lazy = count > 1 and not self._has_seekto(block)
         result = arrayDataElement(self._offset)
         for i in range(0, count):
+            start = self._offset
             element = structDataElement(self._data, self._offset, count,
                                         name=name)
             result.append(element)
@@ -842,12 +1018,35 @@ class Processor:
             self._generators = element
             self.parse_block(block)
             self._generators = tmp
+            if lazy:
+                # Every element looks like the first, so build the
+                # rest only when they are indexed
+                stride = self._offset - start
+                items = _lazyStructItems(self._data, block,
+                                         dict(self._user_types), name,
+                                         start, count, element, stride)
+                result = arrayDataElement(start, items)
+                self._offset = start + (stride * count)
+                break
 
         if count == 1:
             self._generators[name] = result[0]
         else:
             self._generators[name] = result
 
+    def _has_seekto(self, block):
+        """Return True if @block (or a nested struct) uses #seekto"""
+        for t, d in block:
+            if t == "directive" and d[0][0] == "seekto":
+                return True
+            elif t == "struct" and d[0][0] == "struct_decl":
+                inner = d[0][1][:-1]
+                if inner[0][0] == "symbol":
+                    inner = self._user_types[inner[0][1]]
+                if self._has_seekto(inner):
+                    return True
+        return False
+
     def parse_struct_defn(self, struct):
         name = struct[0][1]
         block = struct[1:]
@@ -887,10 +1086,113 @@ class Processor:
         return self._generators
 
 
+_BIT_CLASSES = {}
+
+
+def _bit_class(subgen, nbits, shift):
+    """Return the (shared) bitDataElement subclass for a bit position"""
+    key = (subgen, nbits, shift)
+    try:
+        return _BIT_CLASSES[key]
+    except KeyError:
+        pass
+
+    class bitDE(bitDataElement):
+        _nbits = nbits
+        _shift = shift
+        _subgen = subgen
+
+    _BIT_CLASSES[key] = bitDE
+    return bitDE
+
+
+class Layout:
+    """A compiled definition which can be bound to any data buffer"""
+
+    def __init__(self, ast):
+        self._ast = ast
+
+    def bind(self, data, offset=0):
+        """Return the element tree for this layout over @data"""
+        p = Processor(data, offset)
+        return p.parse(self._ast)
+
+
+_LAYOUTS = {}
+_LAYOUT_CACHE_DIR = None
+
+
+def set_layout_cache_dir(path):
+    """Persist compiled layouts in @path (or disable with None)"""
+    global _LAYOUT_CACHE_DIR
+    if path and not os.path.isdir(path):
+        os.makedirs(path)
+    _LAYOUT_CACHE_DIR = path
+
+
+def _plain_ast(node):
+    """Convert a pyPEG parse tree into plain (marshal-able) tuples"""
+    if isinstance(node, list):
+        return tuple(_plain_ast(x) for x in node)
+    elif isinstance(node, unicode):
+        # Plain str compares and hashes against our str keys without
+        # a unicode coercion on every lookup
+        return str(node)
+    return node
+
+
+def _layout_cache_file(key):
+    return os.path.join(_LAYOUT_CACHE_DIR,
+                        "%s-%i.layout" % (key, marshal.version))
+
+
+def _load_cached_ast(key):
+    if not _LAYOUT_CACHE_DIR:
+        return None
+    try:
+        with open(_layout_cache_file(key), "rb") as f:
+            return marshal.load(f)
+    except IOError:
+        return None
+    except (EOFError, ValueError, TypeError):
+        LOG.warn("Ignoring corrupt layout cache for %s" % key)
+        return None
+
+
+def _save_cached_ast(key, ast):
+    if not _LAYOUT_CACHE_DIR:
+        return
+    fn = _layout_cache_file(key)
+    tmp = "%s.%i.tmp" % (fn, os.getpid())
+    try:
+        with open(tmp, "wb") as f:
+            marshal.dump(ast, f)
+        os.rename(tmp, fn)
+    except (IOError, OSError), e:
+        LOG.warn("Unable to save layout cache %s: %s" % (fn, e))
+
+
+def compile_layout(spec):
+    """Compile a definition into a Layout, using the cache if possible"""
+    if isinstance(spec, unicode):
+        spec = spec.encode("utf-8")
+    key = hashlib.sha1(spec).hexdigest()
+    try:
+        return _LAYOUTS[key]
+    except KeyError:
+        pass
+
+    ast = _load_cached_ast(key)
+    if ast is None:
+        ast = _plain_ast(bitwise_grammar.parse(spec))
+        _save_cached_ast(key, ast)
+
+    layout = _LAYOUTS[key] = Layout(ast)
+    return layout
+
+
 def parse(spec, data, offset=0):
-    ast = bitwise_grammar.parse(spec)
-    p = Processor(data, offset)
-    return p.parse(ast)
+    return compile_layout(spec).bind(data, offset)
 
 if __name__ == "__main__":
     defn = """
@@ -0,0 +1,215 @@
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Bulk operations on buffers of radio data
+
+The functions here take a string, bytearray or memoryview (such as
+MemoryMap.view()) and work on the whole buffer at once rather than a
+byte at a time. Buffers are returned as strings.
+"""
+
+import binascii
+import os
+
+_HEX = ["%02x " % i for i in range(0, 256)]
+_PRINTABLE = "".join([(0x20 < i < 0x7E) and chr(i) or "."
+                      for i in range(0, 256)])
+
+
+def _bytes(data):
+    if isinstance(data, str):
+        return data
+    return str(bytearray(data))
+
+
+def _to_int(data):
+    return int(binascii.hexlify(data), 16)
+
+
+def _from_int(value, length):
+    return binascii.unhexlify("%0*x" % (length * 2, value))
+
+
+def sum_bytes(data):
+    """Return the sum of the bytes in @data"""
+    return sum(bytearray(data))
+
+
+def xor_bytes(data, key):
+    """Return @data XORed with @key, which is either a byte value to
+    apply to every byte or a buffer the same length as @data"""
+    if not len(data):
+        return ""
+    if isinstance(key, int):
+        key = chr(key) * len(data)
+    elif len(key) != len(data):
+        raise ValueError("Key is %i bytes, data is %i" % (len(key),
+                                                          len(data)))
+    return _from_int(_to_int(data) ^ _to_int(key), len(data))
+
+
+def xor_chain_encode(data, seed):
+    """Return @data with each byte XORed with the previous encoded byte,
+    the first one with the byte value @seed"""
+    length = len(data)
+    if not length:
+        return ""
+
+    # Each encoded byte is @seed XORed with every byte up to it, so
+    # fold the earlier bytes in by doubling shifts across the buffer
+    value = _to_int(data)
+    shift = 8
+    while shift < length * 8:
+        value ^= value >> shift
+        shift *= 2
+    return xor_bytes(_from_int(value, length), seed)
+
+
+def xor_chain_decode(data, seed):
+    """Reverse xor_chain_encode() with the same @seed"""
+    data = _bytes(data)
+    if not data:
+        return ""
+    return xor_bytes(data, chr(seed) + data[:-1])
+
+
+# Chunk sizes compared in turn when looking for differences: equal
+# chunks are skipped with a single compare at each level
+_DIFF_CHUNKS = [4096, 256, 16]
+
+
+def _diff_offsets(a, b, start, end, level=0):
+    if level == len(_DIFF_CHUNKS):
+        for i in range(start, end):
+            if a[i] != b[i]:
+                yield i
+        return
+
+    chunk = _DIFF_CHUNKS[level]
+    for i in range(start, end, chunk):
+        j = min(i + chunk, end)
+        if a[i:j] != b[i:j]:
+            for offset in _diff_offsets(a, b, i, j, level + 1):
+                yield offset
+
+
+def diff_runs(a, b, gap=0):
+    """Return a list of the (start, end) ranges of bytes that differ
+    between @a and @b, joining ranges separated by no more than @gap
+    equal bytes. Bytes past the end of the shorter buffer differ."""
+    a = _bytes(a)
+    b = _bytes(b)
+    common = min(len(a), len(b))
+
+    runs = []
+    for offset in _diff_offsets(a, b, 0, common):
+        if runs and offset <= runs[-1][1] + gap:
+            runs[-1][1] = offset + 1
+        else:
+            runs.append([offset, offset + 1])
+    if len(a) != len(b):
+        if runs and common <= runs[-1][1] + gap:
+            runs[-1][1] = max(len(a), len(b))
+        else:
+            runs.append([common, max(len(a), len(b))])
+
+    return [tuple(run) for run in runs]
+
+
+def _hexdump_lines(data, addrfmt, block_size, offset=0):
+    hexed = "".join([_HEX[byte] for byte in bytearray(data)])
+    printable = data.translate(_PRINTABLE)
+    lines = len(data) / block_size
+
+    for block in range(0, lines):
+        addr = offset + block * block_size
+        try:
+            line = addrfmt % {"addr": addr, "block": addr / block_size,
+                              "block_size": block_size}
+        except (OverflowError, ValueError, TypeError, KeyError):
+            line = "%03i" % addr
+        start = block * block_size
+        yield "%s: %s  %s" % (line,
+                              hexed[start * 3:(start + block_size) * 3],
+                              printable[start:start + block_size])
+
+
+def _pad(data, block_size):
+    if len(data) % block_size:
+        data += "\x00" * (block_size - len(data) % block_size)
+    return data
+
+
+def hexdump(data, addrfmt=None, block_size=8):
+    """Return a hexdump-like encoding of @data, @block_size bytes to a
+    line, with the address of each line formatted by @addrfmt"""
+    if addrfmt is None:
+        addrfmt = "%(addr)03i"
+
+    data = _pad(_bytes(data), block_size)
+    return "".join([line + "\n" for line in
+                    _hexdump_lines(data, addrfmt, block_size)])
+
+
+def _changed_lines(a, b, block_size):
+    lines = []
+    for start, end in diff_runs(a, b):
+        first = start - start % block_size
+        if lines and first <= lines[-1]:
+            first = lines[-1] + block_size
+        lines += range(first, end, block_size)
+    return lines
+
+
+def hexdiff(a, b, addrfmt=None, diffsonly=False, block_size=8):
+    """Return a diff of the hexdumps of @a and @b, with lines that differ
+    marked with - (from @a) and + (from @b) and the rest indented by a
+    space, or collapsed to a blank line if @diffsonly. Lines are
+    separated by os.linesep"""
+    if addrfmt is None:
+        addrfmt = "%(addr)03i"
+
+    a = _bytes(a)
+    b = _bytes(b)
+    length = max(len(a), len(b))
+    if diffsonly:
+        # Only the lines with a change in them are rendered
+        starts = _changed_lines(a, b, block_size)
+    else:
+        starts = range(0, length, block_size)
+
+    diff = []
+    last = None
+    for start in starts:
+        if diffsonly and last is not None and start != last + block_size:
+            diff.append("")
+        last = start
+
+        block_a = a[start:start + block_size]
+        block_b = b[start:start + block_size]
+        if block_a == block_b:
+            diff += [" " + line for line in _hexdump_lines(
+                _pad(block_a, block_size), addrfmt, block_size, start)]
+            continue
+
+        if block_a:
+            diff += ["-" + line for line in _hexdump_lines(
+                _pad(block_a, block_size), addrfmt, block_size, start)]
+        if block_b:
+            diff += ["+" + line for line in _hexdump_lines(
+                _pad(block_b, block_size), addrfmt, block_size, start)]
+
+    if diffsonly and last is not None and last + block_size < length:
+        diff.append("")
+
+    return "".join([line + os.linesep for line in diff])
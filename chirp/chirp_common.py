@@ -14,9 +14,14 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import base64
+import bisect
 import json
 import logging
 import math
+import mmap
+import os
+import re
+import shutil
 import sys
 from chirp import errors, memmap, CHIRP_VERSION
 
@@ -308,6 +313,7 @@ class Memory:
         "empty":          [True, False],
         "dv_code":        [x for x in range(0, 100)],
     }
+    _valid_sets = dict([(k, frozenset(v)) for k, v in _valid_map.items()])
 
     def __repr__(self):
         return "Memory[%i]" % self.number
@@ -340,9 +346,17 @@ class Memory:
             raise ImmutableValueError("Field %s is not " % name +
                                       "mutable on this memory")
 
-        if name in self._valid_map and val not in self._valid_map[name]:
-            raise ValueError("`%s' is not in valid list: %s" %
-                             (val, self._valid_map[name]))
+        if name in self._valid_map:
+            try:
+                valid = val in self._valid_sets[name]
+            except TypeError:
+                valid = False
+            # Values that compare equal to an item without hashing like it
+            # (such as bitwise elements), and items added to a list since
+            # (some drivers add to MODES), are only found in the list
+            if not valid and val not in self._valid_map[name]:
+                raise ValueError("`%s' is not in valid list: %s" %
+                                 (val, self._valid_map[name]))
 
         self.__dict__[name] = val
 
@@ -587,8 +601,80 @@ class MemoryMapping(object):
         return self.get_index() == other.get_index()
 
 
+class MemoryHandle(object):
+    """A reference to memory @number of @radio, returned by mapping models
+    in place of a decoded Memory. The memory is only decoded (once) if
+    something other than its number is used."""
+
+    def __init__(self, radio, number):
+        self.number = number
+        self._radio = radio
+        self._memory = None
+
+    def get_memory(self):
+        """Return the decoded Memory"""
+        if self._memory is None:
+            self._memory = self._radio.get_memory(self.number)
+        return self._memory
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.get_memory(), name)
+
+    def __eq__(self, other):
+        return self.number == getattr(other, "number", None)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return "%s-%s" % (self.__class__.__name__, self.number)
+
+
+class MappingIndex(object):
+    """Which memories are in which mappings, looked up either way. Mappings
+    are identified by their index (see MemoryMapping.get_index())."""
+
+    def __init__(self):
+        self._memories = {}
+        self._mappings = {}
+
+    def add(self, number, mapping_index):
+        """Record that memory @number is in mapping @mapping_index"""
+        memories = self._memories.setdefault(mapping_index, [])
+        if number not in memories:
+            bisect.insort(memories, number)
+        mappings = self._mappings.setdefault(number, [])
+        if mapping_index not in mappings:
+            mappings.append(mapping_index)
+
+    def remove(self, number, mapping_index):
+        """Record that memory @number is not in mapping @mapping_index"""
+        if number in self._memories.get(mapping_index, []):
+            self._memories[mapping_index].remove(number)
+        if mapping_index in self._mappings.get(number, []):
+            self._mappings[number].remove(mapping_index)
+
+    def get_memories(self, mapping_index):
+        """Return the sorted numbers of the memories in @mapping_index"""
+        return list(self._memories.get(mapping_index, []))
+
+    def get_mappings(self, number):
+        """Return the indexes of the mappings memory @number is in"""
+        return list(self._mappings.get(number, []))
+
+
 class MappingModel(object):
-    """Base class for a memory mapping model"""
+    """Base class for a memory mapping model
+
+    A model that implements _load_index() gets a MappingIndex of its
+    memberships, read from the radio once and then kept up to date by
+    _index_add() and _index_remove() as memories are added and removed.
+    _get_indexed_memories() and _get_indexed_mappings() answer
+    get_mapping_memories() and get_memory_mappings() from it."""
+
+    _mapping_index = None
 
     def __init__(self, radio, name):
         self._radio = radio
@@ -623,6 +709,41 @@ class MappingModel(object):
         """Return a list of mappings that @memory is in"""
         raise NotImplementedError()
 
+    def _load_index(self, index):
+        """Fill @index with the memberships of all mappings, from the
+        radio"""
+        raise NotImplementedError()
+
+    def _get_index(self):
+        if self._mapping_index is None:
+            index = MappingIndex()
+            self._load_index(index)
+            self._mapping_index = index
+        return self._mapping_index
+
+    def invalidate_index(self):
+        """Forget the memberships read from the radio, such as after its
+        memories have been changed other than through this model"""
+        self._mapping_index = None
+
+    def _index_add(self, memory, mapping):
+        if self._mapping_index is not None:
+            self._mapping_index.add(memory.number, mapping.get_index())
+
+    def _index_remove(self, memory, mapping):
+        if self._mapping_index is not None:
+            self._mapping_index.remove(memory.number, mapping.get_index())
+
+    def _get_indexed_memories(self, mapping):
+        return [MemoryHandle(self._radio, number) for number in
+                self._get_index().get_memories(mapping.get_index())]
+
+    def _get_indexed_mappings(self, memory):
+        mappings = dict([(mapping.get_index(), mapping)
+                         for mapping in self.get_mappings()])
+        return [mappings[index] for index in
+                self._get_index().get_mappings(memory.number)]
+
 
 class Bank(MemoryMapping):
     """Base class for a radio's Bank"""
@@ -744,7 +865,7 @@ class RadioFeatures:
         if name.startswith("_"):
             self.__dict__[name] = val
             return
-        elif name not in self._valid_map.keys():
+        elif name not in self._valid_map:
             raise ValueError("No such attribute `%s'" % name)
 
         if type(self._valid_map[name]) == tuple:
@@ -770,6 +891,7 @@ class RadioFeatures:
             raise ValueError("Invalid value `%s' for attribute `%s'" % (val,
                                                                         name))
         self.__dict__[name] = val
+        self.__dict__["_validator"] = None
 
     def __getattr__(self, name):
         raise AttributeError("pylint is confused by RadioFeatures")
@@ -786,6 +908,7 @@ class RadioFeatures:
 
     def __init__(self):
         self.__docs = {}
+        self._validator = None
         self.init("has_bank_index", False,
                   "Indicates that memories in a bank can be stored in " +
                   "an order other than in main memory")
@@ -879,72 +1002,137 @@ class RadioFeatures:
     def __getitem__(self, name):
         return self.__dict__[name]
 
+    def filter_name(self, name):
+        """Filter @name to just the length and characters supported"""
+        if self.valid_characters == self.valid_characters.upper():
+            # Radio only supports uppercase, so help out here
+            name = name.upper()
+        return "".join([x for x in name[:self.valid_name_length]
+                        if x in self.valid_characters])
+
+    def _get_validator(self):
+        if self._validator is None:
+            self._validator = _MemoryValidator(self)
+        return self._validator
+
     def validate_memory(self, mem):
         """Return a list of warnings and errors that will be encoundered
         if trying to set @mem on the current radio"""
+        return self._get_validator().validate(mem)
+
+    def validate_memories(self, memories):
+        """Return a list of the validate_memory() results for each of
+        @memories"""
+        validate = self._get_validator().validate
+        return [validate(mem) for mem in memories]
+
+
+def _value_set(values):
+    try:
+        return frozenset(values)
+    except TypeError:
+        return frozenset()
+
+
+class _MemoryValidator(object):
+    """The checks of RadioFeatures.validate_memory(), with the features
+    turned into sets and a table of bands that can be bisected. It is
+    built the first time a memory is validated and again after any
+    feature is set, but not if a feature's list is changed in place.
+
+    A value not in a set is looked for in the feature's list as well, to
+    match values that compare equal to an item without hashing like it
+    (such as bitwise elements)."""
+
+    def __init__(self, rf):
+        self.rf = rf
+        self.modes = _value_set(rf.valid_modes)
+        self.tmodes = _value_set(rf.valid_tmodes)
+        self.cross_modes = _value_set(rf.valid_cross_modes)
+        self.dtcs_pols = _value_set(rf.valid_dtcs_pols)
+        self.duplexes = _value_set(rf.valid_duplexes)
+        self.tuning_steps = _value_set(rf.valid_tuning_steps)
+        self.special_chans = _value_set(rf.valid_special_chans)
+        self.characters = _value_set(rf.valid_characters)
+
+        # Overlapping and touching bands are merged, so a frequency is in
+        # a band if it is below the end of the last one starting before it
+        self.band_starts = []
+        self.band_ends = []
+        for lo, hi in sorted(rf.valid_bands):
+            if self.band_ends and lo <= self.band_ends[-1]:
+                self.band_ends[-1] = max(self.band_ends[-1], hi)
+            else:
+                self.band_starts.append(lo)
+                self.band_ends.append(hi)
+
+    def in_bands(self, freq):
+        """Return True if @freq is in one of the radio's bands"""
+        i = bisect.bisect_right(self.band_starts, freq) - 1
+        return i >= 0 and freq < self.band_ends[i]
+
+    def validate(self, mem):
+        """Return a list of warnings and errors that will be encoundered
+        if trying to set @mem on the radio"""
+        rf = self.rf
         msgs = []
 
-        lo, hi = self.memory_bounds
-        if not self.has_infinite_number and \
+        lo, hi = rf.memory_bounds
+        if not rf.has_infinite_number and \
                 (mem.number < lo or mem.number > hi) and \
-                mem.extd_number not in self.valid_special_chans:
+                mem.extd_number not in self.special_chans and \
+                mem.extd_number not in rf.valid_special_chans:
             msg = ValidationWarning("Location %i is out of range" % mem.number)
             msgs.append(msg)
 
-        if (self.valid_modes and
-                mem.mode not in self.valid_modes and
+        if (rf.valid_modes and
+                mem.mode not in self.modes and
+                mem.mode not in rf.valid_modes and
                 mem.mode != "Auto"):
             msg = ValidationError("Mode %s not supported" % mem.mode)
             msgs.append(msg)
 
-        if self.valid_tmodes and mem.tmode not in self.valid_tmodes:
+        if rf.valid_tmodes and mem.tmode not in self.tmodes and \
+                mem.tmode not in rf.valid_tmodes:
             msg = ValidationError("Tone mode %s not supported" % mem.tmode)
             msgs.append(msg)
         else:
             if mem.tmode == "Cross":
-                if self.valid_cross_modes and \
-                        mem.cross_mode not in self.valid_cross_modes:
+                if rf.valid_cross_modes and \
+                        mem.cross_mode not in self.cross_modes and \
+                        mem.cross_mode not in rf.valid_cross_modes:
                     msg = ValidationError("Cross tone mode %s not supported" %
                                           mem.cross_mode)
                     msgs.append(msg)
 
-        if self.has_dtcs_polarity and \
-                mem.dtcs_polarity not in self.valid_dtcs_pols:
+        if rf.has_dtcs_polarity and \
+                mem.dtcs_polarity not in self.dtcs_pols and \
+                mem.dtcs_polarity not in rf.valid_dtcs_pols:
             msg = ValidationError("DTCS Polarity %s not supported" %
                                   mem.dtcs_polarity)
             msgs.append(msg)
 
-        if self.valid_dtcs_codes and \
-                mem.dtcs not in self.valid_dtcs_codes:
-            msg = ValidationError("DTCS Code %03i not supported" % mem.dtcs)
-        if self.valid_dtcs_codes and \
-                mem.rx_dtcs not in self.valid_dtcs_codes:
-            msg = ValidationError("DTCS Code %03i not supported" % mem.rx_dtcs)
-
-        if self.valid_duplexes and mem.duplex not in self.valid_duplexes:
+        if rf.valid_duplexes and mem.duplex not in self.duplexes and \
+                mem.duplex not in rf.valid_duplexes:
             msg = ValidationError("Duplex %s not supported" % mem.duplex)
             msgs.append(msg)
 
         ts = mem.tuning_step
-        if self.valid_tuning_steps and ts not in self.valid_tuning_steps and \
-                not self.has_nostep_tuning:
+        if rf.valid_tuning_steps and not rf.has_nostep_tuning and \
+                ts not in self.tuning_steps and \
+                ts not in rf.valid_tuning_steps:
             msg = ValidationError("Tuning step %.2f not supported" % ts)
             msgs.append(msg)
 
-        if self.valid_bands:
-            valid = False
-            for lo, hi in self.valid_bands:
-                if lo <= mem.freq < hi:
-                    valid = True
-                    break
-            if not valid:
+        if self.band_starts:
+            if not self.in_bands(mem.freq):
                 msg = ValidationError(
                     ("Frequency {freq} is out "
                      "of supported range").format(freq=format_freq(mem.freq)))
                 msgs.append(msg)
 
-        if self.valid_bands and \
-                self.valid_duplexes and \
+        if self.band_starts and \
+                rf.valid_duplexes and \
                 mem.duplex in ["split", "-", "+"]:
             if mem.duplex == "split":
                 freq = mem.offset
@@ -952,36 +1140,32 @@ class RadioFeatures:
                 freq = mem.freq - mem.offset
             elif mem.duplex == "+":
                 freq = mem.freq + mem.offset
-            valid = False
-            for lo, hi in self.valid_bands:
-                if lo <= freq < hi:
-                    valid = True
-                    break
-            if not valid:
+            if not self.in_bands(freq):
                 msg = ValidationError(
                     ("Tx freq {freq} is out "
                      "of supported range").format(freq=format_freq(freq)))
                 msgs.append(msg)
 
         if mem.power and \
-                self.valid_power_levels and \
-                mem.power not in self.valid_power_levels:
+                rf.valid_power_levels and \
+                mem.power not in rf.valid_power_levels:
             msg = ValidationWarning("Power level %s not supported" % mem.power)
             msgs.append(msg)
 
-        if self.valid_tuning_steps and not self.has_nostep_tuning:
+        if rf.valid_tuning_steps and not rf.has_nostep_tuning:
             try:
                 step = required_step(mem.freq)
-                if step not in self.valid_tuning_steps:
+                if step not in self.tuning_steps and \
+                        step not in rf.valid_tuning_steps:
                     msg = ValidationError("Frequency requires %.2fkHz step" %
-                                          required_step(mem.freq))
+                                          step)
                     msgs.append(msg)
             except errors.InvalidDataError, e:
                 msgs.append(str(e))
 
-        if self.valid_characters:
+        if rf.valid_characters:
             for char in mem.name:
-                if char not in self.valid_characters:
+                if char not in self.characters:
                     msgs.append(ValidationWarning("Name character " +
                                                   "`%s'" % char +
                                                   " not supported"))
@@ -1055,8 +1239,19 @@ class Radio(Alias):
         self.set_memory(mem)
 
     def get_memories(self, lo=None, hi=None):
-        """Get all the memories between @lo and @hi"""
-        pass
+        """Return an iterator of the memories from @lo to @hi, inclusive.
+        Either bound defaults to the end of the radio's memory_bounds.
+        Drivers that can decode a range of memories more cheaply than
+        one at a time should override this"""
+        if lo is None or hi is None:
+            bounds = self.get_features().memory_bounds
+            if lo is None:
+                lo = bounds[0]
+            if hi is None:
+                hi = bounds[1]
+
+        for number in range(lo, hi + 1):
+            yield self.get_memory(number)
 
     def set_memory(self, memory):
         """Set the memory object @memory"""
@@ -1077,12 +1272,7 @@ class Radio(Alias):
 
     def filter_name(self, name):
         """Filter @name to just the length and characters supported"""
-        rf = self.get_features()
-        if rf.valid_characters == rf.valid_characters.upper():
-            # Radio only supports uppercase, so help out here
-            name = name.upper()
-        return "".join([x for x in name[:rf.valid_name_length]
-                        if x in rf.valid_characters])
+        return self.get_features().filter_name(name)
 
     def get_sub_devices(self):
         """Return a list of sub-device Radio objects, if
@@ -1095,6 +1285,15 @@ class Radio(Alias):
         rf = self.get_features()
         return rf.validate_memory(mem)
 
+    def validate_memories(self, memories):
+        """Return a list of the validate_memory() results for each of
+        @memories, getting the radio's features only once unless the
+        driver validates memories itself"""
+        if self.__class__.validate_memory.im_func is not \
+                Radio.validate_memory.im_func:
+            return [self.validate_memory(mem) for mem in memories]
+        return self.get_features().validate_memories(memories)
+
     def get_settings(self):
         """Returns a RadioSettings list containing one or more
         RadioSettingGroup or RadioSetting objects. These represent general
@@ -1112,6 +1311,37 @@ class Radio(Alias):
         pass
 
 
+MAPPED_IMAGES = False
+
+
+def enable_mapped_images():
+    """Set the global flag MAPPED_IMAGES=True, which makes file-backed
+    radios map their image files copy-on-write instead of reading them
+    into memory"""
+    global MAPPED_IMAGES
+    if not MAPPED_IMAGES:
+        LOG.info("mapped image files enabled")
+    MAPPED_IMAGES = True
+
+
+def _replace_file(src, dst):
+    """Rename @src to @dst, replacing any existing @dst"""
+    if os.name != "nt" or not os.path.exists(dst):
+        os.rename(src, dst)
+        return
+
+    # Windows will not rename over an existing file, so move it aside
+    # first, and back again if the new one can not be put in its place
+    backup = "%s.%i.bak" % (dst, os.getpid())
+    os.rename(dst, backup)
+    try:
+        os.rename(src, dst)
+    except OSError:
+        os.rename(backup, dst)
+        raise
+    os.remove(backup)
+
+
 class FileBackedRadio(Radio):
     """A file-backed radio stores its data in a file"""
     FILE_EXTENSION = "img"
@@ -1134,6 +1364,17 @@ class FileBackedRadio(Radio):
         """Process a newly-loaded or downloaded memory map"""
         pass
 
+    @classmethod
+    def match_hints(cls):
+        """Returns a tuple of (sizes, magic) describing every image that
+        match_model() can accept, so that image detection can skip this
+        class for most files. @sizes is a list of image sizes (or None
+        if unknown) and @magic is a list of (offset, bytes) that the
+        image must contain. Drivers overriding match_model() should
+        override this too; the hints are ignored for subclasses that
+        override match_model() again."""
+        return None, []
+
     @classmethod
     def _strip_metadata(cls, raw_data):
         try:
@@ -1167,33 +1408,68 @@ class FileBackedRadio(Radio):
              'chirp_version': CHIRP_VERSION,
              }))
 
+    def _map_image(self, filename):
+        """Map @filename (see enable_mapped_images()), returning the
+        memory map of the image and any metadata that follows it"""
+        with open(filename, "rb") as mapfile:
+            raw = mmap.mmap(mapfile.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            idx = raw.find(self.MAGIC)
+            if idx < 0:
+                return memmap.MappedMemoryMap(filename), None
+            _data, metadata = self._strip_metadata(raw[idx:])
+        finally:
+            raw.close()
+
+        if idx == 0:
+            return memmap.MemoryMap(""), metadata
+        return memmap.MappedMemoryMap(filename, idx), metadata
+
     def load_mmap(self, filename):
         """Load the radio's memory map from @filename"""
-        mapfile = file(filename, "rb")
-        data = mapfile.read()
-        if self.MAGIC in data:
-            data, self._metadata = self._strip_metadata(data)
+        metadata = None
+        if MAPPED_IMAGES and os.path.getsize(filename):
+            self._mmap, metadata = self._map_image(filename)
+        else:
+            mapfile = file(filename, "rb")
+            data = mapfile.read()
+            mapfile.close()
+            if self.MAGIC in data:
+                data, metadata = self._strip_metadata(data)
+            self._mmap = memmap.MemoryMap(data)
+        if metadata is not None:
+            self._metadata = metadata
             if ('chirp_version' in self._metadata and
                     is_version_newer(self._metadata.get('chirp_version'))):
                 LOG.warning('Image is from version %s but we are %s' % (
                     self._metadata.get('chirp_version'), CHIRP_VERSION))
-        self._mmap = memmap.MemoryMap(data)
-        mapfile.close()
         self.process_mmap()
 
     def save_mmap(self, filename):
         """
-        try to open a file and write to it
+        Write the image to a temporary file and rename it over
+        @filename, so a failed save never leaves a partial image.
         If IOError raise a File Access Error Exception
         """
+        filename = os.path.realpath(filename)
+        tmpname = "%s.%i.tmp" % (filename, os.getpid())
         try:
-            mapfile = file(filename, "wb")
+            mapfile = file(tmpname, "wb")
             mapfile.write(self._mmap.get_packed())
             if filename.lower().endswith(".img"):
                 mapfile.write(self.MAGIC)
                 mapfile.write(self._make_metadata())
             mapfile.close()
-        except IOError:
+            if isinstance(self._mmap, memmap.MappedMemoryMap):
+                # The image may be mapped from @filename, which can not
+                # be replaced on Windows while it is open
+                self._mmap.detach()
+            if os.path.exists(filename):
+                shutil.copymode(filename, tmpname)
+            _replace_file(tmpname, filename)
+        except (IOError, OSError):
+            if os.path.exists(tmpname):
+                os.remove(tmpname)
             raise Exception("File Access Error")
 
     def get_mmap(self):
@@ -1215,6 +1491,14 @@ class CloneModeRadio(FileBackedRadio):
 
     _memsize = 0
 
+    # Set by drivers whose clone protocol writes addressed blocks that the
+    # radio accepts on their own, so that an upload can skip the blocks
+    # that have not changed
+    PARTIAL_UPLOAD = False
+
+    # Set by the user to upload only the changed blocks, where possible
+    upload_changes_only = False
+
     def __init__(self, pipe):
         self.errors = []
         self._mmap = None
@@ -1245,6 +1529,24 @@ class CloneModeRadio(FileBackedRadio):
         # memories of the same size.
         return len(filedata) == cls._memsize
 
+    @classmethod
+    def match_hints(cls):
+        return [cls._memsize], []
+
+    def can_upload_changes(self):
+        """Return True if an upload can be limited to the blocks changed
+        since the image was last transferred to or from the radio"""
+        return self.PARTIAL_UPLOAD and self._mmap is not None and \
+            self._mmap.get_dirty_ranges() is not None
+
+    def upload_block_needed(self, start, end):
+        """Return True if the image from @start to @end must be sent to
+        the radio. That is everything, unless upload_changes_only is set
+        and the driver can upload changes."""
+        if not (self.upload_changes_only and self.can_upload_changes()):
+            return True
+        return self._mmap.is_dirty(start, end)
+
     def sync_in(self):
         "Initiate a radio-to-PC clone operation"
         pass
@@ -1254,9 +1556,235 @@ class CloneModeRadio(FileBackedRadio):
         pass
 
 
+MEMORY_CACHE_DIR = None
+
+
+def set_memory_cache_dir(path):
+    """Save the memory caches of live radios in @path between sessions
+    (or disable with None)"""
+    global MEMORY_CACHE_DIR
+    if path and not os.path.isdir(path):
+        os.makedirs(path)
+    MEMORY_CACHE_DIR = path
+
+
+class MemoryCache(object):
+    """A cache of the Memory objects decoded from a live radio, by number.
+
+    If @filename is given, the cache is loaded from it and save() writes
+    it back. Memories loaded from a previous session are unverified until
+    they are stored again, since the radio may have been changed since.
+    Until then they are only returned by get_unverified_memory(), and the
+    cache otherwise behaves as if they were missing. The memories are
+    stored as JSON, and only rebuilt as Memory classes that are already
+    loaded."""
+    VERSION = 2
+
+    def __init__(self, filename=None):
+        self._filename = filename
+        self._mems = {}
+        self._unverified = {}
+        if filename:
+            self.load()
+
+    def __contains__(self, number):
+        return number in self._mems
+
+    def __getitem__(self, number):
+        return self._mems[number]
+
+    def __setitem__(self, number, mem):
+        self._mems[number] = mem
+        self._unverified.pop(number, None)
+
+    def __delitem__(self, number):
+        self.invalidate(number)
+
+    def __len__(self):
+        return len(self._mems)
+
+    def keys(self):
+        return self._mems.keys()
+
+    def invalidate(self, number):
+        """Forget any cached copy of memory @number"""
+        self._mems.pop(number, None)
+        self._unverified.pop(number, None)
+
+    def clear(self):
+        """Forget all cached memories"""
+        self._mems.clear()
+        self._unverified.clear()
+
+    def is_verified(self, number):
+        """Returns False if @number was loaded from a previous session and
+        has not been read from the radio since"""
+        return number not in self._unverified
+
+    def get_unverified(self):
+        """Return the sorted numbers of the unverified memories"""
+        return sorted(self._unverified)
+
+    def get_unverified_memory(self, number):
+        """Return the unverified copy of memory @number, or None"""
+        return self._unverified.get(number)
+
+    @staticmethod
+    def _encode(value):
+        if isinstance(value, PowerLevel):
+            return {"power": [MemoryCache._encode(str(value)), int(value)]}
+        elif isinstance(value, str):
+            # Memory strings are bytes, which need not be UTF-8
+            return value.decode("latin-1")
+        elif isinstance(value, unicode):
+            return {"unicode": value}
+        elif isinstance(value, tuple):
+            return {"tuple": [MemoryCache._encode(x) for x in value]}
+        elif isinstance(value, list):
+            return [MemoryCache._encode(x) for x in value]
+        elif value is None or isinstance(value, (bool, int, long, float)):
+            return value
+        raise ValueError("Unable to store %r" % value)
+
+    @staticmethod
+    def _decode(value):
+        if isinstance(value, unicode):
+            return value.encode("latin-1")
+        elif isinstance(value, list):
+            return [MemoryCache._decode(x) for x in value]
+        elif not isinstance(value, dict):
+            return value
+        elif "power" in value:
+            label, dBm = value["power"]
+            return PowerLevel(MemoryCache._decode(label), dBm=dBm)
+        elif "unicode" in value:
+            return value["unicode"]
+        elif "tuple" in value:
+            return tuple(MemoryCache._decode(value["tuple"]))
+        raise ValueError("Unknown value %r" % value)
+
+    @staticmethod
+    def _memory_class(name):
+        """Return the Memory class called @name, which must belong to a
+        module that is already loaded"""
+        module, _, clsname = name.rpartition(".")
+        cls = getattr(sys.modules.get(module), clsname, None)
+        try:
+            if issubclass(cls, Memory):
+                return cls
+        except TypeError:
+            pass
+        raise ValueError("%s is not a memory class" % name)
+
+    def load(self):
+        """Load the cache from its file, ignoring one that is missing or
+        unreadable"""
+        try:
+            with open(self._filename, "rb") as f:
+                cache = json.load(f)
+            version = cache["version"]
+            mems = cache["memories"]
+        except IOError:
+            return
+        except Exception, e:
+            LOG.warn("Ignoring corrupt memory cache %s: %s" %
+                     (self._filename, e))
+            return
+        if version != self.VERSION:
+            return
+
+        for number, clsname, attrs in mems:
+            try:
+                number = self._decode(number)
+                mem = self._memory_class(clsname)()
+                for key, value in attrs.items():
+                    mem.__dict__[str(key)] = self._decode(value)
+            except Exception, e:
+                LOG.debug("Ignoring cached memory %s: %s" % (number, e))
+                continue
+            self._unverified[number] = mem
+        LOG.debug("Loaded %i memories from %s" % (len(self._unverified),
+                                                  self._filename))
+
+    def save(self):
+        """Write the cache to its file"""
+        if not self._filename:
+            return
+
+        # Memories with values that can't be stored (such as the extra
+        # settings) are just read again next time
+        mems = []
+        for number, mem in self._unverified.items() + self._mems.items():
+            try:
+                attrs = dict([(k, self._encode(v))
+                              for k, v in mem.__dict__.items()])
+            except ValueError, e:
+                LOG.debug("Not caching memory %s: %s" % (number, e))
+                continue
+            cls = mem.__class__
+            clsname = "%s.%s" % (cls.__module__, cls.__name__)
+            mems.append((self._encode(number), clsname, attrs))
+
+        tmp = "%s.%i.tmp" % (self._filename, os.getpid())
+        try:
+            with open(tmp, "wb") as f:
+                json.dump({"version": self.VERSION, "memories": mems}, f)
+            _replace_file(tmp, self._filename)
+        except (IOError, OSError), e:
+            LOG.warn("Unable to save memory cache %s: %s" %
+                     (self._filename, e))
+
+
 class LiveRadio(Radio):
-    """Base class for all Live-Mode radios"""
-    pass
+    """Base class for all Live-Mode radios
+
+    Drivers may keep the memories they decode in self._memcache, which
+    is saved between sessions if set_memory_cache_dir() has been called.
+    A driver must remove (or replace) the entry for a memory it sets or
+    erases."""
+
+    def __init__(self, pipe):
+        Radio.__init__(self, pipe)
+        self._memcache = MemoryCache(self._get_memory_cache_file())
+
+    def _get_memory_cache_id(self):
+        """Return a string identifying the radio on the other end of the
+        pipe, or None if its memories should not be saved"""
+        port = getattr(self.pipe, "port", None)
+        if not port:
+            return None
+        return "%s_%s_%s_%s" % (self.VENDOR, self.MODEL, self.VARIANT, port)
+
+    def _get_memory_cache_file(self):
+        if not MEMORY_CACHE_DIR:
+            return None
+        radio_id = self._get_memory_cache_id()
+        if not radio_id:
+            return None
+        return os.path.join(MEMORY_CACHE_DIR, "%s.memcache" %
+                            re.sub(r"[^A-Za-z0-9.-]", "_", radio_id))
+
+    def get_unverified_memories(self):
+        """Return the numbers of the cached memories that came from a
+        previous session and have not been read from the radio since"""
+        return self._memcache.get_unverified()
+
+    def get_unverified_memory(self, number):
+        """Return the copy of memory @number cached in a previous session,
+        without reading the radio, or None. It may not match the radio,
+        so it is only for showing until verify_memory() has read it."""
+        return self._memcache.get_unverified_memory(number)
+
+    def verify_memory(self, number):
+        """Read memory @number from the radio again if the cached copy is
+        unverified, and return it"""
+        if not self._memcache.is_verified(number):
+            self._memcache.invalidate(number)
+        return self.get_memory(number)
+
+    def save_memory_cache(self):
+        """Save the memory cache for the next session"""
+        self._memcache.save()
 
 
 class NetworkSourceRadio(Radio):
@@ -1312,6 +1840,7 @@ class Status:
     msg = "Unknown"
     max = 100
     cur = 0
+    rate = None
 
     def __str__(self):
         try:
@@ -1322,7 +1851,19 @@ class Status:
             pct = 0.0
             ticks = "?" * 10
 
-        return "|%-10s| %2.1f%% %s" % (ticks, pct, self.msg)
+        msg = self.msg
+        if self.rate:
+            msg += " (%s)" % format_rate(self.rate)
+
+        return "|%-10s| %2.1f%% %s" % (ticks, pct, msg)
+
+
+def format_rate(rate):
+    """Returns a human-readable string for a transfer @rate in bytes
+    per second"""
+    if rate >= 1024:
+        return "%.1f KB/s" % (rate / 1024.0)
+    return "%i B/s" % rate
 
 
 def is_fractional_step(freq):
@@ -1355,8 +1896,12 @@ def is_8_33(freq):
     return (freq % 25000) in [0, 8330, 16660]
 
 
-def required_step(freq):
-    """Returns the simplest tuning step that is required to reach @freq"""
+# The steps checked by required_step() all divide 25kHz, so the step
+# for a frequency only depends on its remainder from that
+_REQUIRED_STEPS = {}
+
+
+def _required_step(freq):
     if is_5_0(freq):
         return 5.0
     elif is_12_5(freq):
@@ -1368,9 +1913,21 @@ def required_step(freq):
     elif is_8_33(freq):
         return 8.33
     else:
+        return None
+
+
+def required_step(freq):
+    """Returns the simplest tuning step that is required to reach @freq"""
+    remainder = freq % 25000
+    try:
+        step = _REQUIRED_STEPS[remainder]
+    except KeyError:
+        step = _REQUIRED_STEPS[remainder] = _required_step(remainder)
+    if step is None:
         raise errors.InvalidDataError("Unable to calculate the required " +
                                       "tuning step for %i.%5i" %
                                       (freq / 1000000, freq % 1000000))
+    return step
 
 
 def fix_rounded_step(freq):
@@ -14,12 +14,17 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import binascii
+import importlib
+import inspect
+import json
 import os
 import tempfile
 import logging
 
+from chirp import drivers
 from chirp.drivers import icf, rfinder
-from chirp import chirp_common, util, radioreference, errors
+from chirp import chirp_common, util, radioreference, errors, platform
 
 LOG = logging.getLogger(__name__)
 
@@ -53,21 +58,264 @@ def register(cls):
     """Register radio @cls with the directory"""
     global DRV_TO_RADIO
     ident = radio_class_id(cls)
-    if ident in DRV_TO_RADIO.keys():
+    if ident in DRV_TO_RADIO.keys() and ident not in _LAZY_DRIVERS:
         if ALLOW_DUPS:
             LOG.warn("Replacing existing driver id `%s'" % ident)
         else:
             raise Exception("Duplicate radio driver id `%s'" % ident)
+    _unindex_driver(ident)
+    _LAZY_DRIVERS.discard(ident)
     DRV_TO_RADIO[ident] = cls
     RADIO_TO_DRV[cls] = ident
+    _index_driver(_driver_info(ident, cls))
     LOG.info("Registered %s = %s" % (ident, cls.__name__))
 
     return cls
 
 
-DRV_TO_RADIO = {}
+class RadioDirectory(dict):
+    """A mapping of driver id to radio class, which imports the module
+    of a driver listed in the manifest the first time it is looked up"""
+
+    def __getitem__(self, ident):
+        if ident in _LAZY_DRIVERS:
+            _load_driver(ident)
+        return dict.__getitem__(self, ident)
+
+    def get(self, ident, default=None):
+        if ident in self:
+            return self[ident]
+        return default
+
+    def values(self):
+        return [self[ident] for ident in self.keys()]
+
+    def items(self):
+        return [(ident, self[ident]) for ident in self.keys()]
+
+    def itervalues(self):
+        return iter(self.values())
+
+    def iteritems(self):
+        return iter(self.items())
+
+
+DRV_TO_RADIO = RadioDirectory()
 RADIO_TO_DRV = {}
 
+# driver id -> description of the driver, as stored in the manifest
+DRIVER_INFO = {}
+# driver ids that are listed in the manifest but not imported yet
+_LAZY_DRIVERS = set()
+
+# Image detection index, maintained by register():
+#  image size -> driver ids that can only match images of that size
+SIZE_TO_RADIOS = {}
+#  (vendor, model) -> driver ids with that name, or an alias of it
+MODEL_TO_RADIOS = {}
+#  driver ids that give no size hint, and must always be probed
+UNINDEXED_RADIOS = set()
+#  driver id -> [(offset, bytes)] that a matching image must contain
+RADIO_TO_MAGIC = {}
+
+MANIFEST_VERSION = 1
+
+
+def _defining_class(cls, name):
+    for klass in inspect.getmro(cls):
+        if name in klass.__dict__:
+            return klass
+
+
+def _get_match_hints(cls):
+    """Return the match_hints() of @cls, or (None, None) if they were
+    declared for a match_model() that @cls has overridden"""
+    hints_cls = _defining_class(cls, "match_hints")
+    model_cls = _defining_class(cls, "match_model")
+    if model_cls is None or not issubclass(hints_cls, model_cls):
+        return None, None
+    return cls.match_hints()
+
+
+def _driver_info(ident, cls):
+    """Describe radio @cls for the manifest and the detection index"""
+    info = {
+        "ident": ident,
+        "module": cls.__module__,
+        "class": cls.__name__,
+        "vendor": cls.VENDOR,
+        "model": cls.MODEL,
+        "variant": cls.VARIANT,
+        "aliases": [(a.VENDOR, a.MODEL, a.VARIANT) for a in cls.ALIASES],
+        "file_backed": issubclass(cls, chirp_common.FileBackedRadio),
+        "clone": issubclass(cls, chirp_common.CloneModeRadio),
+        "live": issubclass(cls, chirp_common.LiveRadio),
+        "sizes": None,
+        "magic": [],
+    }
+    if info["file_backed"]:
+        sizes, magic = _get_match_hints(cls)
+        info["sizes"] = sizes
+        info["magic"] = magic or []
+    return info
+
+
+def _index_driver(info):
+    """Add the driver described by @info to the image detection index"""
+    ident = info["ident"]
+    DRIVER_INFO[ident] = info
+    if not info["file_backed"]:
+        return
+
+    names = [(info["vendor"], info["model"])]
+    names += [(vendor, model) for vendor, model, _variant in info["aliases"]]
+    for name in names:
+        MODEL_TO_RADIOS.setdefault(name, set()).add(ident)
+
+    if info["sizes"] is None:
+        UNINDEXED_RADIOS.add(ident)
+    else:
+        for size in info["sizes"]:
+            SIZE_TO_RADIOS.setdefault(size, set()).add(ident)
+    if info["magic"]:
+        RADIO_TO_MAGIC[ident] = info["magic"]
+
+
+def _unindex_driver(ident):
+    """Remove driver @ident from the image detection index"""
+    DRIVER_INFO.pop(ident, None)
+    for radios in SIZE_TO_RADIOS.values() + MODEL_TO_RADIOS.values():
+        radios.discard(ident)
+    UNINDEXED_RADIOS.discard(ident)
+    RADIO_TO_MAGIC.pop(ident, None)
+
+
+def _has_magic(ident, filedata):
+    for offset, magic in RADIO_TO_MAGIC.get(ident, []):
+        if offset < 0:
+            offset += len(filedata)
+        if filedata[offset:offset + len(magic)] != magic:
+            return False
+    return True
+
+
+def _load_driver(ident):
+    """Import the module that registers lazily-listed driver @ident"""
+    module = DRIVER_INFO[ident]["module"]
+    LOG.debug("Importing %s for driver %s" % (module, ident))
+    importlib.import_module(module)
+    if ident in _LAZY_DRIVERS:
+        raise Exception("Module %s did not register driver `%s'" % (
+            module, ident))
+
+
+def _driver_modules():
+    """Return a list of (name, path) for every module in chirp.drivers"""
+    module_dir = os.path.dirname(drivers.__file__)
+    return [(name, os.path.join(module_dir, name + ".py"))
+            for name in drivers.__all__]
+
+
+def _manifest_stamp():
+    """Return a value that changes whenever a driver module changes"""
+    stamp = [chirp_common.CHIRP_VERSION]
+    for name, path in _driver_modules():
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        stamp.append([name, st.st_size, int(st.st_mtime)])
+    return stamp
+
+
+def _dump_info(info):
+    info = dict(info)
+    info["magic"] = [(offset, binascii.hexlify(magic))
+                     for offset, magic in info["magic"]]
+    return info
+
+
+def _load_info(info):
+    info = dict((str(k), v) for k, v in info.items())
+    for key in ("ident", "module", "class"):
+        info[key] = str(info[key])
+    info["magic"] = [(offset, binascii.unhexlify(magic))
+                     for offset, magic in info["magic"]]
+    return info
+
+
+def build_manifest():
+    """Import every driver module and return the manifest describing
+    the radios they register"""
+    for name, _path in _driver_modules():
+        importlib.import_module("chirp.drivers.%s" % name)
+
+    return {
+        "version": MANIFEST_VERSION,
+        "stamp": _manifest_stamp(),
+        "drivers": [_dump_info(DRIVER_INFO[ident])
+                    for ident in DRV_TO_RADIO.keys()
+                    if DRIVER_INFO[ident]["module"].startswith(
+                        "chirp.drivers.")],
+    }
+
+
+def _read_manifest(manifest_file):
+    try:
+        with open(manifest_file) as f:
+            manifest = json.load(f)
+    except (IOError, ValueError), e:
+        LOG.debug("Unable to read driver manifest %s: %s" % (
+            manifest_file, e))
+        return None
+
+    if manifest.get("version") != MANIFEST_VERSION or \
+            manifest.get("stamp") != _manifest_stamp():
+        LOG.info("Driver manifest %s is out of date" % manifest_file)
+        return None
+
+    return manifest
+
+
+def _write_manifest(manifest_file, manifest):
+    tmp = "%s.%i.tmp" % (manifest_file, os.getpid())
+    try:
+        with open(tmp, "w") as f:
+            json.dump(manifest, f)
+        if os.name == "nt" and os.path.exists(manifest_file):
+            os.remove(manifest_file)
+        os.rename(tmp, manifest_file)
+    except (IOError, OSError), e:
+        LOG.warn("Unable to write driver manifest %s: %s" % (
+            manifest_file, e))
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def import_drivers(manifest_file=None):
+    """Make every driver in chirp.drivers available in the directory.
+    Drivers are listed from the cached manifest at @manifest_file (by
+    default in the configuration directory), and their modules are
+    only imported once they are looked up. If the manifest is missing
+    or out of date, all of the drivers are imported to rebuild it."""
+    if manifest_file is None:
+        manifest_file = platform.get_platform().config_file(
+            "drivers.manifest")
+
+    manifest = _read_manifest(manifest_file)
+    if manifest is None:
+        _write_manifest(manifest_file, build_manifest())
+        return
+
+    for info in manifest["drivers"]:
+        info = _load_info(info)
+        ident = info["ident"]
+        if ident in DRV_TO_RADIO:
+            continue
+        dict.__setitem__(DRV_TO_RADIO, ident, None)
+        _LAZY_DRIVERS.add(ident)
+        _index_driver(info)
+
 
 def get_radio(driver):
     """Get radio driver class by identification string"""
@@ -137,27 +385,51 @@ def get_radio_by_image(image_file):
     else:
         filedata = ""
 
+    rclass, probe = get_radio_class_by_data(filedata, image_file)
+    LOG.debug("Detected %s as %s by %s" % (image_file, rclass.__name__,
+                                           probe))
+    return rclass(image_file)
+
+
+def get_radio_class_by_data(filedata, image_file):
+    """Return the radio class that owns an image file containing
+    @filedata, along with a description of the probe that matched"""
     data, metadata = chirp_common.FileBackedRadio._strip_metadata(filedata)
 
-    for rclass in DRV_TO_RADIO.values():
-        if not issubclass(rclass, chirp_common.FileBackedRadio):
+    if metadata:
+        # If metadata, then it has to match one of the aliases or the parent
+        vendor = metadata.get('vendor')
+        model = metadata.get('model')
+        candidates = MODEL_TO_RADIOS.get((vendor, model), set())
+    else:
+        candidates = (SIZE_TO_RADIOS.get(len(filedata), set()) |
+                      UNINDEXED_RADIOS)
+
+    # Probe in directory order, so the result is the same as trying
+    # every driver in turn
+    for ident in DRV_TO_RADIO.keys():
+        if ident not in candidates:
             continue
 
-        # If no metadata, we do the old thing
-        if not metadata and rclass.match_model(filedata, image_file):
-            return rclass(image_file)
+        if metadata:
+            rclass = DRV_TO_RADIO[ident]
 
-        # If metadata, then it has to match one of the aliases or the parent
-        for alias in rclass.ALIASES + [rclass]:
-            if (alias.VENDOR == metadata.get('vendor') and
-                    alias.MODEL == metadata.get('model')):
+            class DynamicRadioAlias(rclass):
+                VENDOR = metadata.get('vendor')
+                MODEL = metadata.get('model')
+                VARIANT = metadata.get('variant')
 
-                class DynamicRadioAlias(rclass):
-                    VENDOR = metadata.get('vendor')
-                    MODEL = metadata.get('model')
-                    VARIANT = metadata.get('variant')
+            return DynamicRadioAlias, "metadata"
 
-                return DynamicRadioAlias(image_file)
+        if not _has_magic(ident, filedata):
+            continue
+        rclass = DRV_TO_RADIO[ident]
+        if rclass.match_model(filedata, image_file):
+            if ident in UNINDEXED_RADIOS:
+                probe = "match_model"
+            else:
+                probe = "size %i and match_model" % len(filedata)
+            return rclass, probe
 
     if metadata:
         e = errors.ImageMetadataInvalidModel("Unsupported model %s %s" % (
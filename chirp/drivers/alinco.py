@@ -534,6 +534,10 @@ class DJ175Radio(DRx35Radio):
     def match_model(cls, filedata, filename):
         return len(filedata) == cls._memsize
 
+    @classmethod
+    def match_hints(cls):
+        return [cls._memsize], []
+
     def _get_used(self, number):
         return self._memobj.memory[number].new_used
 
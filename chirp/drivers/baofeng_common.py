@@ -61,6 +61,96 @@ def _rawsend(radio, data):
         raise errors.RadioError("Error sending data to radio")
 
 
+class ClonePacer(object):
+    """Paces the block exchanges of a clone.
+
+    Instead of a fixed sleep after every block, the pause follows how
+    long the radio actually takes to answer (less the time the bytes
+    spend on the wire), and grows again if a block has to be retried.
+    A block whose exchange fails is flushed and retried up to RETRIES
+    times before the error is passed on.
+    """
+
+    DELAY = 0.05
+    MIN_DELAY = 0.005
+    MAX_DELAY = 0.5
+    RETRIES = 2
+    # Bytes of header and acknowledgement around each block
+    OVERHEAD = 10
+
+    def __init__(self, radio):
+        self._radio = radio
+        self._floor = self.MIN_DELAY
+        self._start = time.time()
+        self.delay = self.DELAY
+        self.turnaround = None
+        self.nbytes = 0
+
+    def _wire_time(self, size):
+        baudrate = getattr(self._radio.pipe, "baudrate", None)
+        if not baudrate:
+            return 0
+        # Ten bits per byte with start and stop bits
+        return (size + self.OVERHEAD) * 10.0 / baudrate
+
+    def _answered(self, elapsed, size):
+        turnaround = max(0, elapsed - self._wire_time(size))
+        if self.turnaround is None:
+            self.turnaround = turnaround
+        else:
+            self.turnaround += (turnaround - self.turnaround) / 4
+        self.delay = min(self.MAX_DELAY, max(self._floor, self.turnaround))
+
+    def _failed(self):
+        self._floor = min(self.MAX_DELAY, max(self.delay, self.MIN_DELAY) * 2)
+        self.delay = self._floor
+
+    def _flush(self):
+        timeout = self._radio.pipe.timeout
+        self._radio.pipe.timeout = self.MIN_DELAY
+        junk = self._radio.pipe.read(256)
+        self._radio.pipe.timeout = timeout
+        if junk:
+            LOG.debug("Discarded %i bytes before retry" % len(junk))
+
+    def pause(self):
+        """Wait between two exchanges with the radio"""
+        time.sleep(self.delay)
+
+    def transfer(self, addr, size, func, *args):
+        """Exchange the @size byte block at @addr by calling @func with
+        @args, retrying it if the radio does not answer properly, and
+        return what @func returns"""
+        for attempt in range(self.RETRIES + 1):
+            start = time.time()
+            try:
+                result = func(*args)
+            except errors.RadioError, e:
+                if attempt == self.RETRIES:
+                    raise
+                LOG.warn("Retrying block 0x%04x: %s" % (addr, e))
+                self._failed()
+                self.pause()
+                self._flush()
+                continue
+
+            self._answered(time.time() - start, size)
+            self.nbytes += size
+            self.pause()
+            return result
+
+    def rate(self):
+        """Return the bytes per second transferred so far"""
+        elapsed = time.time() - self._start
+        if not elapsed:
+            return None
+        return self.nbytes / elapsed
+
+    def update_status(self, status):
+        """Set the transfer rate in @status"""
+        status.rate = self.rate()
+
+
 def _make_frame(cmd, addr, length, data=""):
     """Pack the info in the headder format"""
     frame = struct.pack(">BHB", ord(cmd), addr, length)
@@ -92,13 +182,47 @@ def _recv(radio, addr, length):
     return data
 
 
-def _get_radio_firmware_version(radio):
-    msg = struct.pack(">BHB", ord("S"), radio._fw_ver_start,
-                      radio._recv_block_size)
-    radio.pipe.write(msg)
-    block = _recv(radio, radio._fw_ver_start, radio._recv_block_size)
+def _read_block(radio, addr, length, first_command=False):
+    """Request a block from the radio and acknowledge it"""
+    frame = _make_frame("S", addr, length)
+    # DEBUG
+    LOG.info("Request sent:")
+    LOG.debug(util.hexprint(frame))
+
+    # sending the read request
+    _rawsend(radio, frame)
+
+    if radio._ack_block and not first_command:
+        ack = _rawrecv(radio, 1)
+        if ack != "\x06":
+            raise errors.RadioError(
+                "Radio refused to send block 0x%04x" % addr)
+
+    # now we read
+    data = _recv(radio, addr, length)
+
     _rawsend(radio, "\x06")
-    time.sleep(0.05)
+
+    return data
+
+
+def _write_block(radio, addr, data):
+    """Send a block to the radio and check that it was accepted"""
+    frame = _make_frame("X", addr, len(data), data)
+
+    _rawsend(radio, frame)
+
+    # receiving the response
+    ack = _rawrecv(radio, 1)
+    if ack != "\x06":
+        msg = "Bad ack writing block 0x%04x" % addr
+        raise errors.RadioError(msg)
+
+
+def _get_radio_firmware_version(radio, pacer):
+    block = pacer.transfer(radio._fw_ver_start, radio._recv_block_size,
+                           _read_block, radio, radio._fw_ver_start,
+                           radio._recv_block_size, True)
     version = block[0:16]
     return version
 
@@ -178,8 +302,10 @@ def _download(radio):
     # put radio in program mode
     ident = _ident_radio(radio)
 
+    pacer = ClonePacer(radio)
+
     # identify radio
-    radio_ident = _get_radio_firmware_version(radio)
+    radio_ident = _get_radio_firmware_version(radio, pacer)
     LOG.info("Radio firmware version:")
     LOG.debug(util.hexprint(radio_ident))
 
@@ -202,25 +328,8 @@ def _download(radio):
 
     data = ""
     for addr in range(0, radio._mem_size, radio._recv_block_size):
-        frame = _make_frame("S", addr, radio._recv_block_size)
-        # DEBUG
-        LOG.info("Request sent:")
-        LOG.debug(util.hexprint(frame))
-
-        # sending the read request
-        _rawsend(radio, frame)
-
-        if radio._ack_block:
-            ack = _rawrecv(radio, 1)
-            if ack != "\x06":
-                raise errors.RadioError(
-                    "Radio refused to send block 0x%04x" % addr)
-
-        # now we read
-        d = _recv(radio, addr, radio._recv_block_size)
-
-        _rawsend(radio, "\x06")
-        time.sleep(0.05)
+        d = pacer.transfer(addr, radio._recv_block_size, _read_block,
+                           radio, addr, radio._recv_block_size)
 
         # aggregate the data
         data += d
@@ -228,6 +337,7 @@ def _download(radio):
         # UI Update
         status.cur = addr / radio._recv_block_size
         status.msg = "Cloning from radio..."
+        pacer.update_status(status)
         radio.status_fn(status)
 
     data += ident
@@ -240,8 +350,10 @@ def _upload(radio):
     # put radio in program mode
     _ident_radio(radio)
 
+    pacer = ClonePacer(radio)
+
     # identify radio
-    radio_ident = _get_radio_firmware_version(radio)
+    radio_ident = _get_radio_firmware_version(radio, pacer)
     LOG.info("Radio firmware version:")
     LOG.debug(util.hexprint(radio_ident))
     # identify image
@@ -273,23 +385,18 @@ def _upload(radio):
     # the fun start here
     for start, end in _ranges:
         for addr in range(start, end, radio._send_block_size):
+            if not radio.upload_block_needed(
+                    addr, addr + radio._send_block_size):
+                continue
+
             # sending the data
             data = radio.get_mmap()[addr:addr + radio._send_block_size]
-
-            frame = _make_frame("X", addr, radio._send_block_size, data)
-
-            _rawsend(radio, frame)
-            time.sleep(0.05)
-
-            # receiving the response
-            ack = _rawrecv(radio, 1)
-            if ack != "\x06":
-                msg = "Bad ack writing block 0x%04x" % addr
-                raise errors.RadioError(msg)
+            pacer.transfer(addr, len(data), _write_block, radio, addr, data)
 
             # UI Update
             status.cur = addr / radio._send_block_size
             status.msg = "Cloning to radio..."
+            pacer.update_status(status)
             radio.status_fn(status)
 
 
@@ -313,6 +420,7 @@ class BaofengCommonHT(chirp_common.CloneModeRadio,
     VENDOR = "Baofeng"
     MODEL = ""
     IDENT = ""
+    PARTIAL_UPLOAD = True
 
     def sync_in(self):
         """Download from radio"""
@@ -328,6 +436,7 @@ class BaofengCommonHT(chirp_common.CloneModeRadio,
             raise errors.RadioError('Unexpected error communicating '
                                     'with the radio')
         self._mmap = memmap.MemoryMap(data)
+        self._mmap.clear_dirty()
         self.process_mmap()
 
     def sync_out(self):
@@ -342,6 +451,7 @@ class BaofengCommonHT(chirp_common.CloneModeRadio,
             LOG.exception('Unexpected error during upload')
             raise errors.RadioError('Unexpected error communicating '
                                     'with the radio')
+        self._mmap.clear_dirty()
                                     
     def get_features(self):
         """Get the radio's features"""
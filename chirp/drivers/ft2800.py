@@ -279,3 +279,7 @@ class FT2800Radio(YaesuCloneModeRadio):
     @classmethod
     def match_model(cls, filedata, filename):
         return len(filedata) == cls._memsize
+
+    @classmethod
+    def match_hints(cls):
+        return [cls._memsize], []
@@ -1221,6 +1221,10 @@ class FT2900Radio(YaesuCloneModeRadio):
     def match_model(cls, filedata, filename):
         return len(filedata) == cls._memsize
 
+    @classmethod
+    def match_hints(cls):
+        return [cls._memsize], []
+
     @classmethod
     def get_prompts(cls):
         rp = chirp_common.RadioPrompts()
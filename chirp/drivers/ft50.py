@@ -578,6 +578,10 @@ class FT50Radio(yaesu_clone.YaesuCloneModeRadio):
     def match_model(cls, filedata, filename):
         return len(filedata) == cls._memsize
 
+    @classmethod
+    def match_hints(cls):
+        return [cls._memsize], []
+
     def sync_out(self):
         self.update_checksums()
         return _clone_out(self)
@@ -26,8 +26,6 @@ from chirp.settings import RadioSetting, RadioSettingGroup, \
     RadioSettingValueBoolean, RadioSettingValueString, \
     RadioSettings
 
-from collections import defaultdict
-
 LOG = logging.getLogger(__name__)
 
 ACK = chr(0x06)
@@ -448,19 +446,10 @@ class FTx800Radio(yaesu_clone.YaesuCloneModeRadio):
 
 class FT7800BankModel(chirp_common.BankModel):
     """Yaesu FT-7800/7900 bank model"""
-    def __init__(self, radio):
-        super(FT7800BankModel, self).__init__(radio)
-        self.__b2m_cache = defaultdict(list)
-        self.__m2b_cache = defaultdict(list)
-
-    def __precache(self):
-        if self.__b2m_cache:
-            return
-
+    def _load_index(self, index):
         for bank in self.get_mappings():
-            self.__b2m_cache[bank.index] = self._get_bank_memories(bank)
-            for memnum in self.__b2m_cache[bank.index]:
-                self.__m2b_cache[memnum].append(bank.index)
+            for memnum in self._get_bank_memories(bank):
+                index.add(memnum, bank.get_index())
 
     def get_num_mappings(self):
         return 20
@@ -475,18 +464,13 @@ class FT7800BankModel(chirp_common.BankModel):
         return banks
 
     def add_memory_to_mapping(self, memory, bank):
-        self.__precache()
-
         index = memory.number - 1
         _bitmap = self._radio._memobj.bank_channels[bank.index]
         ishft = 31 - (index % 32)
         _bitmap.bitmap[index / 32] |= (1 << ishft)
-        self.__m2b_cache[memory.number].append(bank.index)
-        self.__b2m_cache[bank.index].append(memory.number)
+        self._index_add(memory, bank)
 
     def remove_memory_from_mapping(self, memory, bank):
-        self.__precache()
-
         index = memory.number - 1
         _bitmap = self._radio._memobj.bank_channels[bank.index]
         ishft = 31 - (index % 32)
@@ -495,8 +479,7 @@ class FT7800BankModel(chirp_common.BankModel):
                             "not in bank {bank}".format(num=memory.number,
                                                         bank=bank))
         _bitmap.bitmap[index / 32] &= ~(1 << ishft)
-        self.__b2m_cache[bank.index].remove(memory.number)
-        self.__m2b_cache[memory.number].remove(bank.index)
+        self._index_remove(memory, bank)
 
     def _get_bank_memories(self, bank):
         memories = []
@@ -510,16 +493,10 @@ class FT7800BankModel(chirp_common.BankModel):
         return memories
 
     def get_mapping_memories(self, bank):
-        self.__precache()
-
-        return [self._radio.get_memory(n)
-                for n in self.__b2m_cache[bank.index]]
+        return self._get_indexed_memories(bank)
 
     def get_memory_mappings(self, memory):
-        self.__precache()
-
-        _banks = self.get_mappings()
-        return [_banks[b] for b in self.__m2b_cache[memory.number]]
+        return self._get_indexed_mappings(memory)
 
 
 @directory.register
@@ -755,6 +755,10 @@ class FT817Radio(yaesu_clone.YaesuCloneModeRadio):
     def match_model(cls, filedata, filename):
         return len(filedata) == cls._memsize
 
+    @classmethod
+    def match_hints(cls):
+        return [cls._memsize], []
+
     def get_settings(self):
         _settings = self._memobj.settings
         basic = RadioSettingGroup("basic", "Basic")
@@ -213,6 +213,10 @@ struct  {
     def match_model(cls, filedata, filename):
         return len(filedata) == cls._memsize
 
+    @classmethod
+    def match_hints(cls):
+        return [cls._memsize], []
+
     def get_features(self):
         rf = chirp_common.RadioFeatures()
         rf.has_settings = True
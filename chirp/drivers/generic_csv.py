@@ -46,6 +46,106 @@ def write_memory(writer, mem):
     writer.writerow(mem.to_csv())
 
 
+def write_memories(filename, memories):
+    """Write the non-empty memories from the iterable @memories to a
+    CSV file called @filename, one at a time"""
+    f = file(filename, "wb")
+    try:
+        writer = csv.writer(f, delimiter=chirp_common.SEPCHAR)
+        writer.writerow(chirp_common.Memory.CSV_FORMAT)
+        for mem in memories:
+            write_memory(writer, mem)
+    finally:
+        f.close()
+
+
+def _same_file(path1, path2):
+    def norm(path):
+        return os.path.normcase(os.path.realpath(path))
+    return norm(path1) == norm(path2)
+
+
+class CSVReader(object):
+    """Reads the lines of a CSV file one at a time, keeping track of
+    where each starts so that it can be read again later.
+
+    The file is only held open while it is first read, and is opened
+    again for each later read or run of reads between hold() and close().
+    Those fail if the file has changed since, as the offsets would no
+    longer be right."""
+
+    def __init__(self, filename):
+        self.filename = filename
+        self._stat = None
+        self._file = self._open()
+        try:
+            self.header = self._reader(self._file).next()
+        except StopIteration:
+            self.header = []
+
+    def _open(self):
+        f = file(self.filename, "rU")
+        st = os.fstat(f.fileno())
+        stat = (st.st_size, st.st_mtime)
+        if self._stat is None:
+            self._stat = stat
+        elif stat != self._stat:
+            f.close()
+            raise errors.RadioError("%s has changed since it was loaded" %
+                                    self.filename)
+        return f
+
+    @staticmethod
+    def _reader(f):
+        def lines():
+            # Read a line at a time so that the file position always
+            # matches what the csv module has consumed
+            while True:
+                line = f.readline()
+                if not line:
+                    return
+                yield line
+        return csv.reader(lines(), delimiter=chirp_common.SEPCHAR,
+                          quotechar='"')
+
+    def lines(self):
+        """Generate (offset, fields) for each line after the header, and
+        close the file once they have all been read"""
+        reader = self._reader(self._file)
+        try:
+            while True:
+                offset = self._file.tell()
+                try:
+                    line = reader.next()
+                except StopIteration:
+                    return
+                yield offset, line
+        finally:
+            self.close()
+
+    def read_line(self, offset):
+        """Return the fields of the line starting at @offset"""
+        if self._file:
+            self._file.seek(offset)
+            return self._reader(self._file).next()
+        f = self._open()
+        try:
+            f.seek(offset)
+            return self._reader(f).next()
+        finally:
+            f.close()
+
+    def hold(self):
+        """Keep the file open for read_line() until close()"""
+        if not self._file:
+            self._file = self._open()
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+
 @directory.register
 class CSVRadio(chirp_common.FileBackedRadio, chirp_common.IcomDstarSupport):
     """A driver for Generic CSV files"""
@@ -75,16 +175,19 @@ class CSVRadio(chirp_common.FileBackedRadio, chirp_common.IcomDstarSupport):
 
     def _blank(self):
         self.errors = []
-        self.memories = []
-        for i in range(0, 1000):
-            mem = chirp_common.Memory()
-            mem.number = i
-            mem.empty = True
-            self.memories.append(mem)
+        # Slots are None until a memory is set, or read from the file
+        # at self._index[number]
+        self.memories = [None] * 1000
+        self._index = {}
+        if self._reader:
+            self._reader.close()
+            self._reader = None
 
     def __init__(self, pipe):
         chirp_common.FileBackedRadio.__init__(self, None)
         self.memories = []
+        self._index = {}
+        self._reader = None
         self.file_has_rTone = None  # Set in load(), used in _clean_tmode()
         self.file_has_cTone = None
 
@@ -139,6 +242,24 @@ class CSVRadio(chirp_common.FileBackedRadio, chirp_common.IcomDstarSupport):
 
         return mem
 
+    def _parse_location(self, headers, line):
+        """Return the location of a CSV line without parsing the rest"""
+        mem = chirp_common.Memory()
+        for header, (typ, attr) in self.ATTR_MAP.items():
+            if attr != "number":
+                continue
+            try:
+                val = get_datum_by_header(headers, line, header)
+            except OmittedHeaderError:
+                continue
+            if val:
+                mem.number = typ(val)
+            else:
+                mem.number = None
+        if hasattr(self, "_clean_number"):
+            mem = self._clean_number(headers, line, mem)
+        return mem.number
+
     def _parse_csv_data_line(self, headers, line):
         mem = chirp_common.Memory()
         try:
@@ -176,21 +297,18 @@ class CSVRadio(chirp_common.FileBackedRadio, chirp_common.IcomDstarSupport):
 
         self._blank()
 
-        f = file(self._filename, "rU")
-        header = f.readline().strip()
-
-        f.seek(0, 0)
-        reader = csv.reader(f, delimiter=chirp_common.SEPCHAR, quotechar='"')
+        # Only the location and offset of each line are read here, once
+        # one line has parsed to show the file is readable; get_memory()
+        # parses the rest when it is needed
+        self._reader = CSVReader(self._filename)
+        header = self._reader.header
+        self.file_has_rTone = "rToneFreq" in header
+        self.file_has_cTone = "cToneFreq" in header
 
         good = 0
-        lineno = 0
-        for line in reader:
+        lineno = 1
+        for offset, line in self._reader.lines():
             lineno += 1
-            if lineno == 1:
-                header = line
-                self.file_has_rTone = "rToneFreq" in header
-                self.file_has_cTone = "cToneFreq" in header
-                continue
 
             if len(header) > len(line):
                 LOG.error("Line %i has %i columns, expected %i",
@@ -199,23 +317,40 @@ class CSVRadio(chirp_common.FileBackedRadio, chirp_common.IcomDstarSupport):
                                    lineno)
                 continue
 
+            mem = None
             try:
-                mem = self._parse_csv_data_line(header, line)
-                if mem.number is None:
-                    raise Exception("Invalid Location field" % lineno)
+                if good:
+                    number = self._parse_location(header, line)
+                else:
+                    mem = self._parse_csv_data_line(header, line)
+                    number = mem.number
+                if number is None:
+                    raise Exception("Invalid Location field")
             except Exception, e:
                 LOG.error("Line %i: %s", lineno, e)
                 self.errors.append("Line %i: %s" % (lineno, e))
                 continue
 
-            self._grow(mem.number)
-            self.memories[mem.number] = mem
+            self._grow(number)
+            self.memories[number] = mem
+            if mem is None:
+                self._index[number] = offset
             good += 1
 
         if not good:
             LOG.error(self.errors)
             raise errors.InvalidDataError("No channels found")
 
+    def _load_all(self):
+        """Parse every memory still only in the file, and forget it"""
+        self._reader.hold()
+        for number in list(self._index):
+            if self.memories[number] is None:
+                self.memories[number] = self._read_memory(number)
+        self._index = {}
+        self._reader.close()
+        self._reader = None
+
     def save(self, filename=None):
         if filename is None and self._filename is None:
             raise errors.RadioError("Need a location to save to")
@@ -223,14 +358,12 @@ class CSVRadio(chirp_common.FileBackedRadio, chirp_common.IcomDstarSupport):
         if filename:
             self._filename = filename
 
-        f = file(self._filename, "wb")
-        writer = csv.writer(f, delimiter=chirp_common.SEPCHAR)
-        writer.writerow(chirp_common.Memory.CSV_FORMAT)
-
-        for mem in self.memories:
-            write_memory(writer, mem)
+        if self._reader and _same_file(self._reader.filename,
+                                       self._filename):
+            # Overwriting the file we read from
+            self._load_all()
 
-        f.close()
+        write_memories(self._filename, self.get_memories())
 
     # MMAP compatibility
     def save_mmap(self, filename):
@@ -239,12 +372,56 @@ class CSVRadio(chirp_common.FileBackedRadio, chirp_common.IcomDstarSupport):
     def load_mmap(self, filename):
         return self.load(filename)
 
-    def get_memories(self, lo=0, hi=999):
-        return [x for x in self.memories if x.number >= lo and x.number <= hi]
+    def _read_memory(self, number):
+        mem = self.memories[number]
+        if mem is not None:
+            return mem
+
+        if number not in self._index:
+            mem = chirp_common.Memory()
+            mem.number = number
+            mem.empty = True
+            return mem
+
+        line = self._reader.read_line(self._index[number])
+        try:
+            mem = self._parse_csv_data_line(self._reader.header, line)
+        except Exception, e:
+            # Treat the line as missing, as if it had failed to load
+            LOG.error("Location %i: %s", number, e)
+            self.errors.append("Location %i: %s" % (number, e))
+            del self._index[number]
+            return self._read_memory(number)
+        # The location may have been assigned while loading
+        mem.number = number
+        return mem
+
+    def _is_empty(self, number):
+        mem = self.memories[number]
+        if mem is None:
+            return number not in self._index
+        return mem.empty
+
+    def get_memories(self, lo=None, hi=None):
+        if lo is None:
+            lo = 0
+        if hi is None:
+            hi = len(self.memories) - 1
+        if self._reader:
+            self._reader.hold()
+        try:
+            for number in range(max(lo, 0),
+                                min(hi + 1, len(self.memories))):
+                yield self._read_memory(number)
+        finally:
+            if self._reader:
+                self._reader.close()
 
     def get_memory(self, number):
         try:
-            return self.memories[number]
+            return self._read_memory(number)
+        except errors.RadioError:
+            raise
         except:
             raise errors.InvalidMemoryLocation("No such memory %s" % number)
 
@@ -255,11 +432,7 @@ class CSVRadio(chirp_common.FileBackedRadio, chirp_common.IcomDstarSupport):
 
         delta += 1
 
-        for i in range(len(self.memories), len(self.memories) + delta + 1):
-            mem = chirp_common.Memory()
-            mem.empty = True
-            mem.number = i
-            self.memories.append(mem)
+        self.memories.extend([None] * (delta + 1))
 
     def set_memory(self, newmem):
         self._grow(newmem.number)
@@ -274,7 +447,7 @@ class CSVRadio(chirp_common.FileBackedRadio, chirp_common.IcomDstarSupport):
     def get_raw_memory(self, number):
         return ",".join(chirp_common.Memory.CSV_FORMAT) + \
             os.linesep + \
-            ",".join(self.memories[number].to_csv())
+            ",".join(self.get_memory(number).to_csv())
 
     @classmethod
     def match_model(cls, filedata, filename):
@@ -311,9 +484,9 @@ class CommanderCSVRadio(CSVRadio):
 
     def _clean_number(self, headers, line, mem):
         if mem.number == 0:
-            for memory in self.memories:
-                if memory.empty:
-                    mem.number = memory.number
+            for number in range(len(self.memories)):
+                if self._is_empty(number):
+                    mem.number = number
                     break
         return mem
 
@@ -88,6 +88,7 @@ class XMLRadio(chirp_common.FileBackedRadio, chirp_common.IcomDstarSupport):
             radio.newChild(None, "memories", None)
             radio.newChild(None, "banks", None)
             radio.newProp("version", "0.1.1")
+        self._index = xml_ll.index_memories(self.doc)
 
     def get_features(self):
         rf = chirp_common.RadioFeatures()
@@ -110,6 +111,7 @@ class XMLRadio(chirp_common.FileBackedRadio, chirp_common.IcomDstarSupport):
 
         self.doc = libxml2.parseFile(self._filename)
         validate_doc(self.doc)
+        self._index = xml_ll.index_memories(self.doc)
 
     def save(self, filename=None):
         if not self._filename and not filename:
@@ -118,30 +120,25 @@ class XMLRadio(chirp_common.FileBackedRadio, chirp_common.IcomDstarSupport):
         if filename:
             self._filename = filename
 
-        f = file(self._filename, "w")
-        f.write(self.doc.serialize(format=1))
-        f.close()
+        # Let libxml2 write the document out as it goes, rather than
+        # building the whole thing as a string first
+        if self.doc.saveFormatFile(self._filename, 1) < 0:
+            raise errors.RadioError("Unable to save %s" % self._filename)
 
     def get_memories(self, lo=0, hi=999):
-        mems = []
-        for i in range(lo, hi):
-            try:
-                mems.append(xml_ll.get_memory(self.doc, i))
-            except errors.InvalidMemoryLocation:
-                pass
-
-        return mems
+        return [xml_ll.get_memory(self.doc, i, self._index)
+                for i in sorted(self._index.keys()) if lo <= i <= hi]
 
     def get_memory(self, number):
-        mem = xml_ll.get_memory(self.doc, number)
+        mem = xml_ll.get_memory(self.doc, number, self._index)
 
         return mem
 
     def set_memory(self, mem):
-        xml_ll.set_memory(self.doc, mem)
+        xml_ll.set_memory(self.doc, mem, self._index)
 
     def erase_memory(self, number):
-        xml_ll.del_memory(self.doc, number)
+        xml_ll.del_memory(self.doc, number, self._index)
 
     @classmethod
     def match_model(cls, _filedata, filename):
@@ -102,7 +102,6 @@ class IC9xRadio(icf.IcomLiveRadio):
         if self.pipe:
             self.pipe.timeout = 0.1
 
-        self.__memcache = {}
         self.__bankcache = {}
 
         global LOCK
@@ -125,8 +124,8 @@ class IC9xRadio(icf.IcomLiveRadio):
         if number < -2 or number > 999:
             raise errors.InvalidValueError("Number must be between 0 and 999")
 
-        if number in self.__memcache:
-            return self.__memcache[number]
+        if number in self._memcache:
+            return self._memcache[number]
 
         self._lock.acquire()
         try:
@@ -149,7 +148,7 @@ class IC9xRadio(icf.IcomLiveRadio):
             mem.immutable = ["number", "skip", "bank", "bank_index",
                              "extd_number"]
 
-        self.__memcache[mem.number] = mem
+        self._memcache[mem.number] = mem
 
         return mem
 
@@ -199,13 +198,14 @@ class IC9xRadio(icf.IcomLiveRadio):
         else:
             if isinstance(_memory, chirp_common.DVMemory):
                 memory = ic9x_ll.IC9xDVMemory()
-                memory.clone(self.get_memory(_memory.number))
+                memory.clone(self.verify_memory(_memory.number))
             else:
                 memory = ic9x_ll.IC9xMemory()
-                memory.clone(self.get_memory(_memory.number))
+                memory.clone(self.verify_memory(_memory.number))
 
             memory.clone(_memory)
 
+        self._memcache.invalidate(memory.number)
         self._lock.acquire()
         self._maybe_send_magic()
         try:
@@ -220,7 +220,7 @@ class IC9xRadio(icf.IcomLiveRadio):
 
         self._lock.release()
 
-        self.__memcache[memory.number] = memory
+        self._memcache[memory.number] = memory
 
     def _ic9x_get_banks(self):
         if len(self.__bankcache.keys()) == 26:
@@ -13,12 +13,13 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import binascii
 import struct
 import re
 import time
 import logging
 
-from chirp import chirp_common, errors, util, memmap
+from chirp import bufops, chirp_common, errors, util, memmap
 from chirp.settings import RadioSetting, RadioSettingGroup, \
     RadioSettingValueBoolean, RadioSettings
 
@@ -59,6 +60,25 @@ class IcfFrame:
         pass
 
 
+class CloneStats:
+    """Tracks how fast a clone is going, for status updates"""
+    def __init__(self):
+        self.start = time.time()
+        self.nbytes = 0
+
+    def update(self, status, nbytes=0):
+        """Count @nbytes more bytes of memory transferred and set the
+        resulting rate in @status"""
+        self.nbytes += nbytes
+        elapsed = time.time() - self.start
+        if elapsed:
+            status.rate = self.nbytes / elapsed
+
+    def log(self):
+        elapsed = time.time() - self.start
+        LOG.debug("Cloned %i bytes in %.1f seconds" % (self.nbytes, elapsed))
+
+
 def parse_frame_generic(data):
     """Parse an ICF frame of unknown type from the beginning of @data"""
     frame = IcfFrame()
@@ -280,7 +300,16 @@ def _clone_from_radio(radio):
     addr = 0
     _mmap = memmap.MemoryMap(chr(0x00) * radio.get_memsize())
     last_size = 0
-    while True:
+    stats = CloneStats()
+    status = chirp_common.Status()
+    status.msg = "Cloning from radio"
+    status.max = radio.get_memsize()
+    # Decoding a batch of frames takes far less time than the radio takes
+    # to send the next one, which the serial driver buffers meanwhile, so
+    # reading is not done in parallel. The clone is over at the end
+    # frame, without waiting for a read to time out.
+    done = False
+    while not done:
         frames = stream.get_frames()
         if not frames:
             break
@@ -295,18 +324,19 @@ def _clone_from_radio(radio):
                 if addr != src:
                     LOG.debug("ICF GAP %04x - %04x" % (addr, src))
                 addr = dst
+                stats.nbytes += dst - src
             elif frame.cmd == CMD_CLONE_END:
                 LOG.debug("End frame (%i):\n%s" %
                           (len(frame.payload), util.hexprint(frame.payload)))
                 LOG.debug("Last addr: %04x" % addr)
+                done = True
 
         if radio.status_fn:
-            status = chirp_common.Status()
-            status.msg = "Cloning from radio"
-            status.max = radio.get_memsize()
             status.cur = addr
+            stats.update(status)
             radio.status_fn(status)
 
+    stats.log()
     return _mmap
 
 
@@ -318,8 +348,9 @@ def clone_from_radio(radio):
         raise errors.RadioError("Failed to communicate with the radio: %s" % e)
 
 
-def send_mem_chunk(radio, start, stop, bs=32):
-    """Send a single chunk of the radio's memory from @start-@stop"""
+def send_mem_chunk(radio, start, stop, bs=32, stats=None):
+    """Send a single chunk of the radio's memory from @start-@stop,
+    counting what is sent in @stats if provided"""
     _mmap = radio.get_mmap()
 
     status = chirp_common.Status()
@@ -332,6 +363,9 @@ def send_mem_chunk(radio, start, stop, bs=32):
         else:
             size = stop - i
 
+        if not radio.upload_block_needed(i, i + size):
+            continue
+
         if radio.get_memsize() >= 0x10000:
             chunk = struct.pack(">IB", i, size)
         else:
@@ -344,6 +378,8 @@ def send_mem_chunk(radio, start, stop, bs=32):
                          raw=False,
                          checksum=True)
 
+        if stats:
+            stats.update(status, size)
         if radio.status_fn:
             status.cur = i+bs
             radio.status_fn(status)
@@ -375,11 +411,13 @@ def _clone_to_radio(radio):
         send_clone_frame(radio, CMD_CLONE_IN, radio.get_model(), raw=True)
 
     frames = []
+    stats = CloneStats()
 
     for start, stop, bs in radio.get_ranges():
-        if not send_mem_chunk(radio, start, stop, bs):
+        if not send_mem_chunk(radio, start, stop, bs, stats):
             break
         frames += stream.get_frames()
+    stats.log()
 
     send_clone_frame(radio, CMD_CLONE_END, radio.get_endframe(), raw=True)
 
@@ -529,6 +567,11 @@ class IcomBankModel(chirp_common.BankModel):
 
     def add_memory_to_mapping(self, memory, bank):
         self._radio._set_bank(memory.number, bank.index)
+        if self._mapping_index is not None:
+            # A memory is only ever in one bank
+            for old_bank in self._mapping_index.get_mappings(memory.number):
+                self._mapping_index.remove(memory.number, old_bank)
+        self._index_add(memory, bank)
 
     def remove_memory_from_mapping(self, memory, bank):
         if self._radio._get_bank(memory.number) != bank.index:
@@ -536,13 +579,22 @@ class IcomBankModel(chirp_common.BankModel):
                             (memory.number, bank))
 
         self._radio._set_bank(memory.number, None)
+        self._index_remove(memory, bank)
 
-    def get_mapping_memories(self, bank):
-        memories = []
+    def _load_index(self, index):
+        banks = self.get_mappings()
         for i in range(*self._radio.get_features().memory_bounds):
-            if self._radio._get_bank(i) == bank.index:
-                memories.append(self._radio.get_memory(i))
-        return memories
+            bank = self._radio._get_bank(i)
+            if bank is None:
+                continue
+            elif bank >= len(banks):
+                LOG.warn("Memory %i is in bank %i of %i" % (i, bank,
+                                                            len(banks)))
+                continue
+            index.add(i, banks[bank].get_index())
+
+    def get_mapping_memories(self, bank):
+        return self._get_indexed_memories(bank)
 
     def get_memory_mappings(self, memory):
         index = self._radio._get_bank(memory.number)
@@ -572,9 +624,8 @@ class IcomIndexedBankModel(IcomBankModel,
 
     def get_next_mapping_index(self, bank):
         indexes = []
-        for i in range(*self._radio.get_features().memory_bounds):
-            if self._radio._get_bank(i) == bank.index:
-                indexes.append(self._radio._get_bank_index(i))
+        for i in self._get_index().get_memories(bank.get_index()):
+            indexes.append(self._radio._get_bank_index(i))
 
         for i in range(0, 256):
             if i not in indexes:
@@ -584,9 +635,7 @@ class IcomIndexedBankModel(IcomBankModel,
 
 
 def compute_checksum(data):
-    cs = 0
-    for byte in data:
-        cs += ord(byte)
+    cs = bufops.sum_bytes(data)
     return ((cs ^ 0xFFFF) + 1) & 0xFF
 
 
@@ -634,6 +683,12 @@ class IcomCloneModeRadio(chirp_common.CloneModeRadio):
 
     def process_frame_payload(self, payload):
         """Convert BCD-encoded data to raw"""
+        try:
+            return binascii.unhexlify(payload[:len(payload) & ~1])
+        except TypeError:
+            # Convert byte by byte, up to the bad one
+            pass
+
         bcddata = payload
         data = ""
         i = 0
@@ -652,19 +707,19 @@ class IcomCloneModeRadio(chirp_common.CloneModeRadio):
         """Returns the data with optional checksum BCD-encoded for the radio"""
         if raw:
             return data
-        payload = ""
-        for byte in data:
-            payload += "%02X" % ord(byte)
+        payload = binascii.hexlify(data).upper()
         if checksum:
             payload += "%02X" % compute_checksum(data)
         return payload
 
     def sync_in(self):
         self._mmap = clone_from_radio(self)
+        self._mmap.clear_dirty()
         self.process_mmap()
 
     def sync_out(self):
-        clone_to_radio(self)
+        if clone_to_radio(self):
+            self._mmap.clear_dirty()
 
     def get_bank_model(self):
         rf = self.get_features()
@@ -747,6 +802,7 @@ class IcomRawCloneModeRadio(IcomCloneModeRadio):
         _mmap = clone_from_radio(self)
         _mmap = flip_high_order_bit(_mmap.get_packed())
         self._mmap = memmap.MemoryMap(_mmap)
+        self._mmap.clear_dirty()
         self.process_mmap()
 
     def get_mmap(self):
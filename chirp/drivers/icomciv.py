@@ -423,6 +423,15 @@ class IcomCIVRadio(icf.IcomLiveRadio):
         pass
 
     def get_memory(self, number):
+        # The special channels (like the VFOs) change under us, so only
+        # the regular memories are cached
+        if self._is_special(number):
+            return self._get_memory(number)
+        if number not in self._memcache:
+            self._memcache[number] = self._get_memory(number)
+        return self._memcache[number]
+
+    def _get_memory(self, number):
         LOG.debug("Getting %s" % number)
         f = self._classes["mem"]()
         mem = chirp_common.Memory()
@@ -566,6 +575,7 @@ class IcomCIVRadio(icf.IcomLiveRadio):
 
     def set_memory(self, mem):
         LOG.debug("Setting %s(%s)" % (mem.number, mem.extd_number))
+        self._memcache.invalidate(mem.number)
         f = self._get_template_memory()
         if self._is_special(mem.number):
             info = self._get_special_info(mem.number)
@@ -18,6 +18,7 @@ import os
 import sys
 import time
 import logging
+import weakref
 
 from chirp import chirp_common, errors, directory, util
 from chirp.settings import RadioSetting, RadioSettingGroup, \
@@ -54,10 +55,8 @@ RADIO_IDS = {
     "ID023": "TS-590S/SG_LiveMode"          # as SG
 }
 
-LOCK = threading.Lock()
 COMMAND_RESP_BUFSIZE = 8
 LAST_BAUD = 4800
-LAST_DELIMITER = ("\r", " ")
 
 # The Kenwood TS-2000, TS-480, TS-590 & TS-850 use ";"
 # as a CAT command message delimiter, and all others use "\n".
@@ -65,84 +64,141 @@ LAST_DELIMITER = ("\r", " ")
 # fields, but others do.
 
 
-def command(ser, cmd, *args):
-    """Send @cmd to radio via @ser"""
-    global LOCK, LAST_DELIMITER, COMMAND_RESP_BUFSIZE
+class KenwoodSession(object):
+    """A CAT session with the radio on @pipe.
 
-    start = time.time()
+    The session owns the delimiter and baud rate found by identify(), and
+    locks only its own pipe, so several radios can be driven at once."""
 
-    LOCK.acquire()
+    # Seconds to wait for more of a response, and the longest response
+    # to wait for, before giving up
+    TIMEOUT = 0.5
+    MAX_RESPONSE = 256
 
-    # TODO: This global use of LAST_DELIMITER breaks reentrancy
-    # and needs to be fixed.
-    if args:
-        cmd += LAST_DELIMITER[1] + LAST_DELIMITER[1].join(args)
-    cmd += LAST_DELIMITER[0]
+    def __init__(self, pipe):
+        self.pipe = pipe
+        self.delimiter = ("\r", " ")
+        self.baud = None
+        self._lock = threading.Lock()
+        self._buffer = ""
+
+    def _format(self, cmd, args):
+        if args:
+            cmd += self.delimiter[1] + self.delimiter[1].join(args)
+        return cmd + self.delimiter[0]
+
+    def _read_size(self):
+        try:
+            return max(1, self.pipe.inWaiting())
+        except Exception:
+            return COMMAND_RESP_BUFSIZE
+
+    def _read_response(self):
+        deadline = time.time() + self.TIMEOUT
+        while self.delimiter[0] not in self._buffer:
+            if len(self._buffer) > self.MAX_RESPONSE:
+                LOG.error("Response too long")
+                break
+
+            data = self.pipe.read(self._read_size())
+            if data:
+                self._buffer += data
+                deadline = time.time() + self.TIMEOUT
+            elif time.time() > deadline:
+                LOG.error("Timeout waiting for data")
+                break
+        else:
+            result, self._buffer = self._buffer.split(self.delimiter[0], 1)
+            LOG.debug("RADIO->PC: %r" % result.strip())
+            return result.strip()
+
+        result = self._buffer
+        self._buffer = ""
+        return result.strip()
+
+    def command(self, cmd, *args):
+        """Send @cmd to the radio and return its response"""
+        return self.pipeline([(cmd,) + args])[0]
+
+    def pipeline(self, commands):
+        """Send each of @commands (a list of (cmd, arg...) tuples) to the
+        radio before collecting their responses, which are returned in
+        order"""
+        with self._lock:
+            data = "".join([self._format(c[0], c[1:]) for c in commands])
+            LOG.debug("PC->RADIO: %r" % data.strip())
+            self.pipe.write(data)
+
+            return [self._read_response() for c in commands]
+
+    def identify(self):
+        """Find the baud rate and delimiter the radio uses, and return
+        the ID it reports"""
+        global LAST_BAUD
+        bauds = [4800, 9600, 19200, 38400, 57600, 115200]
+        bauds.remove(LAST_BAUD)
+        # Make sure LAST_BAUD is last so that it is tried first below
+        bauds.append(LAST_BAUD)
+
+        command_delimiters = [("\r", " "), (";", "")]
+
+        for delimiter in command_delimiters:
+            # Process the baud options in reverse order so that we try the
+            # last one first, and then start with the high-speed ones next
+            for i in reversed(bauds):
+                self.delimiter = delimiter
+                LOG.info("Trying ID at baud %i with delimiter \"%s\"" %
+                         (i, repr(delimiter)))
+                self.pipe.baudrate = i
+                self.pipe.write(self.delimiter[0])
+                self.pipe.read(25)
+                self._buffer = ""
+                resp = self.command("ID")
+
+                # most kenwood radios
+                if " " in resp:
+                    LAST_BAUD = self.baud = i
+                    return resp.split(" ")[1]
 
-    LOG.debug("PC->RADIO: %r" % cmd.strip())
-    ser.write(cmd)
+                # Radio responded in the right baud rate,
+                # but threw an error because of all the crap
+                # we have been hurling at it. Retry the ID at this
+                # baud rate, which will almost definitely work.
+                if "?" in resp:
+                    resp = self.command("ID")
+                    LAST_BAUD = self.baud = i
+                    if " " in resp:
+                        return resp.split(" ")[1]
 
-    result = ""
-    while not result.endswith(LAST_DELIMITER[0]):
-        result += ser.read(COMMAND_RESP_BUFSIZE)
-        if (time.time() - start) > 0.5:
-            LOG.error("Timeout waiting for data")
-            break
+                # Kenwood radios that return ID numbers
+                if resp in RADIO_IDS.keys():
+                    self.baud = i
+                    return RADIO_IDS[resp]
 
-    if result.endswith(LAST_DELIMITER[0]):
-        LOG.debug("RADIO->PC: %r" % result.strip())
-        result = result[:-1]
-    else:
-        LOG.error("Giving up")
+        raise errors.RadioError("No response from radio")
 
-    LOCK.release()
 
-    return result.strip()
+_SESSIONS = weakref.WeakKeyDictionary()
+_SESSIONS_LOCK = threading.Lock()
 
 
-def get_id(ser):
-    """Get the ID of the radio attached to @ser"""
-    global LAST_BAUD
-    bauds = [4800, 9600, 19200, 38400, 57600, 115200]
-    bauds.remove(LAST_BAUD)
-    # Make sure LAST_BAUD is last so that it is tried first below
-    bauds.append(LAST_BAUD)
-
-    global LAST_DELIMITER
-    command_delimiters = [("\r", " "), (";", "")]
-
-    for delimiter in command_delimiters:
-        # Process the baud options in reverse order so that we try the
-        # last one first, and then start with the high-speed ones next
-        for i in reversed(bauds):
-            LAST_DELIMITER = delimiter
-            LOG.info("Trying ID at baud %i with delimiter \"%s\"" %
-                     (i, repr(delimiter)))
-            ser.baudrate = i
-            ser.write(LAST_DELIMITER[0])
-            ser.read(25)
-            resp = command(ser, "ID")
-
-            # most kenwood radios
-            if " " in resp:
-                LAST_BAUD = i
-                return resp.split(" ")[1]
-
-            # Radio responded in the right baud rate,
-            # but threw an error because of all the crap
-            # we have been hurling at it. Retry the ID at this
-            # baud rate, which will almost definitely work.
-            if "?" in resp:
-                resp = command(ser, "ID")
-                LAST_BAUD = i
-                if " " in resp:
-                    return resp.split(" ")[1]
+def get_session(ser):
+    """Return the KenwoodSession for the radio on @ser"""
+    with _SESSIONS_LOCK:
+        session = _SESSIONS.get(ser)
+        if session is None:
+            session = _SESSIONS[ser] = KenwoodSession(ser)
+        return session
+
+
+def command(ser, cmd, *args):
+    """Send @cmd to radio via @ser"""
+    return get_session(ser).command(cmd, *args)
 
-            # Kenwood radios that return ID numbers
-            if resp in RADIO_IDS.keys():
-                return RADIO_IDS[resp]
 
-    raise errors.RadioError("No response from radio")
+def get_id(ser):
+    """Get the ID of the radio attached to @ser"""
+    return get_session(ser).identify()
 
 
 def get_tmode(tone, ctcss, dcs):
@@ -173,11 +229,13 @@ class KenwoodLiveRadio(chirp_common.LiveRadio):
     _kenwood_split = False
     _kenwood_valid_tones = list(chirp_common.TONES)
 
+    # Memories read in one pipelined batch by get_memories(), or 0 for
+    # radios that read them with their own get_memory()
+    _kenwood_batch = 10
+
     def __init__(self, *args, **kwargs):
         chirp_common.LiveRadio.__init__(self, *args, **kwargs)
 
-        self._memcache = {}
-
         if self.pipe:
             self.pipe.timeout = 0.1
             radio_id = get_id(self.pipe)
@@ -210,19 +268,25 @@ class KenwoodLiveRadio(chirp_common.LiveRadio):
     def get_raw_memory(self, number):
         return command(self.pipe, *self._cmd_get_memory(number))
 
-    def get_memory(self, number):
+    def _check_number(self, number):
         if number < 0 or number > self._upper:
             raise errors.InvalidMemoryLocation(
                 "Number must be between 0 and %i" % self._upper)
-        if number in self._memcache and not NOCACHE:
-            return self._memcache[number]
 
-        result = command(self.pipe, *self._cmd_get_memory(number))
+    def _cmds_get_memory(self, number):
+        cmds = [self._cmd_get_memory(number),
+                self._cmd_get_memory_name(number)]
+        if self._kenwood_split:
+            # Only needed for a simplex memory, but it's cheaper to ask
+            # for it along with the others than to wait and see
+            cmds.append(self._cmd_get_split(number))
+        return cmds
+
+    def _parse_memory(self, number, result, name_result, split_result=""):
         if result == "N" or result == "E":
             mem = chirp_common.Memory()
             mem.number = number
             mem.empty = True
-            self._memcache[mem.number] = mem
             return mem
         elif " " not in result:
             LOG.error("Not sure what to do with this: `%s'" % result)
@@ -232,24 +296,70 @@ class KenwoodLiveRadio(chirp_common.LiveRadio):
         spec = value.split(",")
 
         mem = self._parse_mem_spec(spec)
-        self._memcache[mem.number] = mem
 
-        result = command(self.pipe, *self._cmd_get_memory_name(number))
-        if " " in result:
-            value = result.split(" ", 1)[1]
+        if " " in name_result:
+            value = name_result.split(" ", 1)[1]
             if value.count(",") == 2:
                 _zero, _loc, mem.name = value.split(",")
             else:
                 _loc, mem.name = value.split(",")
 
-        if mem.duplex == "" and self._kenwood_split:
-            result = command(self.pipe, *self._cmd_get_split(number))
-            if " " in result:
-                value = result.split(" ", 1)[1]
-                self._parse_split_spec(mem, value.split(","))
+        if mem.duplex == "" and " " in split_result:
+            value = split_result.split(" ", 1)[1]
+            self._parse_split_spec(mem, value.split(","))
 
         return mem
 
+    def _read_memories(self, numbers):
+        """Read @numbers from the radio, sending all of the commands before
+        collecting the responses, and return the memories"""
+        if not numbers:
+            return []
+
+        cmds = [self._cmds_get_memory(number) for number in numbers]
+        results = get_session(self.pipe).pipeline(sum(cmds, []))
+
+        mems = []
+        for number, mem_cmds in zip(numbers, cmds):
+            mem = self._parse_memory(number, *results[:len(mem_cmds)])
+            results = results[len(mem_cmds):]
+            self._memcache[mem.number] = mem
+            mems.append(mem)
+        return mems
+
+    def get_memory(self, number):
+        self._check_number(number)
+        if number in self._memcache and not NOCACHE:
+            return self._memcache[number]
+
+        return self._read_memories([number])[0]
+
+    def get_memories(self, lo=None, hi=None):
+        if lo is None or hi is None:
+            bounds = self.get_features().memory_bounds
+            if lo is None:
+                lo = bounds[0]
+            if hi is None:
+                hi = bounds[1]
+
+        if not self._kenwood_batch:
+            for mem in chirp_common.LiveRadio.get_memories(self, lo, hi):
+                yield mem
+            return
+
+        for first in range(lo, hi + 1, self._kenwood_batch):
+            numbers = range(first, min(first + self._kenwood_batch, hi + 1))
+            for number in numbers:
+                self._check_number(number)
+            missing = [number for number in numbers
+                       if NOCACHE or number not in self._memcache]
+            mems = dict(zip(missing, self._read_memories(missing)))
+            for number in numbers:
+                if number in mems:
+                    yield mems[number]
+                else:
+                    yield self._memcache[number]
+
     def _make_mem_spec(self, mem):
         pass
 
@@ -267,6 +377,7 @@ class KenwoodLiveRadio(chirp_common.LiveRadio):
         if memory.number < 0 or memory.number > self._upper:
             raise errors.InvalidMemoryLocation(
                 "Number must be between 0 and %i" % self._upper)
+        self._memcache.invalidate(memory.number)
 
         spec = self._make_mem_spec(memory)
         spec = ",".join(spec)
@@ -1410,6 +1521,7 @@ class TM471Radio(THK2Radio):
 class TS590Radio(KenwoodLiveRadio):
     """Kenwood TS-590S/SG"""
     MODEL = "TS-590S/SG_LiveMode"
+    _kenwood_batch = 0
 
     _kenwood_valid_tones = list(KENWOOD_TONES)
     _kenwood_valid_tones.append(1750)
@@ -1473,8 +1585,8 @@ class TS590Radio(KenwoodLiveRadio):
         mem.extra = RadioSettingGroup("extra", "Extra")
         # Read the base and split MR strings
         mem.number = number
-        spec0 = command(self.pipe, "MR0 %02i" % mem.number)
-        spec1 = command(self.pipe, "MR1 %02i" % mem.number)
+        spec0, spec1 = get_session(self.pipe).pipeline(
+            [("MR0 %02i" % mem.number,), ("MR1 %02i" % mem.number,)])
         mem.name = spec0[41:49]  # Max 8-Char Name if assigned
         mem.name = mem.name.strip()
         mem.name = mem.name.upper()
@@ -1596,6 +1708,7 @@ class TS590Radio(KenwoodLiveRadio):
 class TS480Radio(KenwoodLiveRadio):
     """Kenwood TS-480"""
     MODEL = "TS-480_LiveMode"
+    _kenwood_batch = 0
 
     _kenwood_valid_tones = list(KENWOOD_TONES)
     _kenwood_valid_tones.append(1750)
@@ -1662,8 +1775,8 @@ class TS480Radio(KenwoodLiveRadio):
         mem = chirp_common.Memory()
         # Read the base and split MR strings
         mem.number = number
-        spec0 = command(self.pipe, "MR0%03i" % mem.number)
-        spec1 = command(self.pipe, "MR1%03i" % mem.number)
+        spec0, spec1 = get_session(self.pipe).pipeline(
+            [("MR0%03i" % mem.number,), ("MR1%03i" % mem.number,)])
         # Add 1 to string idecis if refering to CAT manual
         mem.name = spec0[41:49]  # Max 8-Char Name if assigned
         mem.name = mem.name.strip()
@@ -19,6 +19,7 @@ import time
 import os
 import logging
 from chirp import util, chirp_common, bitwise, memmap, errors, directory
+from chirp import bufops
 from chirp.settings import RadioSetting, RadioSettingGroup, \
     RadioSettingValueBoolean, RadioSettingValueList, \
     RadioSettingValueInteger, RadioSettingValueString, \
@@ -288,10 +289,7 @@ class KGUV8DRadio(chirp_common.CloneModeRadio,
     _mmap = ""
 
     def _checksum(self, data):
-        cs = 0
-        for byte in data:
-            cs += ord(byte)
-        return cs % 256
+        return bufops.sum_bytes(data) % 256
 
     def _write_record(self, cmd, payload=None):
         # build the packet
@@ -29,6 +29,7 @@ import time
 import os
 import logging
 from chirp import util, chirp_common, bitwise, memmap, errors, directory
+from chirp import bufops
 from chirp.settings import RadioSetting, RadioSettingGroup, \
     RadioSettingValueBoolean, RadioSettingValueList, \
     RadioSettingValueInteger, RadioSettingValueString, \
@@ -307,10 +308,7 @@ class KGUV8DPlusRadio(chirp_common.CloneModeRadio,
     _mmap = ""
 
     def _checksum(self, data):
-        cs = 0
-        for byte in data:
-            cs += ord(byte)
-        return chr(cs % 256)
+        return chr(bufops.sum_bytes(data) % 256)
 
     def _write_record(self, cmd, payload = None):
         # build the packet
@@ -351,17 +349,10 @@ class KGUV8DPlusRadio(chirp_common.CloneModeRadio,
         return (_rcs != _cs, _packet)
  
     def decrypt(self, data):
-        result = ''
-        for i in range(len(data)-1, 0, -1):
-            result += self.strxor(data[i], data[i - 1])
-        result += self.strxor(data[0], '\x57')
-        return result[::-1]
+        return bufops.xor_chain_decode(data, 0x57)
 
     def encrypt(self, data):
-        result = self.strxor('\x57', data[0])
-        for i in range(1, len(data), 1):
-            result += self.strxor(result[i - 1], data[i])
-        return result
+        return bufops.xor_chain_encode(data, 0x57)
 
     def strxor (self, xora, xorb):
         return chr(ord(xora) ^ ord(xorb))
@@ -26,6 +26,7 @@ import logging
 import struct
 import string
 from chirp import util, chirp_common, bitwise, memmap, errors, directory
+from chirp import bufops
 from chirp.settings import RadioSetting, RadioSettingValue, \
      RadioSettingGroup, \
      RadioSettingValueBoolean, RadioSettingValueList, \
@@ -359,10 +360,8 @@ def _pkt_encode(op, payload):
     cksum = op + 0xff
     if (payload):
         data.append(len(payload))
-        cksum += len(payload)
-        for byte in payload:
-            cksum += byte
-            data.append(byte)
+        cksum += len(payload) + bufops.sum_bytes(payload)
+        data += payload
     else:
         data.append(0x00)
         # Yea, this is a 4 bit cksum (also known as a bug)
@@ -370,11 +369,7 @@ def _pkt_encode(op, payload):
 
     # now obfuscate by an xor starting with first payload byte ^ 0x52
     # including the trailing cksum.
-    xorbits = 0x52
-    for i, byte in enumerate(data[4:]):
-        xord = xorbits ^ byte
-        data[i + 4] = xord
-        xorbits = xord
+    data[4:] = bufops.xor_chain_encode(data[4:], 0x52)
     return(data)
 
 
@@ -391,16 +386,10 @@ def _pkt_decode(data):
     bytecount = data[3]
 
     # First un-obfuscate the payload and cksum
-    payload = bytearray()
-    xorbits = 0x52
-    for i, byte in enumerate(data[4:]):
-        payload.append(xorbits ^ byte)
-        xorbits = byte
+    payload = bytearray(bufops.xor_chain_decode(data[4:], 0x52))
 
     # Calculate the checksum starting with the 3 bytes of the header
-    cksum = op + direction + bytecount
-    for byte in payload[:-1]:
-        cksum += byte
+    cksum = op + direction + bytecount + bufops.sum_bytes(payload[:-1])
     # yes, a 4 bit cksum to match the encode
     cksum_match = (cksum & 0xf) == payload[-1]
     if (not cksum_match):
@@ -207,3 +207,7 @@ class TYTUV3R25Radio(TYTUV3RRadio):
     @classmethod
     def match_model(cls, filedata, filename):
         return len(filedata) == cls._memsize
+
+    @classmethod
+    def match_hints(cls):
+        return [cls._memsize], []
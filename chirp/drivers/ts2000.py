@@ -39,6 +39,7 @@ class TS2000Radio(KenwoodLiveRadio):
     _upper = 289
     _kenwood_split = True
     _kenwood_valid_tones = list(TS2000_TONES)
+    _kenwood_batch = 0
 
     def get_features(self):
         rf = chirp_common.RadioFeatures()
@@ -100,7 +101,8 @@ class TS2000Radio(KenwoodLiveRadio):
         if number in self._memcache and not NOCACHE:
             return self._memcache[number]
 
-        result = command(self.pipe, *self._cmd_get_memory(number))
+        result, split = kenwood_live.get_session(self.pipe).pipeline(
+            [(self._cmd_get_memory(number),), (self._cmd_get_split(number),)])
         if result == "N":
             mem = chirp_common.Memory()
             mem.number = number
@@ -113,8 +115,7 @@ class TS2000Radio(KenwoodLiveRadio):
 
         # check for split frequency operation
         if mem.duplex == "" and self._kenwood_split:
-            result = command(self.pipe, *self._cmd_get_split(number))
-            self._parse_split_spec(mem, result)
+            self._parse_split_spec(mem, split)
 
         return mem
 
@@ -178,6 +179,7 @@ class TS2000Radio(KenwoodLiveRadio):
         if memory.number < 0 or memory.number > self._upper:
             raise errors.InvalidMemoryLocation(
                 "Number must be between 0 and %i" % self._upper)
+        self._memcache.invalidate(memory.number)
 
         spec = self._make_mem_spec(memory)
         spec = "".join(spec)
@@ -17,7 +17,7 @@ import logging
 
 from chirp import chirp_common, directory, errors
 from chirp.drivers.kenwood_live import KenwoodLiveRadio, \
-    command, iserr, NOCACHE
+    command, iserr, get_session, NOCACHE
 
 LOG = logging.getLogger(__name__)
 
@@ -63,6 +63,7 @@ class TS850Radio(KenwoodLiveRadio):
 
     _upper = 99
     _kenwood_valid_tones = list(TS850_TONES)
+    _kenwood_batch = 0
 
     def get_features(self):
         rf = chirp_common.RadioFeatures()
@@ -94,7 +95,8 @@ class TS850Radio(KenwoodLiveRadio):
         if number in self._memcache and not NOCACHE:
             return self._memcache[number]
 
-        result = command(self.pipe, *self._cmd_get_memory(number))
+        result, split = get_session(self.pipe).pipeline(
+            [self._cmd_get_memory(number), self._cmd_get_split(number)])
 
         if result == "N":
             mem = chirp_common.Memory()
@@ -107,8 +109,7 @@ class TS850Radio(KenwoodLiveRadio):
         self._memcache[mem.number] = mem
 
         # check for split frequency operation
-        result = command(self.pipe, *self._cmd_get_split(number))
-        self._parse_split_spec(mem, result)
+        self._parse_split_spec(mem, split)
 
         return mem
 
@@ -116,6 +117,7 @@ class TS850Radio(KenwoodLiveRadio):
         if memory.number < 0 or memory.number > self._upper:
             raise errors.InvalidMemoryLocation(
                 "Number must be between 0 and %i" % self._upper)
+        self._memcache.invalidate(memory.number)
 
         if memory.number > 90:
             if memory.duplex == TS850_DUPLEX[0]:
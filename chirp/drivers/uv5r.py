@@ -20,6 +20,7 @@ import logging
 
 from chirp import chirp_common, errors, util, directory, memmap
 from chirp import bitwise
+from chirp.drivers import baofeng_common
 from chirp.settings import RadioSetting, RadioSettingGroup, \
     RadioSettingValueInteger, RadioSettingValueList, \
     RadioSettingValueBoolean, RadioSettingValueString, \
@@ -355,11 +356,13 @@ SETTING_LISTS = {
 }
 
 
-def _do_status(radio, block):
+def _do_status(radio, block, pacer=None):
     status = chirp_common.Status()
     status.msg = "Cloning"
     status.cur = block
     status.max = radio.get_memsize()
+    if pacer:
+        pacer.update_status(status)
     radio.status_fn(status)
 
 UV5R_MODEL_ORIG = "\x50\xBB\xFF\x01\x25\x98\x4D"
@@ -482,18 +485,20 @@ def _read_block(radio, start, size, first_command=False):
         raise errors.RadioError("Radio sent incomplete block 0x%04x" % start)
 
     radio.pipe.write("\x06")
-    time.sleep(0.05)
 
     return chunk
 
 
-def _get_radio_firmware_version(radio):
+def _get_radio_firmware_version(radio, pacer):
     if radio.MODEL == "BJ-UV55":
-        block = _read_block(radio, 0x1FF0, 0x40, True)
+        block = pacer.transfer(0x1FF0, 0x40, _read_block,
+                               radio, 0x1FF0, 0x40, True)
         version = block[0:6]
     else:
-        block1 = _read_block(radio, 0x1EC0, 0x40, True)
-        block2 = _read_block(radio, 0x1F00, 0x40, False)
+        block1 = pacer.transfer(0x1EC0, 0x40, _read_block,
+                                radio, 0x1EC0, 0x40, True)
+        block2 = pacer.transfer(0x1F00, 0x40, _read_block,
+                                radio, 0x1F00, 0x40, False)
         block = block1 + block2
         version = block[48:62]
     return version
@@ -538,7 +543,8 @@ def _ident_radio(radio):
 def _do_download(radio):
     data = _ident_radio(radio)
 
-    radio_version = _get_radio_firmware_version(radio)
+    pacer = baofeng_common.ClonePacer(radio)
+    radio_version = _get_radio_firmware_version(radio, pacer)
     LOG.info("Radio Version is %s" % repr(radio_version))
 
     if "HN5RV" in radio_version:
@@ -568,15 +574,16 @@ def _do_download(radio):
     # Main block
     LOG.debug("downloading main block...")
     for i in range(0, 0x1800, 0x40):
-        data += _read_block(radio, i, 0x40, False)
-        _do_status(radio, i)
-    _do_status(radio, radio.get_memsize())
+        data += pacer.transfer(i, 0x40, _read_block, radio, i, 0x40, False)
+        _do_status(radio, i, pacer)
+    _do_status(radio, radio.get_memsize(), pacer)
     LOG.debug("done.")
     if radio._aux_block:
         LOG.debug("downloading aux block...")
         # Auxiliary block starts at 0x1ECO (?)
         for i in range(0x1EC0, 0x2000, 0x40):
-            data += _read_block(radio, i, 0x40, False)
+            data += pacer.transfer(i, 0x40, _read_block,
+                                   radio, i, 0x40, False)
 
     if append_model:
         data += radio.MODEL.ljust(8)
@@ -588,7 +595,6 @@ def _do_download(radio):
 def _send_block(radio, addr, data):
     msg = struct.pack(">BHB", ord("X"), addr, len(data))
     radio.pipe.write(msg + data)
-    time.sleep(0.05)
 
     ack = radio.pipe.read(1)
     if ack != "\x06":
@@ -605,7 +611,8 @@ def _do_upload(radio):
             raise errors.RadioError("Image not supported by radio")
 
     image_version = _firmware_version_from_image(radio)
-    radio_version = _get_radio_firmware_version(radio)
+    pacer = baofeng_common.ClonePacer(radio)
+    radio_version = _get_radio_firmware_version(radio, pacer)
     LOG.info("Image Version is %s" % repr(image_version))
     LOG.info("Radio Version is %s" % repr(radio_version))
 
@@ -653,9 +660,11 @@ def _do_upload(radio):
     # Main block
     for start_addr, end_addr in ranges_main:
         for i in range(start_addr, end_addr, 0x10):
-            _send_block(radio, i - 0x08, radio.get_mmap()[i:i + 0x10])
-            _do_status(radio, i)
-        _do_status(radio, radio.get_memsize())
+            if radio.upload_block_needed(i, i + 0x10):
+                pacer.transfer(i - 0x08, 0x10, _send_block, radio, i - 0x08,
+                               radio.get_mmap()[i:i + 0x10])
+            _do_status(radio, i, pacer)
+        _do_status(radio, radio.get_memsize(), pacer)
 
     if len(radio.get_mmap().get_packed()) == 0x1808:
         LOG.info("Old image, not writing aux block")
@@ -665,7 +674,9 @@ def _do_upload(radio):
     for start_addr, end_addr in ranges_aux:
         for i in range(start_addr, end_addr, 0x10):
             addr = 0x1808 + (i - 0x1EC0)
-            _send_block(radio, i, radio.get_mmap()[addr:addr + 0x10])
+            if radio.upload_block_needed(addr, addr + 0x10):
+                pacer.transfer(i, 0x10, _send_block, radio, i,
+                               radio.get_mmap()[addr:addr + 0x10])
 
     if not image_matched_radio:
         msg = ("Upload finished, but the 'Other Settings' "
@@ -707,6 +718,7 @@ class BaofengUV5R(chirp_common.CloneModeRadio):
     VENDOR = "Baofeng"
     MODEL = "UV-5R"
     BAUD_RATE = 9600
+    PARTIAL_UPLOAD = True
 
     _memsize = 0x1808
     _basetype = BASETYPE_UV5R
@@ -802,6 +814,10 @@ class BaofengUV5R(chirp_common.CloneModeRadio):
         else:
             return False
 
+    @classmethod
+    def match_hints(cls):
+        return [0x1808, 0x1948, 0x1950], []
+
     def process_mmap(self):
         self._memobj = bitwise.parse(MEM_FORMAT % self._mem_params, self._mmap)
 
@@ -812,6 +828,7 @@ class BaofengUV5R(chirp_common.CloneModeRadio):
             raise
         except Exception, e:
             raise errors.RadioError("Failed to communicate with radio: %s" % e)
+        self._mmap.clear_dirty()
         self.process_mmap()
 
     def sync_out(self):
@@ -821,6 +838,7 @@ class BaofengUV5R(chirp_common.CloneModeRadio):
             raise
         except Exception, e:
             raise errors.RadioError("Failed to communicate with radio: %s" % e)
+        self._mmap.clear_dirty()
 
     def get_raw_memory(self, number):
         return repr(self._memobj.memory[number])
@@ -837,6 +855,32 @@ class BaofengUV5R(chirp_common.CloneModeRadio):
     def _get_nam(self, number):
         return self._memobj.names[number]
 
+    def get_memories(self, lo=None, hi=None):
+        first, last = self.get_features().memory_bounds
+        if lo is None:
+            lo = first
+        if hi is None:
+            hi = last
+
+        # Find the empty channels from the raw memory array in one pass,
+        # so that only the used ones are decoded
+        memory = self._memobj.memory
+        if lo < first or hi > last or \
+                self._get_mem(first).get_offset() != memory.get_offset():
+            return chirp_common.CloneModeRadio.get_memories(self, lo, hi)
+        return self._get_memories(lo, hi, first, memory.get_raw(),
+                                  memory.size() / 8 / len(memory))
+
+    def _get_memories(self, lo, hi, first, raw, size):
+        for number in range(lo, hi + 1):
+            if raw[(number - first) * size] == "\xff":
+                mem = chirp_common.Memory()
+                mem.number = number
+                mem.empty = True
+                yield mem
+            else:
+                yield self.get_memory(number)
+
     def get_memory(self, number):
         _mem = self._get_mem(number)
         _nam = self._get_nam(number)
@@ -1959,3 +2003,7 @@ class RadioddityUV5RX3Radio(BaofengUV5R):
     @classmethod
     def match_model(cls, filename, filedata):
         return False
+
+    @classmethod
+    def match_hints(cls):
+        return [], []
@@ -335,5 +335,9 @@ class VX5Radio(yaesu_clone.YaesuCloneModeRadio):
     def match_model(cls, filedata, filename):
         return len(filedata) == cls._memsize
 
+    @classmethod
+    def match_hints(cls):
+        return [cls._memsize], []
+
     def get_bank_model(self):
         return VX5BankModel(self)
@@ -180,6 +180,10 @@ class VX510Radio(yaesu_clone.YaesuCloneModeRadio):
     def match_model(cls, filedata, filename):
         return len(filedata) == cls._memsize
 
+    @classmethod
+    def match_hints(cls):
+        return [cls._memsize], []
+
 
 # @directory.register
 class VX510File(VX510Radio, chirp_common.FileBackedRadio):
@@ -201,3 +205,7 @@ class VX510File(VX510Radio, chirp_common.FileBackedRadio):
     @classmethod
     def match_model(cls, filedata, filename):
         return len(filedata) == cls._memsize
+
+    @classmethod
+    def match_hints(cls):
+        return [cls._memsize], []
@@ -358,5 +358,9 @@ class VX7Radio(yaesu_clone.YaesuCloneModeRadio):
     def match_model(cls, filedata, filename):
         return len(filedata) == cls._memsize
 
+    @classmethod
+    def match_hints(cls):
+        return [cls._memsize], []
+
     def get_bank_model(self):
         return VX7BankModel(self)
@@ -1565,3 +1565,7 @@ class KG818Radio(KG816Radio):
     @classmethod
     def match_model(cls, filedata, filename):
         return False
+
+    @classmethod
+    def match_hints(cls):
+        return [], []
@@ -18,7 +18,7 @@ import os
 import logging
 from textwrap import dedent
 
-from chirp import chirp_common, util, memmap, errors
+from chirp import bufops, chirp_common, util, memmap, errors
 
 LOG = logging.getLogger(__name__)
 
@@ -186,10 +186,7 @@ class YaesuChecksum:
 
     def get_calculated(self, mmap):
         """Return the calculated value of the checksum"""
-        cs = 0
-        for i in range(self._start, self._stop+1):
-            cs += ord(mmap[i])
-        return cs % 256
+        return bufops.sum_bytes(mmap[self._start:self._stop + 1]) % 256
 
     def update(self, mmap):
         """Update the checksum with the data in @mmap"""
@@ -254,6 +251,10 @@ class YaesuCloneModeRadio(chirp_common.CloneModeRadio):
     def match_model(cls, filedata, filename):
         return filedata[:5] == cls._model and len(filedata) == cls._memsize
 
+    @classmethod
+    def match_hints(cls):
+        return [cls._memsize], [(0, cls._model)]
+
     def _wipe_memory_banks(self, mem):
         """Remove @mem from all the banks it is currently in"""
         bm = self.get_bank_model()
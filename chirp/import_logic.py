@@ -13,11 +13,15 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import itertools
 import logging
 from chirp import chirp_common, errors
 
 LOG = logging.getLogger(__name__)
 
+# Number of memories import_memories() validates at a time
+IMPORT_BATCH = 100
+
 
 class ImportError(Exception):
     """An import error"""
@@ -70,12 +74,19 @@ def ensure_has_calls(radio, memory):
 
 
 # Filter the name according to the destination's rules
-def _import_name(dst_radio, _srcrf, mem):
-    mem.name = dst_radio.filter_name(mem.name)
-
-
-def _import_power(dst_radio, _srcrf, mem):
-    levels = dst_radio.get_features().valid_power_levels
+def _import_name(dst_radio, _srcrf, mem, dstrf=None):
+    if dstrf is not None and dst_radio.__class__.filter_name.im_func is \
+            chirp_common.Radio.filter_name.im_func:
+        # Filter with the features we already have
+        mem.name = dstrf.filter_name(mem.name)
+    else:
+        mem.name = dst_radio.filter_name(mem.name)
+
+
+def _import_power(dst_radio, _srcrf, mem, dstrf=None):
+    if dstrf is None:
+        dstrf = dst_radio.get_features()
+    levels = dstrf.valid_power_levels
     if not levels:
         mem.power = None
         return
@@ -95,8 +106,9 @@ def _import_power(dst_radio, _srcrf, mem):
     mem.power = levels[deltas.index(min(deltas))]
 
 
-def _import_tone(dst_radio, srcrf, mem):
-    dstrf = dst_radio.get_features()
+def _import_tone(dst_radio, srcrf, mem, dstrf=None):
+    if dstrf is None:
+        dstrf = dst_radio.get_features()
 
     # Some radios keep separate tones for Tone and TSQL modes (rtone and
     # ctone). If we're importing to or from radios with differing models,
@@ -114,8 +126,9 @@ def _import_tone(dst_radio, srcrf, mem):
             mem.ctone = mem.rtone
 
 
-def _import_dtcs(dst_radio, srcrf, mem):
-    dstrf = dst_radio.get_features()
+def _import_dtcs(dst_radio, srcrf, mem, dstrf=None):
+    if dstrf is None:
+        dstrf = dst_radio.get_features()
 
     # Some radios keep separate DTCS codes for tx and rx
     # If we're importing to or from radios with differing models,
@@ -147,8 +160,9 @@ def _guess_mode_by_frequency(freq):
     return "FM"
 
 
-def _import_mode(dst_radio, srcrf, mem):
-    dstrf = dst_radio.get_features()
+def _import_mode(dst_radio, srcrf, mem, dstrf=None):
+    if dstrf is None:
+        dstrf = dst_radio.get_features()
 
     # Some radios support an "Auto" mode. If we're importing from one
     # that does to one that does not, guess at the proper mode based on the
@@ -172,8 +186,9 @@ def _make_offset_with_split(rxfreq, txfreq):
         return "-", offset * -1
 
 
-def _import_duplex(dst_radio, srcrf, mem):
-    dstrf = dst_radio.get_features()
+def _import_duplex(dst_radio, srcrf, mem, dstrf=None):
+    if dstrf is None:
+        dstrf = dst_radio.get_features()
 
     # If a radio does not support odd split, we can use an equivalent offset
     if mem.duplex == "split" and mem.duplex not in dstrf.valid_duplexes:
@@ -190,11 +205,7 @@ def _import_duplex(dst_radio, srcrf, mem):
                                             "offset is abnormally large.")
 
 
-def import_mem(dst_radio, src_features, src_mem, overrides={}):
-    """Perform import logic to create a destination memory from
-    src_mem that will be compatible with @dst_radio"""
-    dst_rf = dst_radio.get_features()
-
+def _import_mem(dst_radio, dst_rf, src_features, src_mem, overrides):
     if isinstance(src_mem, chirp_common.DVMemory):
         if not isinstance(dst_radio, chirp_common.IcomDstarSupport):
             raise DestNotCompatible(
@@ -216,17 +227,74 @@ def import_mem(dst_radio, src_features, src_mem, overrides={}):
                ]
 
     for helper in helpers:
-        helper(dst_radio, src_features, dst_mem)
+        helper(dst_radio, src_features, dst_mem, dstrf=dst_rf)
+
+    return dst_mem
+
 
-    msgs = dst_radio.validate_memory(dst_mem)
+def _check_compatible(msgs):
     errs = [x for x in msgs if isinstance(x, chirp_common.ValidationError)]
     if errs:
         raise DestNotCompatible("Unable to create import memory: %s" %
                                 ", ".join(errs))
 
+
+def import_mem(dst_radio, src_features, src_mem, overrides={}):
+    """Perform import logic to create a destination memory from
+    src_mem that will be compatible with @dst_radio"""
+    dst_mem = _import_mem(dst_radio, dst_radio.get_features(),
+                          src_features, src_mem, overrides)
+    _check_compatible(dst_radio.validate_memory(dst_mem))
+
     return dst_mem
 
 
+def _validate_batch(dst_radio, batch):
+    results = iter(dst_radio.validate_memories(
+        [dst_mem for dst_mem, error in batch if dst_mem is not None]))
+
+    for dst_mem, error in batch:
+        if dst_mem is None:
+            yield None, [], error
+            continue
+
+        msgs = results.next()
+        try:
+            _check_compatible(msgs)
+        except DestNotCompatible, e:
+            error = e
+        yield dst_mem, msgs, error
+
+
+def import_memories(dst_radio, src_features, memories, overrides=None):
+    """Perform the import logic of import_mem() on each of @memories,
+    with the corresponding dict from @overrides if given. Generates a
+    (dst_mem, msgs, error) for each memory, where @msgs are the
+    validation messages for @dst_mem and @error is the ImportError that
+    import_mem() would have raised, or None. @dst_mem is None if the
+    memory could not be converted at all. The features of @dst_radio are
+    only looked up once, and memories are validated in batches."""
+    dst_rf = dst_radio.get_features()
+    if overrides is None:
+        overrides = itertools.repeat({})
+
+    batch = []
+    for src_mem, mem_overrides in itertools.izip(memories, overrides):
+        try:
+            batch.append((_import_mem(dst_radio, dst_rf, src_features,
+                                      src_mem, mem_overrides), None))
+        except ImportError, e:
+            batch.append((None, e))
+
+        if len(batch) >= IMPORT_BATCH:
+            for result in _validate_batch(dst_radio, batch):
+                yield result
+            batch = []
+
+    for result in _validate_batch(dst_radio, batch):
+        yield result
+
+
 def _get_bank_model(radio):
     for model in radio.get_mapping_models():
         if isinstance(model, chirp_common.BankModel):
@@ -13,16 +13,35 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import bisect
+import mmap
+import os
+import struct
+
 from chirp import util
 
 
 class MemoryMap:
     """
     A pythonic memory map interface
+
+    The image is kept in a contiguous bytearray, so slices, packing
+    and the whole-image operations are done in bulk.
+
+    Once clear_dirty() has been called (usually after the image was
+    transferred to or from the radio), the ranges changed through set()
+    and pack_into() are recorded, so that an upload can send only those.
+    Writes through view() are not recorded.
     """
 
+    # List of (start, end) ranges changed since clear_dirty(), or None
+    # if changes are not being tracked
+    _dirty = None
+
     def __init__(self, data):
-        self._data = list(data)
+        if isinstance(data, list):
+            data = "".join(data)
+        self._data = bytearray(data)
 
     def printable(self, start=None, end=None):
         """Return a printable representation of the memory map"""
@@ -32,32 +51,101 @@ class MemoryMap:
         if not end:
             end = len(self._data)
 
-        string = util.hexprint(self._data[start:end])
+        string = util.hexprint(str(self._data[start:end]))
 
         return string
 
     def get(self, start, length=1):
         """Return a chunk of memory of @length bytes from @start"""
         if start == -1:
-            return "".join(self._data[start:])
+            return str(self._data[start:])
         else:
-            return "".join(self._data[start:start+length])
+            return str(self._data[start:start+length])
 
     def set(self, pos, value):
         """Set a chunk of memory at @pos to @value"""
         if isinstance(value, int):
-            self._data[pos] = chr(value)
-        elif isinstance(value, str):
-            for byte in value:
-                self._data[pos] = byte
-                pos += 1
+            self._data[pos] = value
+            size = 1
+        elif isinstance(value, (str, bytearray)):
+            if pos < 0:
+                pos += len(self._data)
+            if pos + len(value) > len(self._data):
+                raise IndexError("%i bytes at %i is beyond the end of "
+                                 "the memory map" % (len(value), pos))
+            self._data[pos:pos+len(value)] = value
+            size = len(value)
         else:
             raise ValueError("Unsupported type %s for value" %
                              type(value).__name__)
 
+        if self._dirty is not None:
+            if pos < 0:
+                pos += len(self._data)
+            self._mark_dirty(pos, pos + size)
+
+    def unpack_from(self, fmt, offset):
+        """Unpack struct format @fmt from @offset, without copying"""
+        return struct.unpack_from(fmt, self._data, offset)
+
+    def pack_into(self, fmt, offset, *values):
+        """Pack @values with struct format @fmt in place at @offset"""
+        struct.pack_into(fmt, self._data, offset, *values)
+        if self._dirty is not None:
+            self._mark_dirty(offset, offset + struct.calcsize(fmt))
+
+    def _mark_dirty(self, start, end):
+        dirty = self._dirty
+        if dirty and dirty[-1][0] <= start <= dirty[-1][1]:
+            # Most writes are to the same or the next few bytes
+            if end > dirty[-1][1]:
+                dirty[-1] = (dirty[-1][0], end)
+        else:
+            dirty.append((start, end))
+
+    def clear_dirty(self):
+        """Start recording changes, forgetting any made so far"""
+        self._dirty = []
+
+    def get_dirty_ranges(self):
+        """Return a sorted list of the (start, end) ranges changed since
+        clear_dirty(), or None if it has not been called"""
+        if self._dirty is None:
+            return None
+
+        merged = []
+        for start, end in sorted(self._dirty):
+            if merged and start <= merged[-1][1]:
+                if end > merged[-1][1]:
+                    merged[-1] = (merged[-1][0], end)
+            else:
+                merged.append((start, end))
+        self._dirty = merged
+        return list(merged)
+
+    def is_dirty(self, start, end):
+        """Return True if anything from @start to @end may have changed
+        since clear_dirty()"""
+        ranges = self.get_dirty_ranges()
+        if ranges is None:
+            return True
+
+        # The last range starting before @end is the only one that can
+        # overlap, since they are sorted and don't overlap each other
+        i = bisect.bisect_left(ranges, (end,))
+        return i > 0 and ranges[i - 1][1] > start
+
+    def view(self, start=0, end=None):
+        """Return a memoryview of the map from @start to @end
+
+        The view shares memory with the map, so writes through it
+        change the image.
+        """
+        return memoryview(self._data)[start:end]
+
     def get_packed(self):
         """Return the entire memory map as raw data"""
-        return "".join(self._data)
+        return str(self._data)
 
     def __len__(self):
         return len(self._data)
@@ -79,15 +167,63 @@ class MemoryMap:
         return self.get_packed()
 
     def __repr__(self):
-        return self.printable(printit=False)
+        return self.printable()
 
     def truncate(self, size):
         """Truncate the memory map to @size"""
         self._data = self._data[:size]
 
 
+class MappedMemoryMap(MemoryMap):
+    """
+    A memory map backed by a private (copy-on-write) mapping of a file
+
+    Pages of the file are read in as they are accessed, and only pages
+    that are modified are copied. Changes are never written back to
+    the file itself; save the image with get_packed() as usual.
+    """
+
+    def __init__(self, filename, size=None):
+        with open(filename, "rb") as mapfile:
+            if size is None:
+                size = os.fstat(mapfile.fileno()).st_size
+            if size <= 0:
+                raise ValueError("Unable to map an empty image")
+            self._data = mmap.mmap(mapfile.fileno(), size,
+                                   access=mmap.ACCESS_COPY)
+
+    def detach(self):
+        """Replace the mapping with an in-memory copy, so that the file
+        is no longer open and can be replaced"""
+        if isinstance(self._data, mmap.mmap):
+            data = bytearray(self._data[:])
+            self._data.close()
+            self._data = data
+
+    def set(self, pos, value):
+        if isinstance(self._data, mmap.mmap):
+            # Slices of an mmap can only be assigned strings
+            if isinstance(value, int):
+                value = chr(value)
+            elif not isinstance(value, str):
+                value = str(value)
+        MemoryMap.set(self, pos, value)
+
+    def get_packed(self):
+        return str(self._data[:])
+
+    def view(self, start=0, end=None):
+        # mmap objects do not support memoryview
+        self.detach()
+        return MemoryMap.view(self, start, end)
+
+    def truncate(self, size):
+        self.detach()
+        MemoryMap.truncate(self, size)
+
+
 # Py3 branch compatibility
 class MemoryMapBytes(MemoryMap):
     def __init__(self, data):
         # Expects data is a newbytes
-        MemoryMap.__init__(self, ''.join(chr(b) for b in data))
+        MemoryMap.__init__(self, bytearray(data))
@@ -23,9 +23,14 @@ LOG = logging.getLogger(__name__)
 
 
 class BandPlans(object):
+    # Number of frequencies to remember the defaults for
+    CACHE_SIZE = 4096
+
     def __init__(self, config):
         self._config = config
         self.plans = {}
+        self._indexes = {}
+        self._defaults = {}
 
         # Migrate old "automatic repeater offset" setting to
         # "North American Amateur Band Plan"
@@ -42,45 +47,78 @@ class BandPlans(object):
             name = plan.DESC.get("name", plan.SHORTNAME)
             self.plans[plan.SHORTNAME] = (name, plan)
 
-            rpt_inputs = []
+            # Check for duplicates.
+            limits = {}
             for band in plan.BANDS:
-                # Check for duplicates.
-                duplicates = [x for x in plan.BANDS if x == band]
+                limits.setdefault(tuple(band.limits), []).append(band)
+            for duplicates in limits.values():
                 if len(duplicates) > 1:
                     LOG.warn("Bandplan %s has duplicates %s" %
                              (name, duplicates))
-                # Add repeater inputs.
+
+            # Add repeater inputs.
+            rpt_inputs = []
+            for band in plan.BANDS:
                 rpt_input = band.inverse()
-                if rpt_input not in plan.BANDS:
-                    rpt_inputs.append(band.inverse())
+                if tuple(rpt_input.limits) not in limits:
+                    rpt_inputs.append(rpt_input)
             plan.bands = list(plan.BANDS)
             plan.bands.extend(rpt_inputs)
+            self._indexes[plan.SHORTNAME] = bandplan.BandIndex(plan.bands)
 
-    def get_defaults_for_frequency(self, freq):
-        freq = int(freq)
+    def _get_enabled(self):
+        return tuple([shortname for shortname in self.plans.keys()
+                      if self._config.get_bool(shortname, "bandplan")])
+
+    def _get_defaults(self, freq, enabled):
         result = bandplan.Band((freq, freq), repr(freq))
 
-        for shortname, details in self.plans.items():
-            if self._config.get_bool(shortname, "bandplan"):
-                matches = [x for x in details[1].bands if x.contains(result)]
-                # Add matches to defaults, favoring more specific matches.
-                matches = sorted(matches, key=lambda x: x.width(),
-                                 reverse=True)
-                for match in matches:
-                    result.mode = match.mode or result.mode
-                    result.step_khz = match.step_khz or result.step_khz
-                    result.offset = match.offset or result.offset
-                    result.duplex = match.duplex or result.duplex
-                    result.tones = match.tones or result.tones
-                    if match.name:
-                        result.name = '/'.join((result.name or '', match.name))
-                # Limit ourselves to one band plan match for simplicity.
-                # Note that if the user selects multiple band plans by editing
-                # the config file it will work as expected (except where plans
-                # conflict).
-                if matches:
-                    break
+        for shortname in enabled:
+            # Add matches to defaults, favoring more specific matches.
+            matches = self._indexes[shortname].get_bands(freq)
+            for match in matches:
+                result.mode = match.mode or result.mode
+                result.step_khz = match.step_khz or result.step_khz
+                result.offset = match.offset or result.offset
+                result.duplex = match.duplex or result.duplex
+                result.tones = match.tones or result.tones
+                if match.name:
+                    result.name = '/'.join((result.name or '', match.name))
+            # Limit ourselves to one band plan match for simplicity.
+            # Note that if the user selects multiple band plans by editing
+            # the config file it will work as expected (except where plans
+            # conflict).
+            if matches:
+                break
+
+        return result
+
+    def _get_cached_defaults(self, freq, enabled):
+        key = (enabled, freq)
+        if key not in self._defaults:
+            if len(self._defaults) >= self.CACHE_SIZE:
+                self._defaults.clear()
+            self._defaults[key] = self._get_defaults(freq, enabled)
+        return self._defaults[key]
+
+    def get_defaults_for_frequency(self, freq):
+        """Return a Band with the defaults for @freq from the enabled band
+        plans. The result is shared between callers and must not be
+        modified."""
+        return self._get_cached_defaults(int(freq), self._get_enabled())
 
+    def get_defaults_for_memories(self, memories):
+        """Return a list of the defaults for the frequency of each of
+        @memories, as get_defaults_for_frequency() would, looking each
+        distinct frequency up only once"""
+        enabled = self._get_enabled()
+        defaults = {}
+        result = []
+        for memory in memories:
+            freq = int(memory.freq)
+            if freq not in defaults:
+                defaults[freq] = self._get_cached_defaults(freq, enabled)
+            result.append(defaults[freq])
         return result
 
     def select_bandplan(self, parent_window):
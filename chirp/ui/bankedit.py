@@ -116,6 +116,11 @@ class MappingNameEditor(common.Editor):
 
     def other_editor_changed(self, target_editor):
         self._loaded = False
+        # Memories may have been moved or erased under the model
+        job = common.RadioJob(None, "invalidate_index")
+        job.set_target(self._model)
+        job.set_desc(_("Clearing %s memberships") % self._type)
+        self.rthread.submit(job)
         if self.is_focused():
             self.refresh_all_memories()
 
@@ -412,6 +417,11 @@ class MappingMembershipEditor(common.Editor):
 
     def other_editor_changed(self, target_editor):
         self._loaded = False
+        # Memories may have been moved or erased under the model
+        job = common.RadioJob(None, "invalidate_index")
+        job.set_target(self._model)
+        job.set_desc(_("Clearing %s memberships") % self._type)
+        self.rthread.submit(job)
         if self.is_focused():
             self.refresh_all_memories()
 
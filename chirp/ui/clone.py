@@ -21,7 +21,7 @@ import os
 import gtk
 import gobject
 
-from chirp import platform, directory, detect, chirp_common
+from chirp import platform, directory, detect
 from chirp.ui import miscwidgets, cloneprog, inputdialog, common, config
 
 LOG = logging.getLogger(__name__)
@@ -33,6 +33,8 @@ class CloneSettings:
     def __init__(self):
         self.port = None
         self.radio_class = None
+        # None if uploading only the changes is not possible
+        self.changes_only = None
 
     def __str__(self):
         s = ""
@@ -73,15 +75,16 @@ class CloneSettingsDialog(gtk.Dialog):
         return miscwidgets.make_choice([], False)
 
     def __make_vendor(self, model):
+        # List radios from the directory's driver info, so that a driver
+        # module is not imported until its radio is chosen
         vendors = collections.defaultdict(list)
-        for rclass in sorted(directory.DRV_TO_RADIO.values()):
-            if not issubclass(rclass, chirp_common.CloneModeRadio) and \
-                    not issubclass(rclass, chirp_common.LiveRadio):
+        for info in directory.DRIVER_INFO.values():
+            if not info["clone"] and not info["live"]:
                 continue
 
-            vendors[rclass.VENDOR].append(rclass)
-            for alias in rclass.ALIASES:
-                vendors[alias.VENDOR].append(alias)
+            vendors[info["vendor"]].append(info["model"])
+            for alias_vendor, alias_model, variant in info["aliases"]:
+                vendors[alias_vendor].append(alias_model)
 
         self.__vendors = vendors
 
@@ -101,17 +104,16 @@ class CloneSettingsDialog(gtk.Dialog):
             added_models = []
 
             model.get_model().clear()
-            for rclass in sorted(models, key=lambda c: c.__name__):
-                if rclass.MODEL not in added_models:
-                    model.append_text(rclass.MODEL)
-                    added_models.append(rclass.MODEL)
+            for model_name in sorted(models):
+                if model_name not in added_models:
+                    model.append_text(model_name)
+                    added_models.append(model_name)
 
             if box.get_active_text() in detect.DETECT_FUNCTIONS:
                 model.insert_text(0, _("Detect"))
                 added_models.insert(0, _("Detect"))
 
-            model_names = [x.MODEL for x in models]
-            if conf.get("last_model") in model_names:
+            if conf.get("last_model") in models:
                 model.set_active(added_models.index(conf.get("last_model")))
             else:
                 model.set_active(0)
@@ -143,6 +145,16 @@ class CloneSettingsDialog(gtk.Dialog):
             self.__vend.set_sensitive(False)
             self.__modl.set_sensitive(False)
 
+        self.__changes = None
+        if settings and settings.changes_only is not None:
+            self.__changes = gtk.CheckButton(
+                _("Only upload what changed since the last transfer"))
+            self.__changes.set_active(settings.changes_only)
+            self.__table.attach(self.__changes, 0, 2,
+                                self.__row, self.__row+1)
+            self.__row += 1
+            self.__changes.show()
+
         self.__table.show()
         self.vbox.pack_start(self.__table, 1, 1, 1)
 
@@ -170,6 +182,8 @@ class CloneSettingsDialog(gtk.Dialog):
 
         cs = CloneSettings()
         cs.port = self.__port.get_active_text()
+        if self.__changes:
+            cs.changes_only = self.__changes.get_active()
         if model == _("Detect"):
             try:
                 cs.radio_class = detect.DETECT_FUNCTIONS[vendor](cs.port)
@@ -183,16 +197,19 @@ class CloneSettingsDialog(gtk.Dialog):
                 d.destroy()
                 return None
         else:
-            for rclass in directory.DRV_TO_RADIO.values():
-                if rclass.MODEL == model:
-                    cs.radio_class = rclass
+            for ident in directory.DRV_TO_RADIO.keys():
+                info = directory.DRIVER_INFO[ident]
+                if info["model"] == model:
+                    cs.radio_class = directory.get_radio(ident)
                     break
                 alias_match = None
-                for alias in rclass.ALIASES:
-                    if alias.MODEL == model:
-                        alias_match = rclass
-                        alias_class = alias
-                        break
+                alias_models = [a[1] for a in info["aliases"]]
+                if model in alias_models:
+                    rclass = directory.get_radio(ident)
+                    for alias in rclass.ALIASES:
+                        if alias.MODEL == model:
+                            alias_match = rclass
+                            break
                 if alias_match:
 
                     class DynamicRadioAlias(rclass):
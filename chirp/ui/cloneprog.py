@@ -15,6 +15,8 @@
 
 import gtk
 
+from chirp import chirp_common
+
 
 class CloneProg(gtk.Window):
     def __init__(self, **args):
@@ -59,7 +61,11 @@ class CloneProg(gtk.Window):
         vbox.pack_start(cancel_b, 0, 0, 0)
 
     def status(self, _status):
-        self.infolabel.set_text(_status.msg)
+        if _status.rate:
+            self.infolabel.set_text("%s (%s)" % (
+                _status.msg, chirp_common.format_rate(_status.rate)))
+        else:
+            self.infolabel.set_text(_status.msg)
 
         if _status.cur > _status.max:
             _status.cur = _status.max
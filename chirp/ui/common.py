@@ -18,12 +18,15 @@ import gobject
 import pango
 
 import threading
-import time
 import os
+import copy
+import heapq
+import itertools
 import traceback
+import types
 import logging
 
-from chirp import errors
+from chirp import bitwise, errors
 from chirp.ui import reporting, config
 
 LOG = logging.getLogger(__name__)
@@ -93,6 +96,8 @@ class RadioJob:
         self.kwargs = kwargs
         self.desc = "Working"
         self.target = None
+        self.tag = None
+        self.followers = []
         self.tb = traceback.format_stack()
 
     def __str__(self):
@@ -107,6 +112,11 @@ class RadioJob:
     def set_target(self, target):
         self.target = target
 
+    def set_tag(self, tag):
+        """Mark this job so that it can be cancelled with others having
+        the same @tag"""
+        self.tag = tag
+
     def _execute(self, target, func):
         try:
             DBG("Running %s (%s %s)" % (self.func,
@@ -114,6 +124,9 @@ class RadioJob:
                                         str(self.kwargs)))
             DBG(self.desc)
             result = func(*self.args, **self.kwargs)
+            if isinstance(result, types.GeneratorType):
+                # Run the whole job here, not in the callback
+                result = list(result)
         except errors.InvalidMemoryLocation, e:
             result = e
         except Exception, e:
@@ -128,6 +141,11 @@ class RadioJob:
         if self.cb:
             gobject.idle_add(self.cb, result, *self.cb_args)
 
+        # Identical jobs coalesced with this one get their own copy
+        for job in self.followers:
+            if job.cb:
+                gobject.idle_add(job.cb, copy.deepcopy(result), *job.cb_args)
+
     def execute(self, radio):
         if not self.target:
             self.target = radio
@@ -148,10 +166,19 @@ class RadioThread(threading.Thread, gobject.GObject):
                    (gobject.TYPE_STRING,)),
         }
 
+    # Queued jobs calling one of these with the same arguments are run
+    # once, with the result passed to each of their callbacks
+    COALESCE_FUNCS = ["get_memory"]
+
     def __init__(self, radio, parent=None):
         threading.Thread.__init__(self)
         gobject.GObject.__init__(self)
-        self.__queue = {}
+        # A heap of [priority, sequence, jobs], where jobs is None once
+        # the entry has been coalesced into a later one
+        self.__queue = []
+        self.__sequence = itertools.count()
+        self.__coalesce = {}
+        self.__jobs = 0
         if parent:
             self.__runlock = parent._get_run_lock()
             self.status = lambda msg: parent.status(msg)
@@ -159,12 +186,15 @@ class RadioThread(threading.Thread, gobject.GObject):
             self.__runlock = threading.Lock()
             self.status = self._status
 
-        self.__counter = threading.Semaphore(0)
         self.__lock = threading.Lock()
+        self.__cond = threading.Condition(self.__lock)
 
         self.__enabled = True
         self.radio = radio
 
+        self.__status_msg = None
+        self.__status_pending = False
+
     def _get_run_lock(self):
         return self.__runlock
 
@@ -174,28 +204,42 @@ class RadioThread(threading.Thread, gobject.GObject):
     def _qunlock(self):
         self.__lock.release()
 
+    def _coalesce_key(self, job):
+        if job.__class__ is not RadioJob or job.kwargs or \
+                job.func not in self.COALESCE_FUNCS:
+            return None
+        return (job.target, job.func, job.args)
+
     def _qsubmit(self, job, priority):
-        if priority not in self.__queue:
-            self.__queue[priority] = []
+        key = self._coalesce_key(job)
+        entry = key and self.__coalesce.get(key)
+        if entry:
+            # Run the queued job in this one's place instead, so that it
+            # sees anything submitted in between
+            jobs = entry[2] + [job]
+            priority = min(priority, entry[0])
+            entry[2] = None
+        else:
+            jobs = [job]
+            self.__jobs += 1
 
-        self.__queue[priority].append(job)
-        self.__counter.release()
+        entry = [priority, self.__sequence.next(), jobs]
+        heapq.heappush(self.__queue, entry)
+        if key:
+            self.__coalesce[key] = entry
+        self.__cond.notify_all()
 
     def _queue_clear_below(self, priority):
-        for i in range(0, priority):
-            if i in self.__queue and len(self.__queue[i]) != 0:
-                return False
+        while self.__queue and self.__queue[0][2] is None:
+            heapq.heappop(self.__queue)
 
-        return True
+        return not self.__queue or self.__queue[0][0] >= priority
 
     def _qlock_when_idle(self, priority=10):
-        while True:
-            DBG("Attempting queue lock (%i)" % len(self.__queue))
-            self._qlock()
-            if self._queue_clear_below(priority):
-                return
-            self._qunlock()
-            time.sleep(0.1)
+        self._qlock()
+        while not self._queue_clear_below(priority):
+            DBG("Waiting for queue to be idle (%i)" % self.__jobs)
+            self.__cond.wait()
 
     # This is the external lock, which stops any threads from running
     # so that the radio can be operated synchronously
@@ -210,33 +254,62 @@ class RadioThread(threading.Thread, gobject.GObject):
         self._qsubmit(job, priority)
         self._qunlock()
 
+    def _queue_remove(self, match):
+        queue = []
+        for entry in self.__queue:
+            if entry[2] is None:
+                continue
+            jobs = [job for job in entry[2] if not match(entry[0], job)]
+            if jobs:
+                entry[2] = jobs
+                queue.append(entry)
+            else:
+                self.__coalesce.pop(self._coalesce_key(entry[2][0]), None)
+
+        heapq.heapify(queue)
+        self.__queue = queue
+        self.__jobs = len(queue)
+        self.__cond.notify_all()
+
     def flush(self, priority=None):
         self._qlock()
+        self._queue_remove(lambda prio, job:
+                           priority is None or prio == priority)
+        self._qunlock()
 
-        if priority is None:
-            for i in self.__queue.keys():
-                self.__queue[i] = []
-        else:
-            self.__queue[priority] = []
-
+    def cancel(self, tag):
+        """Remove any queued jobs that were submitted with @tag"""
+        self._qlock()
+        self._queue_remove(lambda prio, job: job.tag == tag)
         self._qunlock()
 
     def stop(self):
         self.flush()
-        self.__counter.release()
+        self._qlock()
         self.__enabled = False
+        self.__cond.notify_all()
+        self._qunlock()
 
     def _status(self, msg):
-        jobs = 0
-        for i in dict(self.__queue):
-                jobs += len(self.__queue[i])
-        gobject.idle_add(self.emit, "status", "[%i] %s" % (jobs, msg))
-
-    def _queue_pop(self, priority):
-        try:
-            return self.__queue[priority].pop(0)
-        except IndexError:
-            return None
+        # Only the latest status is worth showing, so don't queue another
+        # update until the main loop has emitted the last one
+        self.__status_msg = "[%i] %s" % (self.__jobs, msg)
+        if not self.__status_pending:
+            self.__status_pending = True
+            gobject.idle_add(self._emit_status)
+
+    def _emit_status(self):
+        self.__status_pending = False
+        self.emit("status", self.__status_msg)
+
+    def _queue_pop(self):
+        while self.__queue:
+            priority, sequence, jobs = heapq.heappop(self.__queue)
+            if jobs is not None:
+                self.__coalesce.pop(self._coalesce_key(jobs[0]), None)
+                self.__jobs -= 1
+                return jobs
+        return None
 
     def run(self):
         last_job_desc = "idle"
@@ -245,17 +318,18 @@ class RadioThread(threading.Thread, gobject.GObject):
             if last_job_desc:
                 self.status(_("Completed") + " " + last_job_desc +
                             " (" + _("idle") + ")")
-            self.__counter.acquire()
 
             self._qlock()
-            for i in sorted(self.__queue.keys()):
-                job = self._queue_pop(i)
-                if job:
-                    DBG("Running job at priority %i" % i)
-                    break
+            while self.__enabled and not self.__jobs:
+                self.__cond.wait()
+            jobs = self._queue_pop()
+            # Let anyone waiting for the queue to drain check again
+            self.__cond.notify_all()
             self._qunlock()
 
-            if job:
+            if jobs:
+                job = jobs[0]
+                job.followers = jobs[1:]
                 self.lock()
                 self.status(job.desc)
                 job.execute(self.radio)
@@ -396,6 +470,23 @@ def simple_diff(a, b, diffsonly=False):
     return diff
 
 
+def field_diff(obj_a, obj_b, runs):
+    """Return a diff, in the format of simple_diff(), of the fields of two
+    images parsed with the same definition (@obj_a and @obj_b) that are
+    covered by @runs, a list of the (start, end) ranges that changed"""
+    seen = set()
+    diff = ""
+    for start, end in runs:
+        for path, field_a, field_b in bitwise.diff_fields(obj_a, obj_b,
+                                                          start, end):
+            if path in seen:
+                continue
+            seen.add(path)
+            diff += "-%s: %r%s" % (path, field_a, os.linesep)
+            diff += "+%s: %r%s" % (path, field_b, os.linesep)
+    return diff
+
+
 # A quick hacked up tool to show a blob of text in a dialog window
 # using fixed-width fonts. It also highlights lines that start with
 # a '-' in red bold font and '+' with blue bold font.
@@ -16,6 +16,7 @@
 import gtk
 import gobject
 import pango
+import itertools
 import logging
 
 from chirp import errors, chirp_common, import_logic
@@ -252,22 +253,24 @@ class ImportDialog(gtk.Dialog):
 
         src_features = self.src_radio.get_features()
 
+        srcs = []
+        overrides = []
         for old, new, name, comm in import_list:
+            srcs.append(self.src_radio.get_memory(old))
+            overrides.append({"number":  new,
+                              "name":    name,
+                              "comment": comm})
+
+        results = import_logic.import_memories(self.dst_radio, src_features,
+                                               srcs, overrides)
+        for (old, new, name, comm), src, (mem, msgs, error) in \
+                itertools.izip(import_list, srcs, results):
             i += 1
             LOG.debug("%sing %i -> %i" % (self.ACTION, old, new))
 
-            src = self.src_radio.get_memory(old)
-
-            try:
-                mem = import_logic.import_mem(self.dst_radio,
-                                              src_features,
-                                              src,
-                                              {"number":  new,
-                                               "name":    name,
-                                               "comment": comm})
-            except import_logic.ImportError, e:
-                LOG.error("Import error: %s", e)
-                error_messages[new] = str(e)
+            if error:
+                LOG.error("Import error: %s", error)
+                error_messages[new] = str(error)
                 continue
 
             job = common.RadioJob(None, "set_memory", mem)
@@ -523,7 +526,9 @@ class ImportDialog(gtk.Dialog):
                       (number, e))
 
     def populate_list(self):
-        start, end = self.src_radio.get_features().memory_bounds
+        src_features = self.src_radio.get_features()
+        start, end = src_features.memory_bounds
+        rows = []
         for i in range(start, end+1):
             if end > 50 and i % (end/50) == 0:
                 self.ww.set(float(i) / end)
@@ -532,6 +537,20 @@ class ImportDialog(gtk.Dialog):
             except errors.InvalidMemoryLocation, e:
                 continue
             except Exception, e:
+                rows.append((i, None, str(e)))
+                continue
+            if mem.empty:
+                continue
+
+            self.ww.set(float(i) / end)
+            rows.append((i, mem, None))
+
+        results = import_logic.import_memories(
+            self.dst_radio, src_features,
+            [mem for i, mem, error in rows if mem is not None])
+
+        for i, mem, error in rows:
+            if error is not None:
                 self.__store.append(row=(False,
                                          i,
                                          i,
@@ -539,23 +558,17 @@ class ImportDialog(gtk.Dialog):
                                          chirp_common.format_freq(0),
                                          "",
                                          False,
-                                         str(e),
+                                         error,
                                          ))
                 self.record_use_of(i)
                 continue
-            if mem.empty:
-                continue
 
-            self.ww.set(float(i) / end)
-            try:
-                msgs = self.dst_radio.validate_memory(
-                        import_logic.import_mem(self.dst_radio,
-                                                self.src_radio.get_features(),
-                                                mem))
-            except import_logic.DestNotCompatible:
-                msgs = self.dst_radio.validate_memory(mem)
+            dst_mem, msgs, error = results.next()
             errs = [x for x in msgs
                     if isinstance(x, chirp_common.ValidationError)]
+            if dst_mem is None:
+                # It could not even be converted
+                msgs = errs = [str(error)]
             if errs:
                 msg = _("Cannot be imported because") + ":\r\n"
                 msg += ",".join(errs)
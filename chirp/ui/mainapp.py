@@ -28,7 +28,7 @@ import gobject
 import sys
 
 from chirp.ui import inputdialog, common
-from chirp import platform, directory, util
+from chirp import bufops, platform, directory
 from chirp.drivers import generic_xml, generic_csv, repeaterbook
 from chirp.drivers import ic9x, kenwood_live, idrp, vx7, vx5, vx6
 from chirp.drivers import icf, ic9x_icf
@@ -246,21 +246,37 @@ class ChirpMain(gtk.Window):
         elif isinstance(eset_a.rthread.radio, chirp_common.CloneModeRadio) and\
                 isinstance(eset_b.rthread.radio, chirp_common.CloneModeRadio):
             # Diff whole (can do this without a job, since both are clone-mode)
+            addrfmt = None
             try:
                 addrfmt = CONF.get('hexdump_addrfmt', section='developer',
                                    raw=True)
             except:
                 pass
-            a = util.hexprint(eset_a.rthread.radio._mmap.get_packed(),
-                              addrfmt=addrfmt)
-            b = util.hexprint(eset_b.rthread.radio._mmap.get_packed(),
-                              addrfmt=addrfmt)
             if sel_chan_a == -2:
                 diffsonly = True
             else:
                 diffsonly = False
-            common.show_diff_blob(diffwintitle,
-                                  common.simple_diff(a, b, diffsonly))
+            radio_a = eset_a.rthread.radio
+            radio_b = eset_b.rthread.radio
+            image_a = radio_a._mmap.get_packed()
+            image_b = radio_b._mmap.get_packed()
+            diff = bufops.hexdiff(image_a, image_b, addrfmt, diffsonly)
+
+            # Name the changed fields too, if both images have the same
+            # layout
+            if radio_a.__class__ == radio_b.__class__ and \
+                    getattr(radio_a, "_memobj", None) is not None:
+                try:
+                    fields = common.field_diff(
+                        radio_a._memobj, radio_b._memobj,
+                        bufops.diff_runs(image_a, image_b))
+                except Exception:
+                    LOG.exception("Unable to diff the fields of %s" %
+                                  radio_a.MODEL)
+                    fields = ""
+                if fields:
+                    diff = fields + os.linesep + diff
+            common.show_diff_blob(diffwintitle, diff)
         else:
             common.show_error("Cannot diff whole live-mode radios!")
 
@@ -275,10 +291,10 @@ class ChirpMain(gtk.Window):
 
     def _do_manual_select(self, filename):
         radiolist = {}
-        for drv, radio in directory.DRV_TO_RADIO.items():
-            if not issubclass(radio, chirp_common.CloneModeRadio):
+        for drv, info in directory.DRIVER_INFO.items():
+            if not info["clone"]:
                 continue
-            radiolist["%s %s" % (radio.VENDOR, radio.MODEL)] = drv
+            radiolist["%s %s" % (info["vendor"], info["model"])] = drv
 
         lab = gtk.Label("""<b><big>Unable to detect model!</big></b>
 
@@ -763,6 +779,9 @@ of file.
 
         settings = clone.CloneSettings()
         settings.radio_class = radio.__class__
+        if isinstance(radio, chirp_common.CloneModeRadio) and \
+                radio.can_upload_changes():
+            settings.changes_only = False
 
         d = clone.CloneSettingsDialog(settings, parent=self)
         settings = d.run()
@@ -797,6 +816,8 @@ of file.
             self._show_instructions(radio, prompts.pre_upload)
 
         radio.set_pipe(ser)
+        if isinstance(radio, chirp_common.CloneModeRadio):
+            radio.upload_changes_only = bool(settings.changes_only)
 
         ct = clone.CloneThread(radio, "out", cb=self.cb_cloneout, parent=self)
         ct.start()
@@ -834,6 +855,7 @@ of file.
             eset.radio.pipe.close()
 
         if isinstance(eset.radio, chirp_common.LiveRadio):
+            eset.radio.save_memory_cache()
             action = self.menu_ag.get_action("openlive")
             if action:
                 action.set_sensitive(True)
@@ -2153,6 +2175,13 @@ of file.
                           'startup.')
         self.setup_extra_hotkeys()
 
+        if not CONF.get_bool("skip_memory_cache", "state"):
+            try:
+                chirp_common.set_memory_cache_dir(
+                    platform.get_platform().config_file("memcache"))
+            except OSError, e:
+                LOG.warn("Unable to create memory cache directory: %s" % e)
+
         def updates_callback(ver):
             gobject.idle_add(self._updates, ver)
 
@@ -125,6 +125,15 @@ class MemoryEditor(common.Editor):
         _("Cross Mode"):     chirp_common.CROSS_MODES,
         }
 
+    # Number of memories fetched by each job when filling the editor
+    BATCH_SIZE = 50
+    # Fetched memories are added to the store FLUSH_ROWS at a time, or
+    # after FLUSH_INTERVAL milliseconds, whichever comes first.  Frames
+    # of at least DETACH_ROWS are added with the view detached.
+    FLUSH_ROWS = 100
+    FLUSH_INTERVAL = 100
+    DETACH_ROWS = 20
+
     def ed_name(self, _, __, new, ___):
         return self.rthread.radio.filter_name(new)
 
@@ -946,6 +955,10 @@ class MemoryEditor(common.Editor):
     def make_editor(self):
         types = tuple([x[1] for x in self.cols])
         self.store = gtk.ListStore(*types)
+        # Location to gtk.TreeRowReference, kept up to date whenever a
+        # row's contents change; removed rows become invalid references
+        self._loc_rows = {}
+        self.store.connect("row-changed", self._row_changed)
 
         self.view = gtk.TreeView(self.store)
         self.view.get_selection().set_mode(gtk.SELECTION_MULTIPLE)
@@ -1049,9 +1062,53 @@ class MemoryEditor(common.Editor):
                 _("Internal Error: Column {name} not found").format(
                     name=caption))
 
+    def _queue_memory(self, memory):
+        """Add @memory to the store with the next frame of updates"""
+        self._pending_mems.append(memory)
+        if len(self._pending_mems) >= self.FLUSH_ROWS:
+            self._flush_memories()
+        elif not self._flush_pending:
+            self._flush_pending = True
+            gobject.timeout_add(self.FLUSH_INTERVAL, self._flush_timeout)
+
+    def _flush_timeout(self):
+        self._flush_pending = False
+        self._flush_memories()
+        return False
+
+    def _flush_memories(self):
+        mems = self._pending_mems
+        self._pending_mems = []
+        if not mems:
+            return
+
+        # Don't let the view redraw, or the store re-sort, for every row
+        detach = len(mems) >= self.DETACH_ROWS and not self._in_editing
+        if detach:
+            sort_col, sort_order = self.store.get_sort_column_id()
+            scroll = self.view.get_vadjustment().get_value()
+            self.view.set_model(None)
+            # GTK_TREE_SORTABLE_UNSORTED_SORT_COLUMN_ID
+            self.store.set_sort_column_id(-2, gtk.SORT_ASCENDING)
+
+        try:
+            for mem in mems:
+                self.set_memory(mem)
+        finally:
+            if detach:
+                if sort_col is not None:
+                    self.store.set_sort_column_id(sort_col, sort_order)
+                self.view.set_model(self.store)
+                self.view.get_vadjustment().set_value(scroll)
+
     def prefill(self):
+        # Anything still queued from the last fill is for the old rows
+        self.rthread.cancel(self._prefill_tag)
+
         self.store.clear()
         self._rows_in_store = 0
+        self._loc_rows = {}
+        self._pending_mems = []
 
         lo = int(self.lo_limit_adj.get_value())
         hi = int(self.hi_limit_adj.get_value())
@@ -1059,27 +1116,98 @@ class MemoryEditor(common.Editor):
         def handler(mem, number):
             if not isinstance(mem, Exception):
                 if not mem.empty or self.show_empty:
-                    gobject.idle_add(self.set_memory, mem)
+                    self._queue_memory(mem)
             else:
                 mem = chirp_common.Memory()
                 mem.number = number
                 mem.name = "ERROR"
                 mem.empty = True
-                gobject.idle_add(self.set_memory, mem)
+                self._queue_memory(mem)
 
-        for i in range(lo, hi+1):
-            job = common.RadioJob(handler, "get_memory", i)
-            job.set_desc(_("Getting memory {number}").format(number=i))
-            job.set_cb_args(i)
-            self.rthread.submit(job, 2)
+        def get_each(numbers):
+            for i in numbers:
+                job = common.RadioJob(handler, "get_memory", i)
+                job.set_desc(_("Getting memory {number}").format(number=i))
+                job.set_cb_args(i)
+                job.set_tag(self._prefill_tag)
+                self.rthread.submit(job, 2)
+
+        def batch_handler(mems, lo, hi):
+            if isinstance(mems, Exception):
+                # Fetch them one at a time, so the bad ones are marked
+                get_each(range(lo, hi + 1))
+                return
+
+            missing = set(range(lo, hi + 1))
+            for mem in mems:
+                missing.discard(mem.number)
+                if not mem.empty or self.show_empty:
+                    self._queue_memory(mem)
+            get_each(sorted(missing))
+
+        def cached_handler(mem, number):
+            # The memory may have been read or changed in the meantime
+            if mem is not None:
+                handler(mem, number)
+
+        if isinstance(self.rthread.radio, chirp_common.LiveRadio):
+            # Memories cached from a previous session are shown straight
+            # away, then read again in the background in case the radio
+            # was changed in the meantime
+            unverified = [i for i in
+                          self.rthread.radio.get_unverified_memories()
+                          if lo <= i <= hi]
+            for i in unverified:
+                job = common.RadioJob(cached_handler,
+                                      "get_unverified_memory", i)
+                job.set_desc(_("Getting memory {number}").format(number=i))
+                job.set_cb_args(i)
+                job.set_tag(self._prefill_tag)
+                self.rthread.submit(job, 2)
+
+            # Every memory is a round trip to the radio, so keep them
+            # as separate jobs that others can run between
+            get_each(sorted(set(range(lo, hi + 1)) - set(unverified)))
+        else:
+            for i in range(lo, hi + 1, self.BATCH_SIZE):
+                last = min(i + self.BATCH_SIZE - 1, hi)
+                job = common.RadioJob(batch_handler, "get_memories", i, last)
+                job.set_desc(_("Getting memories {lo}-{hi}").format(
+                    lo=i, hi=last))
+                job.set_cb_args(i, last)
+                job.set_tag(self._prefill_tag)
+                self.rthread.submit(job, 2)
 
         if self.show_special:
             for i in self._features.valid_special_chans:
                 job = common.RadioJob(handler, "get_memory", i)
                 job.set_desc(_("Getting channel {chan}").format(chan=i))
                 job.set_cb_args(i)
+                job.set_tag(self._prefill_tag)
                 self.rthread.submit(job, 2)
 
+        if isinstance(self.rthread.radio, chirp_common.LiveRadio):
+            for i in unverified:
+                job = common.RadioJob(self._verify_handler,
+                                      "verify_memory", i)
+                job.set_desc(_("Verifying memory {number}").format(
+                    number=i))
+                job.set_tag(self._prefill_tag)
+                self.rthread.submit(job, 10)
+
+    def _verify_handler(self, mem):
+        if isinstance(mem, Exception):
+            LOG.error("Failed to verify memory: %s" % mem)
+        elif not mem.empty or self.show_empty:
+            self._queue_memory(mem)
+        else:
+            # The cached copy may still be waiting to be shown
+            self._flush_memories()
+            iter = self._get_loc_iter(mem.number)
+            if iter is not None:
+                self.store.remove(iter)
+                self._rows_in_store -= 1
+
     def _set_memory(self, iter, memory):
         self.store.set(iter,
                        self.col("_filled"), not memory.empty,
@@ -1105,34 +1233,48 @@ class MemoryEditor(common.Editor):
         hide = self._get_cols_to_hide(iter)
         self.store.set(iter, self.col("_hide_cols"), hide)
 
-    def set_memory(self, memory):
-        iter = self.store.get_iter_first()
-
-        while iter is not None:
+    def _row_changed(self, store, path, iter):
+        loc, = store.get(iter, self.col(_("Loc")))
+        ref = self._loc_rows.get(loc)
+        if ref is None or ref.get_path() != path:
+            self._loc_rows[loc] = gtk.TreeRowReference(store, path)
+
+    def _get_loc_iter(self, number):
+        """Return the row for location @number, or None if not shown"""
+        ref = self._loc_rows.get(number)
+        if ref is None:
+            return None
+
+        # The row may since have been removed or given another location
+        path = ref.get_path()
+        if path is not None:
+            iter = self.store.get_iter(path)
             loc, = self.store.get(iter, self.col(_("Loc")))
-            if loc == memory.number:
-                return self._set_memory(iter, memory)
+            if loc == number:
+                return iter
 
-            iter = self.store.iter_next(iter)
+        del self._loc_rows[number]
+        return None
+
+    def set_memory(self, memory):
+        iter = self._get_loc_iter(memory.number)
+        if iter is not None:
+            return self._set_memory(iter, memory)
 
         iter = self.store.append()
         self._rows_in_store += 1
         self._set_memory(iter, memory)
 
     def clear_memory(self, number):
-        iter = self.store.get_iter_first()
-        while iter:
-            loc, = self.store.get(iter, self.col(_("Loc")))
-            if loc == number:
-                LOG.debug("Deleting %i" % number)
-                # FIXME: Make the actual remove happen on callback
-                self.store.remove(iter)
-                job = common.RadioJob(None, "erase_memory", number)
-                job.set_desc(
-                    _("Erasing memory {number}").format(number=number))
-                self.rthread.submit()
-                break
-            iter = self.store.iter_next(iter)
+        iter = self._get_loc_iter(number)
+        if iter is not None:
+            LOG.debug("Deleting %i" % number)
+            # FIXME: Make the actual remove happen on callback
+            self.store.remove(iter)
+            job = common.RadioJob(None, "erase_memory", number)
+            job.set_desc(
+                _("Erasing memory {number}").format(number=number))
+            self.rthread.submit(job)
 
     def _set_mem_vals(self, mem, vals, iter):
         power_levels = {"": None}
@@ -1351,6 +1493,12 @@ class MemoryEditor(common.Editor):
 
         self.lo_limit_adj = self.hi_limit_adj = None
         self.store = self.view = None
+        self._pending_mems = []
+        self._flush_pending = False
+        # Tags for the jobs filling the editor, and fetching the rest of
+        # the memories in the background
+        self._prefill_tag = (self, "prefill")
+        self._fetch_tag = (self, "fetch")
 
         self.__cache_columns()
 
@@ -1392,6 +1540,7 @@ class MemoryEditor(common.Editor):
         for i in range(hi, max+1):
             job = common.RadioJob(None, "get_memory", i)
             job.set_desc(_("Getting memory {number}").format(number=i))
+            job.set_tag(self._fetch_tag)
             self.rthread.submit(job, 10)
 
     def _set_memory_cb(self, result):
@@ -1533,6 +1682,9 @@ class MemoryEditor(common.Editor):
         self.view.get_selection().select_all()
 
     def prepare_close(self):
+        self.rthread.cancel(self._prefill_tag)
+        self.rthread.cancel(self._fetch_tag)
+
         cols = self.view.get_columns()
         self._config.set("column_order_%s" % self.__class__.__name__,
                          ",".join([x.get_title() for x in cols]))
@@ -15,52 +15,12 @@
 
 import struct
 
+from chirp import bufops
+
 
 def hexprint(data, addrfmt=None):
     """Return a hexdump-like encoding of @data"""
-    if addrfmt is None:
-        addrfmt = '%(addr)03i'
-
-    block_size = 8
-
-    lines = len(data) / block_size
-
-    if (len(data) % block_size) != 0:
-        lines += 1
-        data += "\x00" * ((lines * block_size) - len(data))
-
-    out = ""
-
-    for block in range(0, (len(data)/block_size)):
-        addr = block * block_size
-        try:
-            out += addrfmt % locals()
-        except (OverflowError, ValueError, TypeError, KeyError):
-            out += "%03i" % addr
-        out += ': '
-
-        left = len(data) - (block * block_size)
-        if left < block_size:
-            limit = left
-        else:
-            limit = block_size
-
-        for j in range(0, limit):
-            out += "%02x " % ord(data[(block * block_size) + j])
-
-        out += "  "
-
-        for j in range(0, limit):
-            char = data[(block * block_size) + j]
-
-            if ord(char) > 0x20 and ord(char) < 0x7E:
-                out += "%s" % char
-            else:
-                out += "."
-
-        out += "\n"
-
-    return out
+    return bufops.hexdump(data, addrfmt)
 
 
 def bcd_encode(val, bigendian=True, width=None):
@@ -18,51 +18,95 @@ import re
 from chirp import chirp_common, errors
 
 
-def get_memory(doc, number):
-    """Extract a Memory object from @doc"""
-    ctx = doc.xpathNewContext()
+def _children(node, name):
+    """Iterate over the child elements of @node called @name"""
+    child = node.children
+    while child is not None:
+        if child.type == "element" and child.name == name:
+            yield child
+        child = child.next
+
+
+def _child(node, name):
+    for child in _children(node, name):
+        return child
+    return None
+
+
+def _text(node, *path):
+    """Return the text of the element at @path below @node, or "" """
+    for name in path:
+        if node is None:
+            break
+        node = _child(node, name)
+    if node is None:
+        return ""
+    return node.getContent()
+
+
+def _memories_node(doc):
+    return _child(doc.getRootElement(), "memories")
+
+
+def index_memories(doc):
+    """Return a dict of the memory nodes in @doc, as a list of the nodes
+    claiming each location. Passing it to get_memory(), set_memory() and
+    del_memory() saves them searching the document, and they keep it up
+    to date."""
+    index = {}
+    for memnode in _children(_memories_node(doc), "memory"):
+        index.setdefault(int(memnode.prop("location")), []).append(memnode)
+    return index
+
+
+def _find_memory(index, number):
+    nodes = index.get(number, [])
+    if len(nodes) > 1:
+        raise errors.RadioError("%i memories claiming to be %i" % (len(nodes),
+                                                                   number))
+    elif not nodes:
+        return None
+    return nodes[0]
 
-    base = "//radio/memories/memory[@location=%i]" % number
 
-    fields = ctx.xpathEval(base)
-    if len(fields) > 1:
-        raise errors.RadioError("%i memories claiming to be %i" % (len(fields),
-                                                                   number))
-    elif len(fields) == 0:
+def get_memory(doc, number, index=None):
+    """Extract a Memory object from @doc"""
+    if index is None:
+        index = index_memories(doc)
+
+    memnode = _find_memory(index, number)
+    if memnode is None:
         raise errors.InvalidMemoryLocation("%i does not exist" % number)
 
-    memnode = fields[0]
+    squelch = {}
+    for node in _children(memnode, "squelch"):
+        squelch.setdefault(node.prop("id"), node)
 
-    def _get(ext):
-        path = base + ext
-        result = ctx.xpathEval(path)
-        if result:
-            return result[0].getContent()
-        else:
-            return ""
+    def _get(*path):
+        return _text(memnode, *path)
 
-    if _get("/mode/text()") == "DV":
+    if _get("mode") == "DV":
         mem = chirp_common.DVMemory()
-        mem.dv_urcall = _get("/dv/urcall/text()")
-        mem.dv_rpt1call = _get("/dv/rpt1call/text()")
-        mem.dv_rpt2call = _get("/dv/rpt2call/text()")
+        mem.dv_urcall = _get("dv", "urcall")
+        mem.dv_rpt1call = _get("dv", "rpt1call")
+        mem.dv_rpt2call = _get("dv", "rpt2call")
         try:
-            mem.dv_code = _get("/dv/digitalCode/text()")
+            mem.dv_code = _get("dv", "digitalCode")
         except ValueError:
             mem.dv_code = 0
     else:
         mem = chirp_common.Memory()
 
     mem.number = int(memnode.prop("location"))
-    mem.name = _get("/longName/text()")
-    mem.freq = chirp_common.parse_freq(_get("/frequency/text()"))
-    mem.rtone = float(_get("/squelch[@id='rtone']/tone/text()"))
-    mem.ctone = float(_get("/squelch[@id='ctone']/tone/text()"))
-    mem.dtcs = int(_get("/squelch[@id='dtcs']/code/text()"), 10)
-    mem.dtcs_polarity = _get("/squelch[@id='dtcs']/polarity/text()")
+    mem.name = _get("longName")
+    mem.freq = chirp_common.parse_freq(_get("frequency"))
+    mem.rtone = float(_text(squelch.get("rtone"), "tone"))
+    mem.ctone = float(_text(squelch.get("ctone"), "tone"))
+    mem.dtcs = int(_text(squelch.get("dtcs"), "code"), 10)
+    mem.dtcs_polarity = _text(squelch.get("dtcs"), "polarity")
 
     try:
-        sql = _get("/squelchSetting/text()")
+        sql = _get("squelchSetting")
         if sql == "rtone":
             mem.tmode = "Tone"
         elif sql == "ctone":
@@ -75,14 +119,14 @@ def get_memory(doc, number):
         mem.tmode = ""
 
     dmap = {"positive": "+", "negative": "-", "none": ""}
-    dupx = _get("/duplex/text()")
+    dupx = _get("duplex")
     mem.duplex = dmap.get(dupx, "")
 
-    mem.offset = chirp_common.parse_freq(_get("/offset/text()"))
-    mem.mode = _get("/mode/text()")
-    mem.tuning_step = float(_get("/tuningStep/text()"))
+    mem.offset = chirp_common.parse_freq(_get("offset"))
+    mem.mode = _get("mode")
+    mem.tuning_step = float(_get("tuningStep"))
 
-    skip = _get("/skip/text()")
+    skip = _get("skip")
     if skip == "none":
         mem.skip = ""
     else:
@@ -99,21 +143,17 @@ def get_memory(doc, number):
     return mem
 
 
-def set_memory(doc, mem):
+def set_memory(doc, mem, index=None):
     """Set @mem in @doc"""
-    ctx = doc.xpathNewContext()
-
-    base = "//radio/memories/memory[@location=%i]" % mem.number
+    if index is None:
+        index = index_memories(doc)
 
-    fields = ctx.xpathEval(base)
-    if len(fields) > 1:
-        raise errors.RadioError("%i memories claiming to be %i" % (len(fields),
-                                                                   mem.number))
-    elif len(fields) == 1:
-        fields[0].unlinkNode()
+    memnode = _find_memory(index, mem.number)
+    if memnode is not None:
+        memnode.unlinkNode()
 
-    radio = ctx.xpathEval("//radio/memories")[0]
-    memnode = radio.newChild(None, "memory", None)
+    memnode = _memories_node(doc).newChild(None, "memory", None)
+    index[mem.number] = [memnode]
     memnode.newProp("location", "%i" % mem.number)
 
     sname_filter = "[^A-Z0-9/ >-]"
@@ -200,14 +240,13 @@ def set_memory(doc, mem):
         dc.addContent(str(mem.dv_code))
 
 
-def del_memory(doc, number):
+def del_memory(doc, number, index=None):
     """Remove memory @number from @doc"""
-    path = "//radio/memories/memory[@location=%i]" % number
-    ctx = doc.xpathNewContext()
-    fields = ctx.xpathEval(path)
+    if index is None:
+        index = index_memories(doc)
 
-    for field in fields:
-        field.unlinkNode()
+    for memnode in index.pop(number, []):
+        memnode.unlinkNode()
 
 
 def _get_bank(node):
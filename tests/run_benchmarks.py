@@ -0,0 +1,269 @@
+#!/usr/bin/env python
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Time common driver operations against the images in tests/images,
+and optionally compare the results with a stored baseline"""
+
+import glob
+import json
+import logging
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from optparse import OptionParser
+
+# change to the tests directory
+scriptdir = os.path.dirname(sys.argv[0])
+if scriptdir:
+    os.chdir(scriptdir)
+
+sys.path.insert(0, "../")
+
+os.environ['CHIRP_TESTENV'] = 'sigh'
+from chirp import logger
+
+
+class LoggerOpts(object):
+    quiet = 2
+    verbose = 0
+    log_file = os.path.join('logs', 'benchmark.log')
+    log_level = logging.DEBUG
+
+if not os.path.exists("logs"):
+    os.mkdir("logs")
+logger.handle_options(LoggerOpts())
+
+from chirp import CHIRP_VERSION
+from chirp.drivers import *
+from chirp import directory
+
+LOG = logging.getLogger("run_benchmarks")
+
+IMAGE_OPERATIONS = ["process_mmap", "save_mmap"]
+MEMORY_OPERATIONS = ["get_memories", "set_memories",
+                     "get_settings", "set_settings"]
+OPERATIONS = IMAGE_OPERATIONS + MEMORY_OPERATIONS
+
+
+def _best_of(repeat, function):
+    """Return the shortest time taken by @repeat calls of @function"""
+    best = None
+    for i in range(repeat):
+        start = time.time()
+        function()
+        elapsed = time.time() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+class Benchmark:
+    """Times the OPERATIONS for one radio, loaded from a copy of an
+    image file"""
+
+    def __init__(self, radio, image, repeat):
+        self._radio = radio
+        self._image = image
+        self._repeat = repeat
+        self._rf = radio.get_features()
+        lo, hi = self._rf.memory_bounds
+        self._numbers = range(lo, hi + 1)
+        self._mems = []
+
+    def process_mmap(self):
+        self._radio.process_mmap()
+
+    def get_memories(self):
+        self._mems = list(self._radio.get_memories(self._numbers[0],
+                                                   self._numbers[-1]))
+
+    def set_memories(self):
+        if not self._mems:
+            self.get_memories()
+        for mem in self._mems:
+            self._radio.set_memory(mem)
+
+    def get_settings(self):
+        if not self._rf.has_settings:
+            raise NotImplementedError()
+        self._radio.get_settings()
+
+    def set_settings(self):
+        if not self._rf.has_settings:
+            raise NotImplementedError()
+        self._radio.set_settings(self._radio.get_settings())
+
+    def save_mmap(self):
+        self._radio.save_mmap(self._image)
+
+    def run(self, operations=OPERATIONS):
+        """Return a dict of operation name to best time in seconds, or
+        None where the radio does not support (or failed) it"""
+        result = {}
+        if "get_memories" in operations:
+            result["channels"] = len(self._numbers)
+        for op in operations:
+            try:
+                result[op] = _best_of(self._repeat, getattr(self, op))
+            except NotImplementedError:
+                result[op] = None
+            except Exception:
+                LOG.exception("%s failed for %s" % (op, self._image))
+                result[op] = None
+        return result
+
+
+class BenchmarkRunner:
+    def __init__(self, images_dir, repeat=3):
+        self._images_dir = images_dir
+        self._repeat = repeat
+
+    def _make_list(self, drivers=None):
+        run_list = []
+        images = glob.glob(os.path.join(self._images_dir, "*.img"))
+        for image in sorted(images):
+            drv_name, _ = os.path.splitext(os.path.basename(image))
+            if drivers and drv_name not in drivers:
+                continue
+            run_list.append((drv_name, image))
+        return run_list
+
+    def run_image(self, drv_name, image):
+        """Benchmark the driver for @image (and any sub-devices it has),
+        returning a dict of result name to timings"""
+        testimage = tempfile.mktemp(".img", drv_name)
+        shutil.copy(image, testimage)
+
+        try:
+            rclass = directory.get_radio(drv_name)
+            start = time.time()
+            radio = rclass(testimage)
+            load = time.time() - start
+
+            if not radio.get_features().has_sub_devices:
+                results = {drv_name: Benchmark(radio, testimage,
+                                               self._repeat).run()}
+                results[drv_name]["load"] = load
+                return results
+
+            # The image belongs to the parent, and the memories and
+            # settings to each of its sub-devices
+            results = {drv_name: Benchmark(radio, testimage,
+                                           self._repeat).run(
+                                               IMAGE_OPERATIONS)}
+            results[drv_name]["load"] = load
+            for dev in radio.get_sub_devices():
+                name = "%s_%s" % (drv_name, dev.VARIANT)
+                results[name] = Benchmark(dev, testimage,
+                                          self._repeat).run(
+                                              MEMORY_OPERATIONS)
+            return results
+        finally:
+            os.remove(testimage)
+
+    def run(self, drivers=None, output=sys.stdout):
+        results = {}
+        for drv_name, image in self._make_list(drivers):
+            print >>output, "%-40s" % drv_name,
+            output.flush()
+            try:
+                results.update(self.run_image(drv_name, image))
+                print >>output, "done"
+            except Exception, e:
+                LOG.exception("Unable to benchmark %s" % drv_name)
+                print >>output, "error: %s" % e
+        return results
+
+
+def compare(baseline, results, threshold, min_time=0.001,
+            output=sys.stdout):
+    """Print the operations in @results that are more than @threshold
+    (a fraction) slower than in @baseline, and return their number.
+    Operations faster than @min_time seconds are too noisy to compare."""
+    regressions = 0
+    for name in sorted(results):
+        if name not in baseline:
+            continue
+        for op in ["load"] + OPERATIONS:
+            old = baseline[name].get(op)
+            new = results[name].get(op)
+            if not old or new is None or max(old, new) < min_time:
+                continue
+            change = (new - old) / old
+            if change > threshold:
+                regressions += 1
+                status = "SLOWER"
+            elif change < -threshold:
+                status = "faster"
+            else:
+                continue
+            print >>output, "%-8s %-40s %-14s %9.5fs -> %9.5fs (%+.0f%%)" % (
+                status, name, op, old, new, change * 100)
+    return regressions
+
+
+if __name__ == "__main__":
+    op = OptionParser()
+    op.add_option("-d", "--driver", dest="drivers", action="append",
+                  default=[], help="Driver to benchmark (omit for all)")
+    op.add_option("-r", "--repeat", dest="repeat", default=3, type="int",
+                  help="Times to repeat each operation (best is kept)")
+    op.add_option("-o", "--output", dest="output", default=None,
+                  help="Write results as JSON to this file")
+    op.add_option("-b", "--baseline", dest="baseline", default=None,
+                  help="Compare with results stored by --output")
+    op.add_option("-t", "--threshold", dest="threshold", default=0.25,
+                  type="float",
+                  help="Fraction slower than baseline to report as a "
+                       "regression (default 0.25)")
+    op.add_option("-m", "--min-time", dest="min_time", default=0.001,
+                  type="float",
+                  help="Ignore operations faster than this many seconds "
+                       "when comparing (default 0.001)")
+    (options, args) = op.parse_args()
+
+    # Keep anything the drivers print out of the results
+    stdout = sys.stdout
+    sys.stdout = file("logs/verbose", "w")
+
+    runner = BenchmarkRunner("images", options.repeat)
+    results = runner.run(options.drivers, stdout)
+
+    doc = {
+        "chirp_version": CHIRP_VERSION,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": options.repeat,
+        "results": results,
+    }
+    if options.output:
+        with open(options.output, "w") as f:
+            json.dump(doc, f, indent=1, sort_keys=True)
+
+    if options.baseline:
+        with open(options.baseline) as f:
+            baseline = json.load(f)
+        print >>stdout, "-" * 70
+        regressions = compare(baseline["results"], results,
+                              options.threshold, options.min_time, stdout)
+        print >>stdout, "%i regression(s) against %s" % (regressions,
+                                                         options.baseline)
+        sys.exit(regressions and 1 or 0)
+    elif not options.output:
+        json.dump(doc, stdout, indent=1, sort_keys=True)
+        print >>stdout
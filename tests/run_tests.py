@@ -21,6 +21,7 @@ import sys
 import os
 import shutil
 import glob
+import multiprocessing
 import tempfile
 import time
 from optparse import OptionParser
@@ -994,6 +995,7 @@ class TestOutput:
         if not output:
             output = sys.stdout
         self._out = output
+        self._timings = []
 
     def prepare(self):
         pass
@@ -1004,6 +1006,13 @@ class TestOutput:
     def _print(self, string):
         print >>self._out, string
 
+    def timing(self, rclass, tc, elapsed):
+        self._timings.append((elapsed, rclass, tc))
+
+    def slowest(self, count=None):
+        timings = sorted(self._timings, key=lambda t: t[0], reverse=True)
+        return timings[:count]
+
     def report(self, rclass, tc, msg, e):
         name = ("%s %s" % (rclass.MODEL, rclass.VARIANT))[:13]
         self._print("%9s %-13s %-10s %s %s" % (rclass.VENDOR.split(" ")[0],
@@ -1043,6 +1052,12 @@ class TestOutputANSI(TestOutput):
 
     def cleanup(self):
         self._print("-" * 70)
+        self._print("Slowest tests:")
+        for elapsed, rclass, tc in self.slowest(10):
+            self._print("  %7.2fs %s %s %s %s" % (elapsed, rclass.VENDOR,
+                                                  rclass.MODEL,
+                                                  rclass.VARIANT, tc))
+        self._print("-" * 70)
         self._print("Results:")
         self._print("  %-7s: %i" % ("TOTAL", self.__total))
         for t, c in self.__counts.items():
@@ -1051,6 +1066,7 @@ class TestOutputANSI(TestOutput):
 
 class TestOutputHTML(TestOutput):
     def __init__(self, filename):
+        TestOutput.__init__(self)
         self._filename = filename
 
     def prepare(self):
@@ -1101,6 +1117,16 @@ td.SKIPPED {
         print >>self._out, s
 
     def cleanup(self):
+        print >>self._out, "</table>"
+        print >>self._out, "<h3>Test timings</h3>"
+        print >>self._out, "<table class=\"testlist\">"
+        print >>self._out, ("<tr><th>Vendor</th><th>Model</th>"
+                            "<th>Test Case</th><th>Seconds</th></tr>")
+        for elapsed, rclass, tc in self.slowest():
+            print >>self._out, (
+                "<tr><td>%s</td><td>%s %s</td><td>%s</td>"
+                "<td>%.2f</td></tr>" % (rclass.VENDOR, rclass.MODEL,
+                                        rclass.VARIANT, tc, elapsed))
         print >>self._out, "</table></body>"
         self._out.close()
         print "Done"
@@ -1119,6 +1145,41 @@ td.SKIPPED {
         sys.stdout.flush()
 
 
+class TestOutputCollector(TestOutput):
+    """Record results in a worker process, to be passed back to the
+    real output by the parent"""
+    def __init__(self):
+        TestOutput.__init__(self)
+        self.reports = []
+
+    def report(self, rclass, tc, msg, e):
+        self.reports.append((RadioName(rclass), str(tc), msg, str(e)))
+
+    def timing(self, rclass, tc, elapsed):
+        TestOutput.timing(self, RadioName(rclass), str(tc), elapsed)
+
+
+class RadioName:
+    """The identity of a radio class, which can be pickled"""
+    def __init__(self, rclass):
+        self.VENDOR = rclass.VENDOR
+        self.MODEL = rclass.MODEL
+        self.VARIANT = rclass.VARIANT
+
+
+def _run_job(job):
+    drv_name, image, tcclass = job
+    out = TestOutputCollector()
+    tr = TestRunner(os.path.dirname(image), [tcclass], out)
+    try:
+        failed = tr.run_rclass_image(directory.get_radio(drv_name), image)
+    except Exception:
+        # Exceptions may not survive the trip back to the parent, so
+        # send the traceback instead
+        return None, get_tb(), None
+    return failed, out.reports, out._timings
+
+
 class TestRunner:
     def __init__(self, images_dir, test_list, test_out):
         self._images_dir = images_dir
@@ -1156,6 +1217,7 @@ class TestRunner:
         nfailed = 0
         for tcclass in self._test_list:
             nprinted = 0
+            start = time.time()
             tw = TestWrapper(rclass, parm, dst=dst)
             tc = tcclass(tw)
 
@@ -1191,6 +1253,7 @@ class TestRunner:
 
             if not nprinted:
                 self.report(rclass, tc, "PASSED", "All tests")
+            self._test_out.timing(rclass, tc, time.time() - start)
 
         return nfailed
 
@@ -1210,20 +1273,52 @@ class TestRunner:
                     failed += self.run_rclass_image(dev.__class__, image, dst=dev)
                 return failed
             else:
-                return self._run_one(rclass, image, dst=dst)
+                return self._run_one(rclass, testimage, dst=dst)
         finally:
             os.remove(testimage)
 
-    def run_list(self, run_list):
+    def _sorted(self, run_list):
         def _key(pair):
             return pair[0].VENDOR + pair[0].MODEL + pair[0].VARIANT
+        return sorted(run_list, key=_key)
+
+    def run_list(self, run_list):
         failed = 0
-        for rclass, image in sorted(run_list, key=_key):
+        for rclass, image in self._sorted(run_list):
             failed += self.run_rclass_image(rclass, image)
         return failed
 
-    def run_all(self):
+    def run_list_parallel(self, run_list, jobs):
+        """Run each test case against each image in a pool of @jobs
+        worker processes, reporting results in order as they finish"""
+        work = []
+        for rclass, image in self._sorted(run_list):
+            for tcclass in self._test_list:
+                work.append((directory.radio_class_id(rclass), image,
+                             tcclass))
+
+        failed = 0
+        pool = multiprocessing.Pool(jobs)
+        try:
+            for nfailed, reports, timings in pool.imap(_run_job, work):
+                if nfailed is None:
+                    raise TestInternalError("Worker failed:%s%s" % (
+                        os.linesep, reports))
+                failed += nfailed
+                for report in reports:
+                    self.report(*report)
+                for elapsed, rclass, tc in timings:
+                    self._test_out.timing(rclass, tc, elapsed)
+            pool.close()
+        finally:
+            pool.terminate()
+            pool.join()
+        return failed
+
+    def run_all(self, jobs=1):
         run_list = self._make_list()
+        if jobs > 1:
+            return self.run_list_parallel(run_list, jobs)
         return self.run_list(run_list)
 
     def run_one(self, drv_name):
@@ -1262,6 +1357,8 @@ if __name__ == "__main__":
                   help="Output to HTML file")
     op.add_option("-l", "--live", dest="live", default=None,
                   help="Live radio on this port (requires -d)")
+    op.add_option("-j", "--jobs", dest="jobs", default=1, type="int",
+                  help="Number of test processes to run in parallel")
     op.usage = """
 Available drivers:
 %s
@@ -1299,7 +1396,7 @@ Available tests:
     elif options.driver:
         failed = tr.run_one(options.driver)
     else:
-        failed = tr.run_all()
+        failed = tr.run_all(options.jobs)
 
     test_out.cleanup()
 
@@ -0,0 +1,25 @@
+from tests.unit import base
+from chirp import bandplan
+
+
+class TestBandIndex(base.BaseTest):
+    def setUp(self):
+        super(TestBandIndex, self).setUp()
+        self.wide = bandplan.Band((100, 200), "Wide")
+        self.narrow = bandplan.Band((150, 160), "Narrow")
+        self.other = bandplan.Band((300, 400), "Other")
+        self.index = bandplan.BandIndex([self.narrow, self.wide, self.other])
+
+    def test_get_bands(self):
+        self.assertEqual([], self.index.get_bands(99))
+        self.assertEqual([self.wide], self.index.get_bands(100))
+        self.assertEqual([self.wide, self.narrow], self.index.get_bands(150))
+        self.assertEqual([self.wide, self.narrow], self.index.get_bands(160))
+        self.assertEqual([self.wide], self.index.get_bands(161))
+        self.assertEqual([self.wide], self.index.get_bands(200))
+        self.assertEqual([], self.index.get_bands(250))
+        self.assertEqual([self.other], self.index.get_bands(400))
+        self.assertEqual([], self.index.get_bands(401))
+
+    def test_empty(self):
+        self.assertEqual([], bandplan.BandIndex([]).get_bands(100))
@@ -0,0 +1,89 @@
+from tests.unit import base
+from chirp import chirp_common
+from chirp import errors
+from chirp.drivers import baofeng_common
+
+
+class FakePipe(object):
+    baudrate = 9600
+    timeout = 1
+
+    def __init__(self, replies=""):
+        self.replies = replies
+        self.written = []
+
+    def write(self, data):
+        self.written.append(data)
+
+    def read(self, count):
+        data = self.replies[:count]
+        self.replies = self.replies[count:]
+        return data
+
+
+class FakeRadio(object):
+    _ack_block = True
+
+    def __init__(self, replies=""):
+        self.pipe = FakePipe(replies)
+
+
+class TestClonePacer(base.BaseTest):
+    def setUp(self):
+        super(TestClonePacer, self).setUp()
+        self.sleeps = []
+        self.mox.stubs.Set(baofeng_common.time, "sleep", self.sleeps.append)
+        self.radio = FakeRadio()
+        self.pacer = baofeng_common.ClonePacer(self.radio)
+
+    def test_delay_follows_turnaround(self):
+        wire = self.pacer._wire_time(0x40)
+        self.pacer._answered(wire + 0.01, 0x40)
+        self.assertAlmostEqual(0.01, self.pacer.delay)
+        self.pacer._answered(wire, 0x40)
+        self.assertAlmostEqual(0.0075, self.pacer.delay)
+        for i in range(0, 20):
+            self.pacer._answered(wire, 0x40)
+        self.assertEqual(self.pacer.MIN_DELAY, self.pacer.delay)
+
+    def test_failure_raises_floor(self):
+        self.pacer._answered(0, 0x40)
+        self.pacer._failed()
+        self.assertEqual(self.pacer.MIN_DELAY * 2, self.pacer.delay)
+        self.pacer._answered(0, 0x40)
+        self.assertEqual(self.pacer.MIN_DELAY * 2, self.pacer.delay)
+
+    def test_transfer_retries(self):
+        calls = []
+
+        def exchange(addr):
+            calls.append(addr)
+            if len(calls) == 1:
+                raise errors.RadioError("timeout")
+            return "data"
+
+        self.assertEqual("data", self.pacer.transfer(0x10, 4, exchange, 0x10))
+        self.assertEqual([0x10, 0x10], calls)
+        self.assertEqual(4, self.pacer.nbytes)
+        self.assertEqual(2, len(self.sleeps))
+
+    def test_transfer_gives_up(self):
+        def exchange():
+            raise errors.RadioError("timeout")
+
+        self.assertRaises(errors.RadioError,
+                          self.pacer.transfer, 0x10, 4, exchange)
+        self.assertEqual(0, self.pacer.nbytes)
+
+    def test_read_block(self):
+        self.radio.pipe.replies = "\x06X\x00\x10\x04abcd"
+        self.assertEqual("abcd", self.pacer.transfer(
+            0x10, 4, baofeng_common._read_block, self.radio, 0x10, 4))
+        self.assertEqual(["S\x00\x10\x04", "\x06"], self.radio.pipe.written)
+
+    def test_update_status(self):
+        status = chirp_common.Status()
+        self.pacer.nbytes = 0x40
+        self.pacer.update_status(status)
+        self.assertTrue(status.rate > 0)
+        self.assertTrue(str(status).endswith("/s)"))
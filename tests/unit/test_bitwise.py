@@ -13,7 +13,10 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import os
+import shutil
 import struct
+import tempfile
 import unittest
 from chirp import bitwise
 from chirp import memmap
@@ -267,3 +270,182 @@ class TestBitwiseComments(BaseTest):
     def test_comment_cppstyle(self):
         obj = bitwise.parse('// Test this\nu8 foo;', '\x10')
         self.assertEqual(16, obj.foo)
+
+
+class TestBitwiseLayout(BaseTest):
+    def tearDown(self):
+        bitwise.set_layout_cache_dir(None)
+
+    def test_compile_cached(self):
+        defn = "struct { u8 foo:4, bar:4; } baz[2];"
+        self.assertIs(bitwise.compile_layout(defn),
+                      bitwise.compile_layout(defn))
+
+    def test_bind_multiple(self):
+        layout = bitwise.compile_layout(
+            "struct { u8 foo:4, bar:4; } baz[2];")
+        obj1 = layout.bind(memmap.MemoryMap("\x12\x34"))
+        obj2 = layout.bind(memmap.MemoryMap("\x56\x78"))
+        self.assertEqual(obj1.baz[1].bar, 4)
+        self.assertEqual(obj2.baz[1].bar, 8)
+        obj2.baz[0].foo = 9
+        self.assertEqual(obj1.baz[0].foo, 1)
+        self.assertEqual(obj2.baz[0].foo, 9)
+
+    def test_disk_cache(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            defn = "u8 foo; #seek 1; char bar[2]; // disk cache test"
+            bitwise.set_layout_cache_dir(tmpdir)
+            bitwise.compile_layout(defn)
+            self.assertEqual(1, len(os.listdir(tmpdir)))
+            bitwise._LAYOUTS.clear()
+            orig_parse = bitwise.bitwise_grammar.parse
+            bitwise.bitwise_grammar.parse = None
+            try:
+                obj = bitwise.parse(defn, "\x01.ab")
+            finally:
+                bitwise.bitwise_grammar.parse = orig_parse
+            self.assertEqual(obj.foo, 1)
+            self.assertEqual(str(obj.bar), "ab")
+        finally:
+            shutil.rmtree(tmpdir)
+
+
+class TestBitwiseLazyStructArray(BaseTest):
+    defn = """
+    struct {
+      u8 foo;
+      u8 bar:4,
+         baz:4;
+      char name[2];
+    } mem[100];
+    u8 tail;
+    """
+
+    def _data(self):
+        raw = "".join(["%s\x12%02i" % (chr(i), i) for i in range(100)])
+        return memmap.MemoryMap(raw + "\xAA")
+
+    def test_lazy_values(self):
+        data = self._data()
+        obj = bitwise.parse(self.defn, data)
+        self.assertEqual(100, len(obj.mem))
+        self.assertEqual(obj.tail, 0xAA)
+        for i in (99, 0, 42, -1):
+            mem = obj.mem[i]
+            self.assertEqual(i % 100, mem.foo)
+            self.assertEqual(1, mem.bar)
+            self.assertEqual(2, mem.baz)
+            self.assertEqual("%02i" % (i % 100), str(mem.name))
+        self.assertEqual(obj.mem.size(), 100 * 4 * 8)
+        self.assertEqual(obj.size(), (100 * 4 + 1) * 8)
+
+    def test_lazy_writes(self):
+        data = self._data()
+        obj = bitwise.parse(self.defn, data)
+        obj.mem[50].baz = 7
+        obj.mem[50].name = "xy"
+        self.assertEqual(data.get(50 * 4, 4), "\x32\x17xy")
+        self.assertEqual(obj.mem[50].baz, 7)
+
+    def test_lazy_iteration(self):
+        obj = bitwise.parse(self.defn, self._data())
+        self.assertEqual(range(100), [int(m.foo) for m in obj.mem])
+        self.assertEqual([99, 98], [int(m.foo) for m in obj.mem[-1:-3:-1]])
+        self.assertEqual(range(99, -1, -1),
+                         [int(m.foo) for m in reversed(obj.mem)])
+        self.assertEqual(obj.mem[obj.mem[3].foo].foo, 3)
+        self.assertEqual(obj.mem[3].foo, 3)
+        self.assertRaises(IndexError, lambda: obj.mem[100])
+
+    def test_lazy_cache(self):
+        obj = bitwise.parse(self.defn, self._data())
+        self.assertIs(obj.mem[5], obj.mem[5])
+        first = obj.mem[0]
+        for i in range(100):
+            obj.mem[i]
+        self.assertIs(first, obj.mem[0])
+
+    def test_lazy_parses_once(self):
+        obj = bitwise.parse(self.defn, self._data())
+        parsed = []
+        orig_parse_block = bitwise.Processor.__dict__["parse_block"]
+
+        def parse_block(processor, lang):
+            parsed.append(processor._offset)
+            return orig_parse_block(processor, lang)
+
+        bitwise.Processor.parse_block = parse_block
+        try:
+            # Repeated sweeps over the whole array (as drivers do on every
+            # get_memory/set_memory) must not build elements again
+            for sweep in range(3):
+                for mem in obj.mem:
+                    mem.foo
+        finally:
+            bitwise.Processor.parse_block = orig_parse_block
+        self.assertEqual(99, len(parsed))
+
+    def test_lazy_str(self):
+        obj = bitwise.parse(self.defn, self._data())
+        self.assertEqual(str([obj.mem[i] for i in range(100)]),
+                         str(obj.mem))
+
+    def test_lazy_get_raw(self):
+        data = self._data()
+        obj = bitwise.parse(self.defn, data)
+        self.assertEqual(data.get(0, 400), obj.mem.get_raw())
+        self.assertEqual(data.get(4, 4), obj.mem[1].get_raw())
+
+    def test_seekto_not_lazy(self):
+        defn = "struct { #seekto 1; u8 foo; } mem[2];"
+        obj = bitwise.parse(defn, "\x00\x01")
+        self.assertEqual([1, 1], [int(m.foo) for m in obj.mem])
+
+
+class TestBitwiseFieldDiff(BaseTest):
+    defn = """
+        struct {
+          u8 foo;
+          char name[4];
+          u8 flag:1,
+             other:7;
+          bbcd freq[2];
+        } mem[100];
+        #seekto 0x400;
+        struct {
+          u8 beep;
+          u16 bar;
+        } settings;
+        """
+
+    def setUp(self):
+        self.data_a = memmap.MemoryMap("\x00" * 0x403)
+        self.data_b = memmap.MemoryMap("\x00" * 0x403)
+        self.obj_a = bitwise.parse(self.defn, self.data_a)
+        self.obj_b = bitwise.parse(self.defn, self.data_b)
+
+    def test_find_fields(self):
+        self.assertEqual(["mem[1].name"],
+                         [p for p, f in bitwise.find_fields(self.obj_a,
+                                                            9, 10)])
+        self.assertEqual(["mem[1].flag", "mem[1].other", "mem[1].freq",
+                          "mem[2].foo"],
+                         [p for p, f in bitwise.find_fields(self.obj_a,
+                                                            13, 17)])
+        self.assertEqual(["settings.bar"],
+                         [p for p, f in bitwise.find_fields(self.obj_a,
+                                                            0x402, 0x403)])
+
+    def test_diff_fields(self):
+        self.obj_b.mem[50].name = "ABCD"
+        self.obj_b.mem[50].flag = 1
+        self.obj_b.settings.bar = 5
+        diffs = [(p, repr(a), repr(b)) for p, a, b in
+                 bitwise.diff_fields(self.obj_a, self.obj_b, 0, 0x403)]
+        self.assertEqual([("mem[50].name", r"4:[(\x00\x00\x00\x00)]",
+                           "4:[(ABCD)]"),
+                          ("mem[50].flag", "0x00 (.......0b)",
+                           "0x01 (.......1b)"),
+                          ("settings.bar", "0x0000", "0x0005")], diffs)
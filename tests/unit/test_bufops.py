@@ -0,0 +1,62 @@
+from tests.unit import base
+from chirp import bufops
+from chirp import memmap
+
+
+class TestBufOps(base.BaseTest):
+    def test_sum_bytes(self):
+        self.assertEqual(0, bufops.sum_bytes(""))
+        self.assertEqual(0x1fe, bufops.sum_bytes("\xff\xff"))
+        mmap = memmap.MemoryMap("\x01\x02\x03\x04")
+        self.assertEqual(5, bufops.sum_bytes(mmap.view(1, 3)))
+
+    def test_xor_bytes(self):
+        self.assertEqual("\xfe\xfd", bufops.xor_bytes("\x01\x02", 0xff))
+        self.assertEqual("\x03\x00", bufops.xor_bytes("\x01\x02", "\x02\x02"))
+        self.assertRaises(ValueError, bufops.xor_bytes, "\x01", "\x01\x02")
+
+    def test_xor_chain(self):
+        data = "\x00\x01\x02\x57\xff\x80"
+        encoded = bufops.xor_chain_encode(data, 0x57)
+        self.assertEqual("\x57\x56\x54\x03\xfc\x7c", encoded)
+        self.assertEqual(data, bufops.xor_chain_decode(encoded, 0x57))
+        self.assertEqual(data, bufops.xor_chain_decode(bytearray(encoded),
+                                                       0x57))
+        self.assertEqual("", bufops.xor_chain_encode("", 0x57))
+
+    def test_xor_chain_long(self):
+        data = "".join([chr(i % 251) for i in range(0, 1000)])
+        encoded = bufops.xor_chain_encode(data, 0x52)
+        previous = 0x52
+        for i in range(0, len(data)):
+            self.assertEqual(previous ^ ord(data[i]), ord(encoded[i]))
+            previous = ord(encoded[i])
+
+    def test_hexdump(self):
+        self.assertEqual("000: 41 42 00 00 00 00 00 00   AB......\n",
+                         bufops.hexdump("AB"))
+        self.assertEqual("0x08: 01 00 00 00 00 00 00 00   ........\n",
+                         bufops.hexdump("\x00" * 8 + "\x01",
+                                        "0x%(addr)02x").split("\n")[1] +
+                         "\n")
+
+    def test_hexdiff(self):
+        a = "\x00" * 24
+        b = "\x00" * 8 + "\x01" + "\x00" * 15
+        diff = bufops.hexdiff(a, b).splitlines()
+        self.assertEqual(4, len(diff))
+        self.assertTrue(diff[0].startswith(" 000:"))
+        self.assertTrue(diff[1].startswith("-008: 00"))
+        self.assertTrue(diff[2].startswith("+008: 01"))
+        self.assertEqual(["-008", "+008"],
+                         [l[:4] for l in bufops.hexdiff(a, b, diffsonly=True)
+                          .splitlines() if l])
+
+    def test_diff_runs(self):
+        a = "\x00" * 10000
+        b = "\x00" * 5000 + "\x01\x01" + "\x00" * 3 + "\x01" + "\x00" * 4994
+        self.assertEqual([(5000, 5002), (5005, 5006)], bufops.diff_runs(a, b))
+        self.assertEqual([(5000, 5006)], bufops.diff_runs(a, b, gap=3))
+        self.assertEqual([(5000, 5002), (5005, 5006), (10000, 10002)],
+                         bufops.diff_runs(a, b + "\x00\x00"))
+        self.assertEqual([], bufops.diff_runs(a, a))
@@ -1,6 +1,7 @@
 import base64
 import json
 import os
+import shutil
 import tempfile
 
 import mock
@@ -9,6 +10,7 @@ from tests.unit import base
 from chirp import CHIRP_VERSION
 from chirp import chirp_common
 from chirp import errors
+from chirp import memmap
 
 
 class TestUtilityFunctions(base.BaseTest):
@@ -260,6 +262,14 @@ class TestStepFunctions(base.BaseTest):
         self.assertRaises(errors.InvalidDataError,
                           chirp_common.required_step,
                           146520500)
+        # And again once the step for it is known
+        self.assertRaises(errors.InvalidDataError,
+                          chirp_common.required_step,
+                          146520500)
+
+    def test_required_step_8_33(self):
+        self.assertEqual(8.33, chirp_common.required_step(118008330))
+        self.assertEqual(8.33, chirp_common.required_step(118016660))
 
     def test_fix_rounded_step_250(self):
         self.assertEqual(146106250,
@@ -403,3 +413,370 @@ class TestImageMetadata(base.BaseTest):
             'chirp_version': CHIRP_VERSION,
         }
         self.assertEqual(expected, newr.metadata)
+
+    def test_save_mmap_atomic(self):
+        with tempfile.NamedTemporaryFile(suffix='.img') as f:
+            fn = f.name
+        with file(fn, 'wb') as f:
+            f.write('olddata')
+        r = chirp_common.FileBackedRadio(None)
+        r._mmap = mock.Mock()
+        r._mmap.get_packed.side_effect = IOError
+        self.assertRaises(Exception, r.save_mmap, fn)
+        with file(fn) as f:
+            self.assertEqual('olddata', f.read())
+        self.assertEqual([os.path.basename(fn)],
+                         [x for x in os.listdir(os.path.dirname(fn))
+                          if x.startswith(os.path.basename(fn))])
+        os.remove(fn)
+
+    def _save_over_nt(self, rename=os.rename):
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        fn = os.path.join(tmpdir, 'test.img')
+        with file(fn, 'wb') as f:
+            f.write('olddata')
+        r = chirp_common.FileBackedRadio(None)
+        r._mmap = memmap.MemoryMap('newdata')
+        with mock.patch('chirp.chirp_common.os.name', 'nt'):
+            with mock.patch('chirp.chirp_common.os.rename', rename):
+                try:
+                    r.save_mmap(fn)
+                finally:
+                    self.assertEqual(['test.img'], os.listdir(tmpdir))
+        with file(fn) as f:
+            return f.read()
+
+    def test_save_mmap_replace_nt(self):
+        self.assertTrue(self._save_over_nt().startswith('newdata'))
+
+    def test_save_mmap_replace_nt_fails(self):
+        renames = []
+        real_rename = os.rename
+
+        def rename(src, dst):
+            renames.append(dst)
+            if len(renames) == 2:
+                raise OSError('In use')
+            real_rename(src, dst)
+
+        self.assertRaises(Exception, self._save_over_nt, rename)
+        self.assertEqual(2, len([x for x in renames
+                                 if x.endswith('test.img')]))
+
+    @mock.patch('chirp.chirp_common.MAPPED_IMAGES', True)
+    def test_load_mmap_mapped(self):
+        class TestRadio(chirp_common.FileBackedRadio):
+            VENDOR = 'Dan'
+            MODEL = 'Foomaster 9000'
+            VARIANT = 'R'
+
+        with tempfile.NamedTemporaryFile(suffix='.img') as f:
+            fn = f.name
+        r = TestRadio(None)
+        r._mmap = mock.Mock()
+        r._mmap.get_packed.return_value = 'thisisrawdata'
+        r.save_mmap(fn)
+
+        newr = TestRadio(None)
+        newr.load_mmap(fn)
+        self.assertEqual('Foomaster 9000', newr.metadata['model'])
+        self.assertEqual('thisisrawdata', newr.get_mmap().get_packed())
+
+        newr.get_mmap()[0] = 'T'
+        newr.get_mmap()[1] = ord('H')
+        newr.save_mmap(fn)
+        # The mapping of the old file is dropped before it is replaced
+        self.assertFalse(isinstance(newr.get_mmap()._data,
+                                    memmap.mmap.mmap))
+        self.assertEqual('THisisrawdata', newr.get_mmap().get_packed())
+        with file(fn) as f:
+            data, metadata = TestRadio._strip_metadata(f.read())
+        os.remove(fn)
+        self.assertEqual('THisisrawdata', data)
+        self.assertEqual('Foomaster 9000', metadata['model'])
+
+
+class TestRadioGetMemories(base.BaseTest):
+    def _make_radio(self):
+        class TestRadio(chirp_common.Radio):
+            def get_features(self):
+                rf = chirp_common.RadioFeatures()
+                rf.memory_bounds = (1, 5)
+                return rf
+
+            def get_memory(self, number):
+                if number == 4:
+                    raise errors.InvalidMemoryLocation()
+                mem = chirp_common.Memory()
+                mem.number = number
+                return mem
+
+        return TestRadio(None)
+
+    def test_get_memories_range(self):
+        radio = self._make_radio()
+        self.assertEqual([1, 2, 3],
+                         [m.number for m in radio.get_memories(1, 3)])
+        self.assertEqual([2], [m.number for m in radio.get_memories(2, 2)])
+
+    def test_get_memories_defaults_to_bounds(self):
+        radio = self._make_radio()
+        mems = radio.get_memories(hi=3)
+        self.assertEqual([1, 2, 3], [m.number for m in mems])
+        mems = radio.get_memories(lo=4)
+        self.assertRaises(errors.InvalidMemoryLocation, list, mems)
+
+
+class TestValidateMemory(base.BaseTest):
+    def _make_features(self):
+        rf = chirp_common.RadioFeatures()
+        rf.memory_bounds = (1, 10)
+        rf.valid_modes = ["FM", "AM"]
+        rf.valid_tuning_steps = [5.0, 12.5]
+        rf.valid_bands = [(144000000, 148000000),
+                          (146000000, 150000000),
+                          (420000000, 450000000)]
+        return rf
+
+    def _make_memory(self, freq):
+        mem = chirp_common.Memory()
+        mem.number = 1
+        mem.freq = freq
+        return mem
+
+    def _errors(self, rf, mem):
+        return [str(msg) for msg in rf.validate_memory(mem)]
+
+    def test_bands(self):
+        rf = self._make_features()
+        self.assertEqual([], self._errors(rf, self._make_memory(144000000)))
+        self.assertEqual([], self._errors(rf, self._make_memory(149000000)))
+        self.assertEqual([], self._errors(rf, self._make_memory(420000000)))
+        self.assertEqual(["Frequency 150.000000 is out of supported range"],
+                         self._errors(rf, self._make_memory(150000000)))
+        self.assertEqual(["Frequency 143.995000 is out of supported range"],
+                         self._errors(rf, self._make_memory(143995000)))
+
+    def test_tx_band(self):
+        rf = self._make_features()
+        mem = self._make_memory(146520000)
+        mem.duplex = "+"
+        mem.offset = 5000000
+        self.assertEqual(["Tx freq 151.520000 is out of supported range"],
+                         self._errors(rf, mem))
+
+    def test_step_and_mode(self):
+        rf = self._make_features()
+        mem = self._make_memory(146006250)
+        mem.mode = "USB"
+        self.assertEqual(["Mode USB not supported",
+                          "Frequency requires 6.25kHz step"],
+                         self._errors(rf, mem))
+
+    def test_features_changed(self):
+        rf = self._make_features()
+        mem = self._make_memory(146520000)
+        mem.mode = "USB"
+        self.assertEqual(1, len(rf.validate_memory(mem)))
+        rf.valid_modes = ["USB"]
+        self.assertEqual([], rf.validate_memory(mem))
+
+    def test_validate_memories(self):
+        rf = self._make_features()
+        mems = [self._make_memory(146520000), self._make_memory(160000000)]
+        self.assertEqual([rf.validate_memory(mem) for mem in mems],
+                         rf.validate_memories(mems))
+
+    def test_radio_validate_memories(self):
+        rf = self._make_features()
+
+        class TestRadio(chirp_common.Radio):
+            def get_features(self):
+                return rf
+
+        class CheckingRadio(TestRadio):
+            def validate_memory(self, mem):
+                return ["Checked"]
+
+        mems = [self._make_memory(146520000), self._make_memory(160000000)]
+        self.assertEqual(rf.validate_memories(mems),
+                         TestRadio(None).validate_memories(mems))
+        self.assertEqual([["Checked"], ["Checked"]],
+                         CheckingRadio(None).validate_memories(mems))
+
+
+class TestCloneModeRadioUpload(base.BaseTest):
+    def _make_radio(self, partial):
+        class TestRadio(chirp_common.CloneModeRadio):
+            PARTIAL_UPLOAD = partial
+            _memsize = 64
+
+        radio = TestRadio(memmap.MemoryMap("\x00" * 64))
+        radio.get_mmap().clear_dirty()
+        radio.get_mmap()[20] = "abc"
+        return radio
+
+    def _needed(self, radio):
+        return [addr for addr in range(0, 64, 16)
+                if radio.upload_block_needed(addr, addr + 16)]
+
+    def test_upload_changes(self):
+        radio = self._make_radio(True)
+        self.assertTrue(radio.can_upload_changes())
+        self.assertEqual([0, 16, 32, 48], self._needed(radio))
+        radio.upload_changes_only = True
+        self.assertEqual([16], self._needed(radio))
+
+    def test_upload_changes_unsupported(self):
+        radio = self._make_radio(False)
+        radio.upload_changes_only = True
+        self.assertFalse(radio.can_upload_changes())
+        self.assertEqual([0, 16, 32, 48], self._needed(radio))
+
+    def test_upload_changes_untracked(self):
+        radio = self._make_radio(True)
+        radio._mmap = memmap.MemoryMap("\x00" * 64)
+        radio.upload_changes_only = True
+        self.assertFalse(radio.can_upload_changes())
+        self.assertEqual([0, 16, 32, 48], self._needed(radio))
+
+
+class TestLiveRadioMemoryCache(base.BaseTest):
+    def setUp(self):
+        super(TestLiveRadioMemoryCache, self).setUp()
+        self.tempdir = tempfile.mkdtemp()
+        chirp_common.set_memory_cache_dir(self.tempdir)
+        self.reads = []
+
+    def tearDown(self):
+        super(TestLiveRadioMemoryCache, self).tearDown()
+        chirp_common.set_memory_cache_dir(None)
+        shutil.rmtree(self.tempdir)
+
+    def _make_radio(self, port="/dev/ttyUSB0"):
+        reads = self.reads
+
+        class TestRadio(chirp_common.LiveRadio):
+            VENDOR = "Test"
+            MODEL = "Live"
+
+            def get_memory(self, number):
+                if number not in self._memcache:
+                    reads.append(number)
+                    mem = chirp_common.Memory()
+                    mem.number = number
+                    mem.freq = 146520000
+                    self._memcache[number] = mem
+                return self._memcache[number]
+
+        pipe = mock.MagicMock()
+        pipe.port = port
+        return TestRadio(pipe)
+
+    def test_cache_persists(self):
+        radio = self._make_radio()
+        radio.get_memory(1)
+        radio.get_memory(1)
+        self.assertEqual([1], self.reads)
+        self.assertEqual([], radio.get_unverified_memories())
+        radio.save_memory_cache()
+
+        radio = self._make_radio()
+        self.assertEqual([1], radio.get_unverified_memories())
+        self.assertEqual(146520000, radio.get_unverified_memory(1).freq)
+        self.assertEqual(None, radio.get_unverified_memory(2))
+        self.assertEqual([1], self.reads)
+        # Memories that are still unverified are saved again
+        radio.save_memory_cache()
+        radio = self._make_radio()
+        self.assertEqual([1], radio.get_unverified_memories())
+
+        self.assertEqual(1, radio.verify_memory(1).number)
+        self.assertEqual([1, 1], self.reads)
+        self.assertEqual([], radio.get_unverified_memories())
+        self.assertEqual(None, radio.get_unverified_memory(1))
+        radio.verify_memory(1)
+        self.assertEqual([1, 1], self.reads)
+
+    def test_unverified_not_returned(self):
+        radio = self._make_radio()
+        radio.get_memory(1)
+        radio.save_memory_cache()
+
+        # Anything but the editor gets the memory from the radio
+        radio = self._make_radio()
+        self.assertFalse(1 in radio._memcache)
+        radio.get_memory(1)
+        self.assertEqual([1, 1], self.reads)
+        self.assertEqual([], radio.get_unverified_memories())
+
+    def test_cache_keyed_by_port(self):
+        radio = self._make_radio()
+        radio.get_memory(1)
+        radio.save_memory_cache()
+
+        radio = self._make_radio("/dev/ttyUSB1")
+        self.assertEqual([], radio.get_unverified_memories())
+        radio = self._make_radio(None)
+        radio.get_memory(1)
+        radio.save_memory_cache()
+        self.assertEqual(1, len(os.listdir(self.tempdir)))
+
+    def test_cache_invalidate(self):
+        cache = chirp_common.MemoryCache()
+        cache[1] = chirp_common.Memory()
+        self.assertTrue(1 in cache)
+        del cache[1]
+        del cache[1]
+        self.assertFalse(1 in cache)
+
+    def test_corrupt_cache_ignored(self):
+        fn = os.path.join(self.tempdir, "test.memcache")
+        with open(fn, "wb") as f:
+            f.write("garbage")
+        self.assertEqual([], chirp_common.MemoryCache(fn).get_unverified())
+
+    def test_cache_values(self):
+        fn = os.path.join(self.tempdir, "test.memcache")
+        cache = chirp_common.MemoryCache(fn)
+        mem = chirp_common.DVMemory()
+        mem.number = 1
+        mem.name = "Caf\xe9"
+        mem.power = chirp_common.PowerLevel("Low", watts=5)
+        mem.immutable = ["name"]
+        mem.dv_rpt1call = "W1AW  B"
+        cache[1] = mem
+        mem = chirp_common.Memory()
+        mem.extd_number = "C1"
+        mem.extra = object()
+        cache["C1"] = mem
+        cache.save()
+
+        cache = chirp_common.MemoryCache(fn)
+        self.assertEqual([1], cache.get_unverified())
+        mem = cache.get_unverified_memory(1)
+        self.assertTrue(isinstance(mem, chirp_common.DVMemory))
+        self.assertEqual("Caf\xe9", mem.name)
+        self.assertTrue(isinstance(mem.name, str))
+        self.assertEqual("Low", str(mem.power))
+        self.assertEqual(36, int(mem.power))
+        self.assertEqual(["name"], mem.immutable)
+        self.assertEqual("W1AW  B", mem.dv_rpt1call)
+
+    def test_foreign_cache_ignored(self):
+        fn = os.path.join(self.tempdir, "test.memcache")
+        with open(fn, "wb") as f:
+            json.dump({"version": chirp_common.MemoryCache.VERSION,
+                       "memories": [[1, "os.system", {}],
+                                    [2, "chirp.chirp_common.Bank", {}],
+                                    [3, "no.such.Memory", {}]]}, f)
+        self.assertEqual([], chirp_common.MemoryCache(fn).get_unverified())
+
+    def test_pickled_cache_ignored(self):
+        fn = os.path.join(self.tempdir, "test.memcache")
+        marker = os.path.join(self.tempdir, "unpickled")
+        with open(fn, "wb") as f:
+            f.write("cos\nsystem\n(S'touch %s'\ntR." % marker)
+        self.assertEqual([], chirp_common.MemoryCache(fn).get_unverified())
+        self.assertFalse(os.path.exists(marker))
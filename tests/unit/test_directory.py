@@ -1,7 +1,12 @@
 import base64
 import json
+import os
+import shutil
+import sys
 import tempfile
 
+import mock
+
 from tests.unit import base
 from chirp import chirp_common
 from chirp import directory
@@ -67,3 +72,163 @@ class TestDirectory(base.BaseTest):
             self.assertEqual('Barmaster 2000', radio.MODEL)
             self.assertEqual('A', radio.VARIANT)
 
+
+    def test_detect_by_size_index(self):
+        @directory.register
+        class FakeCloneRadio(chirp_common.CloneModeRadio):
+            VENDOR = 'Dan'
+            MODEL = 'Clonemaster 16'
+            _memsize = 16
+
+        ident = directory.radio_class_id(FakeCloneRadio)
+        self.assertIn(ident, directory.SIZE_TO_RADIOS[16])
+        self.assertNotIn(ident, directory.UNINDEXED_RADIOS)
+        rclass, probe = directory.get_radio_class_by_data('\x00' * 16,
+                                                          'foo.img')
+        self.assertEqual(FakeCloneRadio, rclass)
+        self.assertEqual('size 16 and match_model', probe)
+
+    def test_detect_checks_magic(self):
+        @directory.register
+        class FakeCloneRadio(chirp_common.CloneModeRadio):
+            VENDOR = 'Dan'
+            MODEL = 'Clonemaster 17'
+            _memsize = 17
+
+            @classmethod
+            def match_model(cls, filedata, filename):
+                return filedata.startswith('CM17')
+
+            @classmethod
+            def match_hints(cls):
+                return [cls._memsize], [(0, 'CM17')]
+
+        rclass, probe = directory.get_radio_class_by_data(
+            'CM17' + '\x00' * 13, 'foo.img')
+        self.assertEqual(FakeCloneRadio, rclass)
+        self.assertRaises(Exception, directory.get_radio_class_by_data,
+                          'CM18' + '\x00' * 13, 'foo.img')
+
+    def test_hints_ignored_for_overridden_match_model(self):
+        @directory.register
+        class FakeCloneRadio(chirp_common.CloneModeRadio):
+            VENDOR = 'Dan'
+            MODEL = 'Clonemaster 18'
+            _memsize = 18
+
+            @classmethod
+            def match_model(cls, filedata, filename):
+                return filedata == 'anysize'
+
+        self.assertIn(directory.radio_class_id(FakeCloneRadio),
+                      directory.UNINDEXED_RADIOS)
+        rclass, probe = directory.get_radio_class_by_data('anysize',
+                                                          'foo.img')
+        self.assertEqual(FakeCloneRadio, rclass)
+        self.assertEqual('match_model', probe)
+
+    def test_reregister_replaces_index(self):
+        ident = directory.radio_class_id(self.test_class)
+
+        @directory.register
+        class FakeRadio(chirp_common.CloneModeRadio):
+            VENDOR = 'Dan'
+            MODEL = 'Foomaster 9000'
+            VARIANT = 'R'
+            _memsize = 19
+
+        self.assertNotIn(ident, directory.UNINDEXED_RADIOS)
+        self.assertIn(ident, directory.SIZE_TO_RADIOS[19])
+        self.assertIn(ident,
+                      directory.MODEL_TO_RADIOS[('Dan', 'Foomaster 9000')])
+        self.assertEqual(FakeRadio, directory.get_radio(ident))
+
+
+LAZY_DRIVER = """
+from chirp import chirp_common, directory
+
+
+@directory.register
+class LazyRadio(chirp_common.CloneModeRadio):
+    VENDOR = 'Lazy'
+    MODEL = 'Loader'
+    _memsize = 20
+"""
+
+
+class TestDirectoryManifest(base.BaseTest):
+    def setUp(self):
+        super(TestDirectoryManifest, self).setUp()
+        self.tempdir = tempfile.mkdtemp()
+        with open(os.path.join(self.tempdir, 'lazy_driver.py'), 'w') as f:
+            f.write(LAZY_DRIVER)
+        sys.path.insert(0, self.tempdir)
+        self.manifest_file = os.path.join(self.tempdir, 'drivers.manifest')
+        self.ident = 'Lazy_Loader'
+
+    def tearDown(self):
+        super(TestDirectoryManifest, self).tearDown()
+        sys.path.remove(self.tempdir)
+        sys.modules.pop('lazy_driver', None)
+        shutil.rmtree(self.tempdir)
+        dict.pop(directory.DRV_TO_RADIO, self.ident, None)
+        directory._LAZY_DRIVERS.discard(self.ident)
+        directory._unindex_driver(self.ident)
+
+    def _write_manifest(self):
+        manifest = {
+            'version': directory.MANIFEST_VERSION,
+            'stamp': directory._manifest_stamp(),
+            'drivers': [{'ident': self.ident,
+                         'module': 'lazy_driver',
+                         'class': 'LazyRadio',
+                         'vendor': 'Lazy',
+                         'model': 'Loader',
+                         'variant': '',
+                         'aliases': [],
+                         'file_backed': True,
+                         'clone': True,
+                         'live': False,
+                         'sizes': [20],
+                         'magic': [[0, '4c5a']]}],
+        }
+        with open(self.manifest_file, 'w') as f:
+            json.dump(manifest, f)
+
+    def test_import_drivers_is_lazy(self):
+        self._write_manifest()
+        directory.import_drivers(self.manifest_file)
+        self.assertIn(self.ident, directory.DRV_TO_RADIO)
+        self.assertNotIn('lazy_driver', sys.modules)
+        self.assertEqual('Loader',
+                         directory.DRIVER_INFO[self.ident]['model'])
+
+        # Wrong magic, so the driver is not imported to probe it
+        self.assertRaises(Exception, directory.get_radio_class_by_data,
+                          '\x00' * 20, 'foo.img')
+        self.assertNotIn('lazy_driver', sys.modules)
+
+        rclass, probe = directory.get_radio_class_by_data(
+            'LZ' + '\x00' * 18, 'foo.img')
+        self.assertIn('lazy_driver', sys.modules)
+        self.assertEqual('LazyRadio', rclass.__name__)
+        self.assertEqual(rclass, directory.get_radio(self.ident))
+
+    def test_import_drivers_rebuilds_stale_manifest(self):
+        self._write_manifest()
+        with open(self.manifest_file) as f:
+            manifest = json.load(f)
+        manifest['stamp'] = []
+        with open(self.manifest_file, 'w') as f:
+            json.dump(manifest, f)
+
+        fresh = {'version': directory.MANIFEST_VERSION,
+                 'stamp': directory._manifest_stamp(),
+                 'drivers': []}
+        with mock.patch.object(directory, 'build_manifest',
+                               return_value=fresh) as build:
+            directory.import_drivers(self.manifest_file)
+            build.assert_called_once_with()
+        self.assertNotIn(self.ident, directory.DRV_TO_RADIO)
+        with open(self.manifest_file) as f:
+            self.assertEqual(fresh, json.load(f))
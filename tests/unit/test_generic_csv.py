@@ -0,0 +1,117 @@
+import os
+import shutil
+import tempfile
+
+from tests.unit import base
+from chirp import chirp_common
+from chirp import errors
+from chirp.drivers import generic_csv
+
+
+class TestCSVRadio(base.BaseTest):
+    def setUp(self):
+        super(TestCSVRadio, self).setUp()
+        self.tempdir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tempdir, "test.csv")
+        mems = []
+        for number in [1, 5, 1200]:
+            mem = chirp_common.Memory()
+            mem.number = number
+            mem.freq = 146000000 + number * 5000
+            mem.name = "MEM%i" % number
+            mems.append(mem)
+        generic_csv.write_memories(self.filename, iter(mems))
+
+    def tearDown(self):
+        super(TestCSVRadio, self).tearDown()
+        shutil.rmtree(self.tempdir)
+
+    def test_load_is_lazy(self):
+        radio = generic_csv.CSVRadio(self.filename)
+        self.assertEqual([5, 1200], sorted(radio._index.keys()))
+        self.assertEqual([1], [m.number for m in radio.memories
+                               if m is not None])
+        self.assertTrue(len(radio.memories) > 1200)
+
+    def test_get_memory(self):
+        radio = generic_csv.CSVRadio(self.filename)
+        mem = radio.get_memory(1200)
+        self.assertEqual(1200, mem.number)
+        self.assertEqual("MEM1200", mem.name)
+        self.assertEqual(152000000, mem.freq)
+        self.assertTrue(radio.get_memory(2).empty)
+        self.assertEqual("MEM1", radio.get_memory(1).name)
+
+    def test_get_memories(self):
+        radio = generic_csv.CSVRadio(self.filename)
+        mems = list(radio.get_memories(0, 6))
+        self.assertEqual(range(0, 7), [m.number for m in mems])
+        self.assertEqual([1, 5], [m.number for m in mems if not m.empty])
+        self.assertEqual(len(radio.memories),
+                         len(list(radio.get_memories())))
+
+    def test_save_over_source(self):
+        radio = generic_csv.CSVRadio(self.filename)
+        mem = radio.get_memory(5)
+        mem.name = "CHANGED"
+        radio.set_memory(mem)
+        radio.erase_memory(1)
+        radio.save()
+
+        radio = generic_csv.CSVRadio(self.filename)
+        self.assertEqual([1200], sorted(radio._index.keys()))
+        self.assertEqual("CHANGED", radio.get_memory(5).name)
+        self.assertEqual("MEM1200", radio.get_memory(1200).name)
+
+    def test_save_elsewhere(self):
+        radio = generic_csv.CSVRadio(self.filename)
+        other = os.path.join(self.tempdir, "other.csv")
+        radio.save(other)
+        self.assertEqual(file(self.filename).read(), file(other).read())
+        self.assertEqual("MEM5", radio.get_memory(5).name)
+
+    def test_lines_parsed_once(self):
+        parsed = []
+        parse = generic_csv.CSVRadio._parse_csv_data_line.im_func
+
+        def counting_parse(radio, headers, line):
+            parsed.append(line[0])
+            return parse(radio, headers, line)
+
+        self.mox.stubs.Set(generic_csv.CSVRadio, '_parse_csv_data_line',
+                           counting_parse)
+        radio = generic_csv.CSVRadio(self.filename)
+        self.assertEqual(['1'], parsed)
+        list(radio.get_memories())
+        self.assertEqual(['1', '5', '1200'], parsed)
+
+    def test_file_not_held_open(self):
+        radio = generic_csv.CSVRadio(self.filename)
+        self.assertEqual(None, radio._reader._file)
+        radio.get_memory(5)
+        self.assertEqual(None, radio._reader._file)
+        list(radio.get_memories())
+        self.assertEqual(None, radio._reader._file)
+
+    def test_changed_file(self):
+        radio = generic_csv.CSVRadio(self.filename)
+        mem = chirp_common.Memory()
+        mem.number = 1
+        mem.freq = 146520000
+        generic_csv.write_memories(self.filename, iter([mem]))
+        self.assertRaises(errors.RadioError, radio.get_memory, 5)
+        self.assertRaises(errors.RadioError, list, radio.get_memories())
+
+    def test_bad_line(self):
+        with file(self.filename, 'a') as f:
+            f.write('7,BAD,notafreq' + ',' * 15 + '\r\n')
+        radio = generic_csv.CSVRadio(self.filename)
+        self.assertTrue(radio.get_memory(7).empty)
+        self.assertEqual(1, len(radio.errors))
+        self.assertEqual('MEM5', radio.get_memory(5).name)
+
+    def test_unreadable_file(self):
+        with file(self.filename, 'w') as f:
+            f.write('Location,Frequency\r\n1,notafreq\r\n2,notafreq\r\n')
+        self.assertRaises(errors.InvalidDataError,
+                          generic_csv.CSVRadio, self.filename)
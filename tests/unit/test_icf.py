@@ -0,0 +1,81 @@
+import struct
+
+from tests.unit import base
+from chirp import memmap
+from chirp.drivers import icf
+
+
+class FakePipe(object):
+    def __init__(self, data=""):
+        self.written = []
+        self.data = data
+        self.timeouts = 0
+
+    def write(self, data):
+        self.written.append(data)
+
+    def read(self, count):
+        data = self.data[:count]
+        if not data:
+            self.timeouts += 1
+        self.data = self.data[count:]
+        return data
+
+
+class FakeRadio(icf.IcomCloneModeRadio):
+    _model = "\x01\x02\x03\x04"
+    _memsize = 0x40
+
+    def __init__(self):
+        self.pipe = FakePipe()
+        self._mmap = memmap.MemoryMap("".join(chr(i) for i in range(0x40)))
+        self.status_fn = None
+
+    def get_memsize(self):
+        return self._memsize
+
+
+class TestIcomClone(base.BaseTest):
+    def setUp(self):
+        super(TestIcomClone, self).setUp()
+        self.radio = FakeRadio()
+
+    def test_payload_roundtrip(self):
+        data = "\x00\x7f\xfd\xff"
+        payload = self.radio.get_payload(data, False, False)
+        self.assertEqual("007FFDFF", payload)
+        self.assertEqual(data, self.radio.process_frame_payload(payload))
+        self.assertEqual("01FF", self.radio.get_payload("\x01", False, True))
+
+    def test_payload_odd_length(self):
+        self.assertEqual("\x12\x34",
+                         self.radio.process_frame_payload("12345"))
+
+    def test_payload_bad_byte(self):
+        self.assertEqual("\x12",
+                         self.radio.process_frame_payload("12ZZ34"))
+
+    def test_send_mem_chunk(self):
+        stats = icf.CloneStats()
+        self.assertTrue(icf.send_mem_chunk(self.radio, 0, 0x30, 0x20, stats))
+        self.assertEqual(2, len(self.radio.pipe.written))
+        self.assertEqual("\xfe\xfe\xee\xef\xe4002010",
+                         self.radio.pipe.written[1][:11])
+        self.assertEqual(0x30, stats.nbytes)
+
+    def test_clone_from_radio(self):
+        frames = ""
+        for addr in range(0, 0x40, 0x10):
+            data = "".join(chr(addr + i) for i in range(0x10))
+            chunk = struct.pack(">HB", addr, 0x10) + data
+            frames += "\xfe\xfe\xef\xee\xe4%s\xfd" % (
+                self.radio.get_payload(chunk, False, True))
+        frames += "\xfe\xfe\xef\xee\xe5Here is your data\xfd"
+        self.radio.pipe = FakePipe(frames)
+        self.mox.stubs.Set(icf, 'get_model_data',
+                           lambda radio: radio.get_model())
+        _mmap = icf._clone_from_radio(self.radio)
+        self.assertEqual(self.radio._mmap.get_packed(), _mmap.get_packed())
+        # The end frame finishes the clone, without waiting for another
+        # batch of frames that never comes
+        self.assertEqual(1, self.radio.pipe.timeouts)
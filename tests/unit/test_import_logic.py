@@ -1,3 +1,5 @@
+import mox
+
 from tests.unit import base
 from chirp import import_logic
 from chirp import chirp_common
@@ -150,6 +152,18 @@ class ImportFieldTests(base.BaseTest):
         import_logic._import_name(FakeRadio(None), None, mem)
         self.assertEqual(mem.name, 'filtered-name')
 
+    def test_import_name_with_features(self):
+        rf = chirp_common.RadioFeatures()
+        rf.valid_characters = "ABC"
+        rf.valid_name_length = 3
+        mem = chirp_common.Memory()
+        mem.name = 'adbc'
+        import_logic._import_name(chirp_common.Radio(None), None, mem,
+                                  dstrf=rf)
+        self.assertEqual(mem.name, 'AB')
+        import_logic._import_name(FakeRadio(None), None, mem, dstrf=rf)
+        self.assertEqual(mem.name, 'filtered-name')
+
     def test_import_power_same(self):
         radio = FakeRadio(None)
         same_rf = radio.get_features()
@@ -310,13 +324,14 @@ class ImportFieldTests(base.BaseTest):
         self.mox.StubOutWithMock(import_logic, '_import_duplex')
         self.mox.StubOutWithMock(radio, 'validate_memory')
 
+        dst_rf = mox.IsA(chirp_common.RadioFeatures)
         mem.dupe().AndReturn(mem)
-        import_logic._import_name(radio, src_rf, mem)
-        import_logic._import_power(radio, src_rf, mem)
-        import_logic._import_tone(radio, src_rf, mem)
-        import_logic._import_dtcs(radio, src_rf, mem)
-        import_logic._import_mode(radio, src_rf, mem)
-        import_logic._import_duplex(radio, src_rf, mem)
+        import_logic._import_name(radio, src_rf, mem, dstrf=dst_rf)
+        import_logic._import_power(radio, src_rf, mem, dstrf=dst_rf)
+        import_logic._import_tone(radio, src_rf, mem, dstrf=dst_rf)
+        import_logic._import_dtcs(radio, src_rf, mem, dstrf=dst_rf)
+        import_logic._import_mode(radio, src_rf, mem, dstrf=dst_rf)
+        import_logic._import_duplex(radio, src_rf, mem, dstrf=dst_rf)
         radio.validate_memory(mem).AndReturn(errors)
 
         self.mox.ReplayAll()
@@ -331,6 +346,62 @@ class ImportFieldTests(base.BaseTest):
                           self.test_import_mem,
                           [chirp_common.ValidationError('Test')])
 
+    def _make_memories(self):
+        mems = []
+        for freq in (146520000, 1800000, 146000000, 146000000):
+            mem = chirp_common.Memory()
+            mem.number = len(mems) + 1
+            mem.freq = freq
+            mem.mode = 'Auto'
+            mems.append(mem)
+        mems[3].duplex = 'split'
+        mems[3].offset = 246000000
+        return mems
+
+    def test_import_memories(self):
+        radio = FakeRadio(None)
+        radio.MODES.remove('AM')
+        src_rf = chirp_common.RadioFeatures()
+        mems = self._make_memories()
+
+        dst_rf = radio.get_features()
+        self.mox.StubOutWithMock(radio, 'get_features')
+        radio.get_features().AndReturn(dst_rf)
+        self.mox.StubOutWithMock(radio, 'validate_memories')
+        radio.validate_memories([mox.IsA(chirp_common.Memory)] * 2).AndReturn(
+            [[], [chirp_common.ValidationError('Test')]])
+        self.mox.ReplayAll()
+
+        results = list(import_logic.import_memories(
+            radio, src_rf, mems, [{'number': i} for i in (11, 12, 13, 14)]))
+        self.assertEqual(4, len(results))
+        mem, msgs, error = results[0]
+        self.assertEqual((11, 'FM', []), (mem.number, mem.mode, msgs))
+        self.assertEqual(None, error)
+        self.assertEqual(1, mems[0].number)
+        mem, msgs, error = results[1]
+        self.assertEqual(None, mem)
+        self.assertTrue(isinstance(error, import_logic.DestNotCompatible))
+        mem, msgs, error = results[2]
+        self.assertEqual(13, mem.number)
+        self.assertEqual(['Test'], msgs)
+        self.assertTrue(isinstance(error, import_logic.DestNotCompatible))
+        self.assertEqual(None, results[3][0])
+
+    def test_import_memories_batches(self):
+        radio = FakeRadio(None)
+        src_rf = chirp_common.RadioFeatures()
+        mems = [self._make_memories()[0] for i in range(0, 5)]
+
+        self.mox.stubs.Set(import_logic, 'IMPORT_BATCH', 2)
+        self.mox.StubOutWithMock(radio, 'validate_memories')
+        for count in (2, 2, 1):
+            radio.validate_memories(mox.IsA(list)).AndReturn([[]] * count)
+        self.mox.ReplayAll()
+
+        results = import_logic.import_memories(radio, src_rf, mems)
+        self.assertEqual([None] * 5, [error for mem, msgs, error in results])
+
     def test_import_bank(self):
         dst_mem = chirp_common.Memory()
         dst_mem.number = 1
@@ -0,0 +1,103 @@
+from tests.unit import base
+from chirp import chirp_common
+from chirp.drivers import kenwood_live
+
+
+class FakeRadioPipe(object):
+    """Answers each command written to it from @responses"""
+    baudrate = 9600
+
+    def __init__(self, responses, delimiter="\r"):
+        self.responses = responses
+        self.delimiter = delimiter
+        self.writes = []
+        self.pending = ""
+
+    def write(self, data):
+        self.writes.append(data)
+        for cmd in data.split(self.delimiter)[:-1]:
+            if cmd in self.responses:
+                self.pending += self.responses[cmd] + self.delimiter
+
+    def inWaiting(self):
+        return len(self.pending)
+
+    def read(self, count):
+        data = self.pending[:count]
+        self.pending = self.pending[count:]
+        return data
+
+
+class TestRadio(kenwood_live.KenwoodLiveRadio):
+    MODEL = "TEST"
+    _upper = 20
+
+    def _cmd_get_memory(self, number):
+        return "MR", "%03i" % number
+
+    def _cmd_get_memory_name(self, number):
+        return "MN", "%03i" % number
+
+    def _parse_mem_spec(self, spec):
+        mem = chirp_common.Memory()
+        mem.number = int(spec[0])
+        mem.freq = int(spec[1])
+        return mem
+
+
+class TestKenwoodSession(base.BaseTest):
+    def setUp(self):
+        super(TestKenwoodSession, self).setUp()
+        self.mox.stubs.Set(kenwood_live.KenwoodSession, "TIMEOUT", 0)
+
+    def test_pipeline(self):
+        pipe = FakeRadioPipe({"MR 001": "MR 001,146520000",
+                              "MN 001": "MN 001,SIMPLEX"})
+        session = kenwood_live.KenwoodSession(pipe)
+        self.assertEqual(["MR 001,146520000", "MN 001,SIMPLEX"],
+                         session.pipeline([("MR", "001"), ("MN", "001")]))
+        self.assertEqual(["MR 001\rMN 001\r"], pipe.writes)
+
+    def test_timeout(self):
+        pipe = FakeRadioPipe({})
+        session = kenwood_live.KenwoodSession(pipe)
+        self.assertEqual("", session.command("ID"))
+
+    def test_sessions_per_pipe(self):
+        pipe_a = FakeRadioPipe({"ID": "ID019"}, ";")
+        pipe_b = FakeRadioPipe({"ID": "ID TEST"})
+        self.assertEqual("TS-2000", kenwood_live.get_id(pipe_a))
+        self.assertEqual("TEST", kenwood_live.get_id(pipe_b))
+        self.assertEqual((";", ""), kenwood_live.get_session(pipe_a).delimiter)
+        self.assertEqual(("\r", " "),
+                         kenwood_live.get_session(pipe_b).delimiter)
+
+
+class TestKenwoodLiveRadio(base.BaseTest):
+    def setUp(self):
+        super(TestKenwoodLiveRadio, self).setUp()
+        self.mox.stubs.Set(kenwood_live.KenwoodSession, "TIMEOUT", 0)
+        responses = {}
+        for i in range(0, 21):
+            responses["MR %03i" % i] = "MR %i,%i" % (i, 146000000 + i)
+            responses["MN %03i" % i] = "MN %03i,CH%i" % (i, i)
+        responses["MR 003"] = "N"
+        self.radio = TestRadio(None)
+        self.radio.pipe = FakeRadioPipe(responses)
+
+    def test_get_memory(self):
+        mem = self.radio.get_memory(2)
+        self.assertEqual(146000002, mem.freq)
+        self.assertEqual("CH2", mem.name)
+        self.assertTrue(self.radio.get_memory(3).empty)
+        self.assertEqual(2, len(self.radio.pipe.writes))
+
+    def test_get_memories_batched(self):
+        mems = list(self.radio.get_memories(0, 20))
+        self.assertEqual(range(0, 21), [m.number for m in mems])
+        self.assertEqual(3, len(self.radio.pipe.writes))
+        self.assertEqual("CH20", mems[20].name)
+        self.assertTrue(mems[3].empty)
+
+        self.radio.get_memory(5)
+        self.assertEqual(3, len(self.radio.pipe.writes))
@@ -43,6 +43,38 @@ class TestBaseBank(TestBaseMapping):
     CLS = chirp_common.Bank
 
 
+class TestMappingIndex(base.BaseTest):
+    def test_add_remove(self):
+        index = chirp_common.MappingIndex()
+        index.add(5, "A")
+        index.add(2, "A")
+        index.add(5, "B")
+        index.add(5, "A")
+        self.assertEqual([2, 5], index.get_memories("A"))
+        self.assertEqual(["A", "B"], index.get_mappings(5))
+        index.remove(5, "A")
+        index.remove(7, "A")
+        self.assertEqual([2], index.get_memories("A"))
+        self.assertEqual(["B"], index.get_mappings(5))
+        self.assertEqual([], index.get_memories("C"))
+        self.assertEqual([], index.get_mappings(7))
+
+
+class TestMemoryHandle(base.BaseTest):
+    def test_lazy_memory(self):
+        radio = self.mox.CreateMock(chirp_common.Radio)
+        mem = chirp_common.Memory()
+        mem.number = 3
+        mem.name = "Foo"
+        radio.get_memory(3).AndReturn(mem)
+        self.mox.ReplayAll()
+        handle = chirp_common.MemoryHandle(radio, 3)
+        self.assertEqual(3, handle.number)
+        self.assertEqual(mem, handle)
+        self.assertEqual("Foo", handle.name)
+        self.assertEqual(mem, handle.get_memory())
+
+
 class _TestBaseClass(base.BaseTest):
     ARGS = tuple()
 
@@ -199,11 +231,53 @@ class TestIcomBankModel(base.BaseTest):
             self._radio._get_bank(i).AndReturn(
                 should_include and banks[1].index or None)
             if should_include:
-                self._radio.get_memory(i).AndReturn(i)
                 expected.append(i)
+        self._radio.get_memory(3).AndReturn("mem3")
         self.mox.ReplayAll()
         members = self._model.get_mapping_memories(banks[1])
-        self.assertEqual(members, expected)
+        self.assertEqual([m.number for m in members], expected)
+        self.assertEqual("mem3", members[1].get_memory())
+        # Memberships are only read from the radio once
+        self.assertEqual([], self._model.get_mapping_memories(banks[2]))
+
+    def test_get_mapping_memories_tracks_changes(self):
+        banks = self._model.get_mappings()
+        mem = chirp_common.Memory()
+        mem.number = 5
+        for i in range(1, 10):
+            self._radio._get_bank(i).AndReturn(i == 5 and 1 or None)
+        self._radio._set_bank(5, 2)
+        self._radio._get_bank(5).AndReturn(2)
+        self._radio._set_bank(5, None)
+        self.mox.ReplayAll()
+        self.assertEqual([5], [m.number for m in
+                               self._model.get_mapping_memories(banks[1])])
+        self._model.add_memory_to_mapping(mem, banks[2])
+        self.assertEqual([], self._model.get_mapping_memories(banks[1]))
+        self.assertEqual([5], [m.number for m in
+                               self._model.get_mapping_memories(banks[2])])
+        self._model.remove_memory_from_mapping(mem, banks[2])
+        self.assertEqual([], self._model.get_mapping_memories(banks[2]))
+
+    def test_get_mapping_memories_bad_bank(self):
+        banks = self._model.get_mappings()
+        for i in range(1, 10):
+            self._radio._get_bank(i).AndReturn({3: 1, 4: 0x0E}.get(i))
+        self.mox.ReplayAll()
+        self.assertEqual([3], [m.number for m in
+                               self._model.get_mapping_memories(banks[1])])
+
+    def test_invalidate_index(self):
+        banks = self._model.get_mappings()
+        for i in range(1, 10):
+            self._radio._get_bank(i).AndReturn(None)
+        for i in range(1, 10):
+            self._radio._get_bank(i).AndReturn(i == 4 and 1 or None)
+        self.mox.ReplayAll()
+        self.assertEqual([], self._model.get_mapping_memories(banks[1]))
+        self._model.invalidate_index()
+        self.assertEqual([4], [m.number for m in
+                               self._model.get_mapping_memories(banks[1])])
 
     def test_get_memory_mappings(self):
         banks = self._model.get_mappings()
@@ -269,15 +343,16 @@ class TestIcomIndexedBankModel(TestIcomBankModel):
     def test_get_next_mapping_index(self):
         banks = self._model.get_mappings()
         for i in range(*self._radio.get_features().memory_bounds):
-            self._radio._get_bank(i).AndReturn((i % 2) and banks[1].index)
-            if bool(i % 2):
+            self._radio._get_bank(i).AndReturn(
+                (i % 2) and banks[1].index or banks[2].index)
+        for i in range(*self._radio.get_features().memory_bounds):
+            if i % 2:
                 self._radio._get_bank_index(i).AndReturn(i)
         idx = 0
         for i in range(*self._radio.get_features().memory_bounds):
-            self._radio._get_bank(i).AndReturn((i % 2) and banks[2].index)
-            if i % 2:
+            if not i % 2:
                 self._radio._get_bank_index(i).AndReturn(idx)
                 idx += 1
         self.mox.ReplayAll()
         self.assertEqual(self._model.get_next_mapping_index(banks[1]), 0)
-        self.assertEqual(self._model.get_next_mapping_index(banks[2]), 5)
+        self.assertEqual(self._model.get_next_mapping_index(banks[2]), 4)
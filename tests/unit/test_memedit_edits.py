@@ -66,3 +66,103 @@ class TestEdits(base.BaseTest):
 
     def test_auto_tone_mode_cross(self):
         self._test_auto_tone_mode('Cross Mode', 'Cross', 'Tone->Tone')
+
+
+class TestLocationIndex(base.BaseTest):
+    def _make_editor(self, rows):
+        editor = self.mox.CreateMock(memedit.MemoryEditor)
+        editor.col = lambda x: x
+        editor.store = self.mox.CreateMockAnything()
+        editor._loc_rows = rows
+        editor._rows_in_store = 0
+        editor._get_loc_iter = lambda number: \
+            memedit.MemoryEditor._get_loc_iter(editor, number)
+        return editor
+
+    def _make_ref(self, path):
+        ref = self.mox.CreateMockAnything()
+        ref.get_path().AndReturn(path)
+        return ref
+
+    def test_set_memory_indexed(self):
+        mem = memedit.chirp_common.Memory()
+        mem.number = 5
+        editor = self._make_editor({5: self._make_ref((3,))})
+        editor.store.get_iter((3,)).AndReturn('iter')
+        editor.store.get('iter', 'Loc').AndReturn((5,))
+        editor._set_memory('iter', mem)
+        self.mox.ReplayAll()
+        memedit.MemoryEditor.set_memory(editor, mem)
+
+    def test_set_memory_stale(self):
+        mem = memedit.chirp_common.Memory()
+        mem.number = 5
+        editor = self._make_editor({5: self._make_ref((3,))})
+        editor.store.get_iter((3,)).AndReturn('iter')
+        editor.store.get('iter', 'Loc').AndReturn((6,))
+        editor.store.append().AndReturn('new')
+        editor._set_memory('new', mem)
+        self.mox.ReplayAll()
+        memedit.MemoryEditor.set_memory(editor, mem)
+        self.assertEqual({}, editor._loc_rows)
+        self.assertEqual(1, editor._rows_in_store)
+
+    def test_clear_memory_removed_row(self):
+        editor = self._make_editor({5: self._make_ref(None)})
+        self.mox.ReplayAll()
+        memedit.MemoryEditor.clear_memory(editor, 5)
+        self.assertEqual({}, editor._loc_rows)
+
+
+class TestMemoryFlush(base.BaseTest):
+    def _make_editor(self):
+        editor = self.mox.CreateMock(memedit.MemoryEditor)
+        editor.FLUSH_ROWS = 3
+        editor.FLUSH_INTERVAL = 100
+        editor.DETACH_ROWS = 2
+        editor._pending_mems = []
+        editor._flush_pending = False
+        editor._in_editing = False
+        editor._flush_memories = lambda: \
+            memedit.MemoryEditor._flush_memories(editor)
+        editor.store = self.mox.CreateMockAnything()
+        editor.view = self.mox.CreateMockAnything()
+        return editor
+
+    def test_queue_waits_for_timeout(self):
+        editor = self._make_editor()
+        self.mox.StubOutWithMock(memedit.gobject, 'timeout_add')
+        memedit.gobject.timeout_add(100, editor._flush_timeout)
+        self.mox.ReplayAll()
+        memedit.MemoryEditor._queue_memory(editor, 'mem1')
+        memedit.MemoryEditor._queue_memory(editor, 'mem2')
+        self.assertEqual(['mem1', 'mem2'], editor._pending_mems)
+        self.assertTrue(editor._flush_pending)
+
+    def test_queue_flushes_full_frame(self):
+        editor = self._make_editor()
+        editor._pending_mems = ['mem1', 'mem2']
+        editor._flush_pending = True
+        adj = self.mox.CreateMockAnything()
+        editor.store.get_sort_column_id().AndReturn((0, 'asc'))
+        editor.view.get_vadjustment().AndReturn(adj)
+        adj.get_value().AndReturn(10)
+        editor.view.set_model(None)
+        editor.store.set_sort_column_id(-2, mox.IgnoreArg())
+        editor.set_memory('mem1')
+        editor.set_memory('mem2')
+        editor.set_memory('mem3')
+        editor.store.set_sort_column_id(0, 'asc')
+        editor.view.set_model(editor.store)
+        editor.view.get_vadjustment().AndReturn(adj)
+        adj.set_value(10)
+        self.mox.ReplayAll()
+        memedit.MemoryEditor._queue_memory(editor, 'mem3')
+        self.assertEqual([], editor._pending_mems)
+
+    def test_flush_small_frame_attached(self):
+        editor = self._make_editor()
+        editor._pending_mems = ['mem1']
+        editor.set_memory('mem1')
+        self.mox.ReplayAll()
+        memedit.MemoryEditor._flush_memories(editor)
@@ -0,0 +1,112 @@
+import os
+import tempfile
+
+from tests.unit import base
+from chirp import memmap
+
+
+class TestMemoryMap(base.BaseTest):
+    def test_get(self):
+        mmap = memmap.MemoryMap("abcdef")
+        self.assertEqual("a", mmap[0])
+        self.assertEqual("f", mmap[-1])
+        self.assertEqual("bcd", mmap.get(1, 3))
+        self.assertEqual("cdef", mmap[2:])
+        self.assertEqual("abcdef", mmap.get_packed())
+        self.assertEqual(6, len(mmap))
+
+    def test_from_list(self):
+        mmap = memmap.MemoryMap(["a", "b", "c"])
+        self.assertEqual("abc", mmap.get_packed())
+
+    def test_set(self):
+        mmap = memmap.MemoryMap("abcdef")
+        mmap[0] = 0x41
+        mmap[2] = "CD"
+        mmap[-1] = "F"
+        self.assertEqual("AbCDeF", mmap.get_packed())
+
+    def test_set_invalid(self):
+        mmap = memmap.MemoryMap("abc")
+        self.assertRaises(IndexError, mmap.set, 2, "CD")
+        self.assertRaises(ValueError, mmap.set, 0, 1.0)
+        self.assertEqual("abc", mmap.get_packed())
+
+    def test_pack_unpack(self):
+        mmap = memmap.MemoryMap("\x00\x01\x02\x03")
+        self.assertEqual((0x0102,), mmap.unpack_from(">H", 1))
+        mmap.pack_into("<H", 2, 0x1234)
+        self.assertEqual("\x00\x01\x34\x12", mmap.get_packed())
+
+    def test_view(self):
+        mmap = memmap.MemoryMap("abcdef")
+        view = mmap.view(2, 4)
+        self.assertEqual("cd", view.tobytes())
+        view[0] = "X"
+        self.assertEqual("abXdef", mmap.get_packed())
+
+    def test_truncate(self):
+        mmap = memmap.MemoryMap("abcdef")
+        mmap.truncate(3)
+        self.assertEqual("abc", mmap.get_packed())
+
+    def test_dirty_not_tracked(self):
+        mmap = memmap.MemoryMap("\x00" * 64)
+        mmap[2] = "ab"
+        self.assertEqual(None, mmap.get_dirty_ranges())
+        self.assertTrue(mmap.is_dirty(32, 48))
+
+    def test_dirty_ranges(self):
+        mmap = memmap.MemoryMap("\x00" * 64)
+        mmap.clear_dirty()
+        self.assertEqual([], mmap.get_dirty_ranges())
+        mmap[40] = "abcd"
+        mmap[2] = 0x41
+        mmap[3] = "B"
+        mmap.pack_into(">H", 42, 0x1234)
+        mmap[-1] = "Z"
+        self.assertEqual([(2, 4), (40, 44), (63, 64)],
+                         mmap.get_dirty_ranges())
+        self.assertTrue(mmap.is_dirty(0, 16))
+        self.assertFalse(mmap.is_dirty(16, 32))
+        self.assertTrue(mmap.is_dirty(32, 48))
+        self.assertFalse(mmap.is_dirty(44, 63))
+        self.assertFalse(mmap.is_dirty(4, 40))
+        mmap.clear_dirty()
+        self.assertFalse(mmap.is_dirty(0, 64))
+
+
+class TestMappedMemoryMap(base.BaseTest):
+    def setUp(self):
+        super(TestMappedMemoryMap, self).setUp()
+        fd, self.fn = tempfile.mkstemp('.img')
+        os.write(fd, 'abcdefTRAILER')
+        os.close(fd)
+
+    def tearDown(self):
+        super(TestMappedMemoryMap, self).tearDown()
+        os.remove(self.fn)
+
+    def test_copy_on_write(self):
+        mmap = memmap.MappedMemoryMap(self.fn, 6)
+        self.assertEqual(6, len(mmap))
+        self.assertEqual("cd", mmap[2:4])
+        mmap[0] = 0x41
+        mmap[1] = "B"
+        mmap.pack_into(">H", 2, 0x4344)
+        self.assertEqual("ABCDef", mmap.get_packed())
+        with open(self.fn) as f:
+            self.assertEqual("abcdefTRAILER", f.read())
+
+    def test_set_buffers(self):
+        mmap = memmap.MappedMemoryMap(self.fn, 6)
+        mmap[0] = bytearray("AB")
+        mmap[2] = buffer("CD")
+        self.assertEqual("ABCDef", mmap.get_packed())
+
+    def test_detach(self):
+        mmap = memmap.MappedMemoryMap(self.fn)
+        mmap.truncate(3)
+        mmap[0] = 0x41
+        self.assertEqual("Abc", mmap.get_packed())
+        self.assertEqual("bc", mmap.view(1).tobytes())
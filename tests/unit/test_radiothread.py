@@ -0,0 +1,86 @@
+import mox
+from tests.unit import base
+
+__builtins__["_"] = lambda s: s
+
+from chirp.ui import common
+
+
+class TestRadioThread(base.BaseTest):
+    def setUp(self):
+        super(TestRadioThread, self).setUp()
+        self.thread = common.RadioThread(None)
+
+    def _job(self, func, *args):
+        return common.RadioJob(None, func, *args)
+
+    def _pop(self):
+        jobs = self.thread._queue_pop()
+        return jobs and [(job.func, job.args) for job in jobs]
+
+    def test_priority_order(self):
+        self.thread.submit(self._job("a"), 10)
+        self.thread.submit(self._job("b"), 0)
+        self.thread.submit(self._job("c"), 2)
+        self.thread.submit(self._job("d"), 0)
+        self.assertEqual([("b", ())], self._pop())
+        self.assertEqual([("d", ())], self._pop())
+        self.assertEqual([("c", ())], self._pop())
+        self.assertEqual([("a", ())], self._pop())
+        self.assertEqual(None, self._pop())
+
+    def test_coalesce_get_memory(self):
+        self.thread.submit(self._job("get_memory", 1), 10)
+        self.thread.submit(self._job("set_memory", 1), 0)
+        self.thread.submit(self._job("get_memory", 1), 2)
+        self.thread.submit(self._job("get_memory", 2), 2)
+        self.assertEqual([("set_memory", (1,))], self._pop())
+        self.assertEqual([("get_memory", (1,)), ("get_memory", (1,))],
+                         self._pop())
+        self.assertEqual([("get_memory", (2,))], self._pop())
+        self.assertEqual(None, self._pop())
+
+    def test_coalesce_only_plain_jobs(self):
+        class OtherJob(common.RadioJob):
+            pass
+
+        self.thread.submit(self._job("get_memory", 1))
+        self.thread.submit(OtherJob(None, "get_memory", 1))
+        self.assertEqual([("get_memory", (1,))], self._pop())
+        self.assertEqual([("get_memory", (1,))], self._pop())
+
+    def test_cancel(self):
+        for i in range(0, 3):
+            job = self._job("get_memory", i)
+            job.set_tag("fetch")
+            self.thread.submit(job, 10)
+        job = self._job("get_memory", 1)
+        self.thread.submit(job, 0)
+        self.thread.cancel("fetch")
+        self.assertEqual([("get_memory", (1,))], self._pop())
+        self.assertEqual(None, self._pop())
+
+    def test_flush_priority(self):
+        self.thread.submit(self._job("a"), 0)
+        self.thread.submit(self._job("b"), 10)
+        self.thread.flush(10)
+        self.assertTrue(self.thread._queue_clear_below(0))
+        self.assertFalse(self.thread._queue_clear_below(1))
+        self.assertEqual([("a", ())], self._pop())
+        self.assertEqual(None, self._pop())
+
+    def test_followers_get_result(self):
+        calls = []
+        job = common.RadioJob(lambda r, x: calls.append((r, x)),
+                              "get_memory", 1)
+        job.set_cb_args("first")
+        other = common.RadioJob(lambda r, x: calls.append((r, x)),
+                                "get_memory", 1)
+        other.set_cb_args("second")
+        job.followers = [other]
+
+        self.mox.StubOutWithMock(common.gobject, "idle_add")
+        common.gobject.idle_add(job.cb, ["result"], "first")
+        common.gobject.idle_add(other.cb, ["result"], "second")
+        self.mox.ReplayAll()
+        job._execute(None, lambda n: ["result"])
@@ -0,0 +1,127 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+try:
+    import libxml2
+except ImportError:
+    libxml2 = None
+
+from tests.unit import base
+from chirp import chirp_common
+from chirp import errors
+from chirp import xml_ll
+
+
+class TestXMLMemories(base.BaseTest):
+    def setUp(self):
+        super(TestXMLMemories, self).setUp()
+        if libxml2 is None:
+            raise unittest.SkipTest('libxml2 is not available')
+        self.doc = libxml2.newDoc('1.0')
+        radio = self.doc.newChild(None, 'radio', None)
+        radio.newChild(None, 'memories', None)
+        radio.newChild(None, 'banks', None)
+
+    def tearDown(self):
+        super(TestXMLMemories, self).tearDown()
+        self.doc.freeDoc()
+
+    def _make_memory(self, number, dv=False):
+        if dv:
+            mem = chirp_common.DVMemory()
+            mem.mode = 'DV'
+            mem.dv_urcall = 'CQCQCQ'
+            mem.dv_rpt1call = 'W1AW  B'
+        else:
+            mem = chirp_common.Memory()
+        mem.number = number
+        mem.name = 'Mem %i' % number
+        mem.freq = 146520000 + number * 5000
+        mem.tmode = 'TSQL'
+        mem.ctone = 100.0
+        mem.duplex = '-'
+        mem.skip = 'S'
+        return mem
+
+    def _locations(self):
+        memories = xml_ll._memories_node(self.doc)
+        return [int(node.prop('location'))
+                for node in xml_ll._children(memories, 'memory')]
+
+    def test_round_trip(self):
+        index = xml_ll.index_memories(self.doc)
+        for number in (5, 2, 9):
+            xml_ll.set_memory(self.doc, self._make_memory(number, number == 2),
+                              index)
+        self.assertEqual([2, 5, 9], sorted(index.keys()))
+
+        mem = xml_ll.get_memory(self.doc, 2, index)
+        self.assertTrue(isinstance(mem, chirp_common.DVMemory))
+        self.assertEqual('W1AW  B', mem.dv_rpt1call)
+        mem = xml_ll.get_memory(self.doc, 5, index)
+        self.assertEqual('Mem 5', mem.name)
+        self.assertEqual(146545000, mem.freq)
+        self.assertEqual('TSQL', mem.tmode)
+        self.assertEqual(100.0, mem.ctone)
+        self.assertEqual('-', mem.duplex)
+        self.assertEqual('S', mem.skip)
+
+        # Replacing a memory leaves one node for its location
+        mem.name = 'Changed'
+        xml_ll.set_memory(self.doc, mem, index)
+        self.assertEqual(1, len(index[5]))
+        self.assertEqual([2, 9, 5], self._locations())
+        self.assertEqual('Changed', xml_ll.get_memory(self.doc, 5).name)
+
+        xml_ll.del_memory(self.doc, 9, index)
+        xml_ll.del_memory(self.doc, 9, index)
+        self.assertEqual([2, 5], sorted(index.keys()))
+        self.assertEqual([2, 5], self._locations())
+        self.assertRaises(errors.InvalidMemoryLocation,
+                          xml_ll.get_memory, self.doc, 9, index)
+
+        # The index agrees with one built from the document
+        fresh = xml_ll.index_memories(self.doc)
+        self.assertEqual(sorted(index.keys()), sorted(fresh.keys()))
+
+    def test_duplicate_location(self):
+        memories = xml_ll._memories_node(self.doc)
+        for i in range(2):
+            memories.newChild(None, 'memory', None).newProp('location', '1')
+        index = xml_ll.index_memories(self.doc)
+        self.assertEqual(2, len(index[1]))
+        self.assertRaises(errors.RadioError,
+                          xml_ll.get_memory, self.doc, 1, index)
+        self.assertRaises(errors.RadioError,
+                          xml_ll.set_memory, self.doc, self._make_memory(1),
+                          index)
+
+
+class TestXMLRadioSave(base.BaseTest):
+    def setUp(self):
+        super(TestXMLRadioSave, self).setUp()
+        if libxml2 is None:
+            raise unittest.SkipTest('libxml2 is not available')
+        self.tempdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        super(TestXMLRadioSave, self).tearDown()
+        shutil.rmtree(self.tempdir)
+
+    def test_save_matches_serialize(self):
+        from chirp.drivers import generic_xml
+
+        radio = generic_xml.XMLRadio(None)
+        for number in range(3):
+            mem = chirp_common.Memory()
+            mem.number = number
+            mem.name = 'Mem %i' % number
+            mem.freq = 146520000 + number * 5000
+            radio.set_memory(mem)
+
+        fn = os.path.join(self.tempdir, 'test.chirp')
+        radio.save(fn)
+        with open(fn) as f:
+            self.assertEqual(radio.doc.serialize(format=1), f.read())